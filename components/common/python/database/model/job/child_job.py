@@ -37,6 +37,9 @@ class ChildJob(ForeignKey):
         name='parent_job')
     logger = None
 
+    # Each child job references a distinct parent job
+    BULK_POST_KEY = FOREIGN_PARENT_JOB.foreign_id
+
     def __init__(self, table_name=''):
 
         # Call the parent constructor AFTER all the attributes are initialized
@@ -81,6 +84,33 @@ class ChildJob(ForeignKey):
         job_status_change.post(post_foreign=False, logger_func=logger_func)
         return job_status_change
 
+    @staticmethod
+    def bulk_post_new_status_change(jobs, job_status, error_subtype=None, error_message=None, logger_func=temp_logger.debug):
+        '''
+        Create and save a new job status change for each job into the database,
+        with a single bulk insertion.
+
+        :return: the list of status changes, or None if the database could not be reached.
+        '''
+
+        # Import module here to avoid mutual inclusion
+        from .job_status_change import JobStatusChange
+
+        # Create new instances with time=now
+        job_status_changes = [
+            JobStatusChange(
+                child_job=job,
+                time=None,
+                error_subtype=error_subtype,
+                error_message=error_message,
+                job_status=job_status)
+            for job in jobs]
+
+        # Save the entries into the database.
+        # post_foreign=False because the foreign attributes (the jobs)
+        # must already exist in the database.
+        return ForeignKey.bulk_post(job_status_changes, post_foreign=False, logger_func=logger_func)
+
     def start(self, *args):
         '''Perform pre- and post-processing and start the job execution.'''
 
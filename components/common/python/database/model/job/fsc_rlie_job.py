@@ -278,7 +278,7 @@ class FscRlieJob(JobTemplate):
             self.name += '-%s' %self.measurement_date.strftime('%Y-%m-%d')
 
 
-    def configure_single_job(self, logger_func):
+    def configure_single_job(self, logger_func, previous_temporal_jobs=None, backward_candidate_jobs=None):
         '''
         Perform L1C specific configuration, required for job processing.
         Here we fetch the previous job in the time-serie, compute the  status that
@@ -286,6 +286,12 @@ class FscRlieJob(JobTemplate):
         used for the job and the path under which the L2A product should be stored.
 
         :param logger_func: Logger instance
+        :param previous_temporal_jobs: dictionary {job.id: previous temporal job}
+            retrieved by find_previous_temporal_jobs, the database is requested
+            if the job is missing.
+        :param backward_candidate_jobs: dictionary {job.id: list of candidate jobs}
+            retrieved by find_backward_candidate_jobs, the database is requested
+            if the job is missing.
         '''
         # Set up output message
         message = None
@@ -294,12 +300,15 @@ class FscRlieJob(JobTemplate):
         self.set_job_unique_name()
 
         # Find the previous job the current one depends on, if it exists
-        previous_temporal_job = FscRlieJobUtil.find_previous_temporal_job_no_l2a_restriction(
-            self,
-            FscRlieJob(),
-            allow_codated_jobs=False,
-            logger_func=logger_func
-            )
+        if previous_temporal_jobs is not None and self.id in previous_temporal_jobs:
+            previous_temporal_job = previous_temporal_jobs[self.id]
+        else:
+            previous_temporal_job = FscRlieJobUtil.find_previous_temporal_job_no_l2a_restriction(
+                self,
+                FscRlieJob(),
+                allow_codated_jobs=False,
+                logger_func=logger_func
+                )
 
         # Compute job status function of the job dependencies
         status_to_set = self.update_job_status_function_of_dependencies(
@@ -311,7 +320,11 @@ class FscRlieJob(JobTemplate):
         #  processing, and specific to input product.
         if status_to_set == JobStatus.ready:
             # Set the MAJA mode the job should run with, if dependency completed
-            return_message = FscRlieJobUtil.set_maja_mode(self, FscRlieJob, logger_func)
+            # (the previous temporal job is the last valid L2A job it looks for)
+            return_message = FscRlieJobUtil.set_maja_mode(
+                self, FscRlieJob, logger_func,
+                previous_temporal_jobs={self.id: previous_temporal_job},
+                backward_candidate_jobs=backward_candidate_jobs)
 
             if return_message == "Waiting to perform backward initialization":
                 status_to_set = JobStatus.configured
@@ -705,19 +718,18 @@ class FscRlieJob(JobTemplate):
         :param logger_func: logger.debug or logger.info or ...
         '''
 
-        existing_jobs = []
+        # Request each (tile ID, measurement date) only once
+        references = list(dict.fromkeys(
+            (job.tile_id, job.measurement_date.strftime('%Y-%m-%dT%H:%M:%S'))
+            for job in jobs))
 
-        for job in jobs:
-            existing_jobs.extend(
-                StoredProcedure.fsc_rlie_jobs_with_tile_date(
-                    job.tile_id,
-                    job.measurement_date.strftime('%Y-%m-%dT%H:%M:%S'),
-                    FscRlieJob(),
-                    logger_func=logger_func,
-                    set_timeout=False
-                )
-            )
-        return existing_jobs
+        return StoredProcedure.fsc_rlie_jobs_with_tile_dates(
+            [tile_id for tile_id, _ in references],
+            [measurement_time for _, measurement_time in references],
+            FscRlieJob(),
+            logger_func=logger_func,
+            set_timeout=False
+        )
 
 
     @staticmethod
@@ -761,6 +773,44 @@ class FscRlieJob(JobTemplate):
         return jobs
 
 
+    @staticmethod
+    def find_previous_temporal_jobs(jobs, logger_func):
+        '''
+        Retrieve the previous temporal job of each FSC/RLIE job with batched
+        requests, see JobTemplate.find_previous_temporal_jobs
+
+        :param jobs: list of FSC RLIE jobs to be configured.
+        :param logger_func: Logger instance
+        '''
+
+        return FscRlieJobUtil.find_previous_temporal_jobs_no_l2a_restriction(
+            jobs,
+            FscRlieJob(),
+            allow_codated_jobs=False,
+            logger_func=logger_func
+            )
+
+
+    @staticmethod
+    def find_backward_candidate_jobs(jobs, previous_temporal_jobs, logger_func):
+        '''
+        Retrieve the MAJA backward candidates of each FSC/RLIE job with batched
+        requests, see JobTemplate.find_backward_candidate_jobs
+
+        :param jobs: list of FSC RLIE jobs to be configured.
+        :param previous_temporal_jobs: dictionary {job.id: previous temporal job}
+            returned by find_previous_temporal_jobs.
+        :param logger_func: Logger instance
+        '''
+
+        return FscRlieJobUtil.find_backward_candidate_jobs(
+            jobs,
+            previous_temporal_jobs,
+            FscRlieJob(),
+            logger_func=logger_func
+            )
+
+
     @staticmethod
     def fix_esa_publication_date(logger):
         '''
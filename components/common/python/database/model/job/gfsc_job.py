@@ -3,6 +3,7 @@ import os
 import re
 import json
 import copy
+from bisect import bisect_left, bisect_right
 from functools import partial
 from datetime import datetime, timedelta, date
 from time import sleep
@@ -655,6 +656,41 @@ class GfscJob(JobTemplate):
             product_list = [product for product in product_list if product.measurement_date <= measurement_date_max]
         return product_list
 
+    @staticmethod
+    def index_product_list(product_list):
+        '''
+        Index the list of the HrsiProducts by tile_id, the products of each tile
+        being sorted by measurement date, to filter it with filter_indexed_product_list.
+
+        :param product_list: ([HrsiProduct]) List of products
+        :return: dict {tile_id: ([measurement dates], [(position in product_list, product)])}
+        '''
+        product_index = {}
+        for position, product in sorted(
+                enumerate(product_list), key=lambda item: (item[1].measurement_date, item[0])):
+            measurement_dates, products = product_index.setdefault(product.tile_id, ([], []))
+            measurement_dates.append(product.measurement_date)
+            products.append((position, product))
+        return product_index
+
+    @staticmethod
+    def filter_indexed_product_list(product_index, tile_id, measurement_date_min=None, measurement_date_max=None):
+        '''
+        Same as filter_product_list on tile_id and measurement date, from the
+        index built by index_product_list: the measurement date range of the
+        tile products is found by bisection.
+
+        :param product_index: index of the products
+        :param tile_id: Tile ID
+        :param measurement_date_min: Earliest measurement date
+        :param measurement_date_max: Latest measurement date
+        '''
+        measurement_dates, products = product_index.get(tile_id, ([], []))
+        start = 0 if measurement_date_min is None else bisect_left(measurement_dates, measurement_date_min)
+        end = len(products) if measurement_date_max is None else bisect_right(measurement_dates, measurement_date_max)
+        # Keep the order of the original product list
+        return [product for _, product in sorted(products[start:end], key=lambda item: item[0])]
+
     @staticmethod
     def get_jobs_to_create(internal_database_parallel_request: int, logger):
         '''
@@ -744,7 +780,9 @@ class GfscJob(JobTemplate):
                 logger.info('Keep only latest GFSC product for each no-product-tile.')
                 gfsc_tile_id_list = [product.tile_id for product in gfsc_product_list]
                 gfsc_tile_id_list = list(set(gfsc_tile_id_list)-input_tile_id_list)
-                gfsc_product_list = [sorted(GfscJob.filter_product_list(gfsc_product_list,tile_id=tile_id), key=lambda x: int(x.product_id.split('_')[-1]), reverse=True)[0] for tile_id in gfsc_tile_id_list]
+                gfsc_product_index = GfscJob.index_product_list(gfsc_product_list)
+                gfsc_product_list = [sorted(GfscJob.filter_indexed_product_list(gfsc_product_index,tile_id), key=lambda x: int(x.product_id.split('_')[-1]), reverse=True)[0] for tile_id in gfsc_tile_id_list]
+                gfsc_product_index = GfscJob.index_product_list(gfsc_product_list)
                 logger.info('%s products found.' % len(gfsc_product_list))
 
                 logger.info('Creating daily jobs for %s tiles.' % len(all_tile_id_list-input_tile_id_list))                  
@@ -753,7 +791,7 @@ class GfscJob(JobTemplate):
                 if last_inserted_job is not None:
                     triggering_product_publication_date = last_inserted_job.triggering_product_publication_date
                 for tile_id in list(set(gfsc_tile_id_list)-set(input_tile_id_list)):
-                    product = GfscJob.filter_product_list(gfsc_product_list,tile_id=tile_id)
+                    product = GfscJob.filter_indexed_product_list(gfsc_product_index,tile_id)
                     if product == []:
                         print('Cannot find input product for tile %s' % tile_id)
                         continue
@@ -889,6 +927,11 @@ class GfscJob(JobTemplate):
                 other_params={'startDate':f"{DatetimeUtil.toRfc3339(min(publication_date_min, nrt_start_date_limit))}", 
                     'completionDate':f"{DatetimeUtil.toRfc3339(publication_date_max)}"})
 
+        # Index the products by tile and measurement date, once for all the jobs
+        fsc_product_index = GfscJob.index_product_list(fsc_product_large_list)
+        wds_product_index = GfscJob.index_product_list(wds_product_large_list)
+        sws_product_index = GfscJob.index_product_list(sws_product_large_list)
+
         for product in triggering_product_list:
             tile_id = product.tile_id
             product_date = datetime(product.measurement_date.year,product.measurement_date.month,product.measurement_date.day)
@@ -900,9 +943,9 @@ class GfscJob(JobTemplate):
                 DatetimeUtil.toRfc3339(publication_date_max)))
             publication_date_min = DatetimeUtil.fromRfc3339(DatetimeUtil.toRfc3339(publication_date_min))
             publication_date_max = DatetimeUtil.fromRfc3339(DatetimeUtil.toRfc3339(publication_date_max))
-            fsc_product_list = GfscJob.filter_product_list(fsc_product_large_list,tile_id=tile_id,measurement_date_min=publication_date_min,measurement_date_max=publication_date_max)
-            wds_product_list = GfscJob.filter_product_list(wds_product_large_list,tile_id=tile_id,measurement_date_min=publication_date_min,measurement_date_max=publication_date_max)
-            sws_product_list = GfscJob.filter_product_list(sws_product_large_list,tile_id=tile_id,measurement_date_min=publication_date_min,measurement_date_max=publication_date_max)
+            fsc_product_list = GfscJob.filter_indexed_product_list(fsc_product_index,tile_id,measurement_date_min=publication_date_min,measurement_date_max=publication_date_max)
+            wds_product_list = GfscJob.filter_indexed_product_list(wds_product_index,tile_id,measurement_date_min=publication_date_min,measurement_date_max=publication_date_max)
+            sws_product_list = GfscJob.filter_indexed_product_list(sws_product_index,tile_id,measurement_date_min=publication_date_min,measurement_date_max=publication_date_max)
             # GFSC products will be added in just before processing, because they may not be produced yet.
             logger.info('%i input products found.' % len(fsc_product_list + wds_product_list + sws_product_list))
             jobs.append(GfscJob(
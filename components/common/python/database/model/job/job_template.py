@@ -283,3 +283,37 @@ class JobTemplate(ChildJob):
         '''
 
         raise NotImplementedError
+
+
+    @staticmethod
+    def find_previous_temporal_jobs(jobs, logger_func):
+        '''
+        Retrieve, with batched requests, the previous temporal job each job
+        depends on, to be passed to configure_single_job. The method should
+        return a dictionary {job.id: previous temporal job or None}.
+        By default, return None: the job type doesn't support batched
+        retrieval and configure_single_job requests its dependencies itself.
+
+        :param jobs: list of jobs to be configured.
+        :param logger_func: Logger instance
+        '''
+
+        return None
+
+
+    @staticmethod
+    def find_backward_candidate_jobs(jobs, previous_temporal_jobs, logger_func):
+        '''
+        Retrieve, with batched requests, the jobs that may be used to process
+        each job with a backward mode, to be passed to configure_single_job
+        along with the previous temporal jobs. The method should return a
+        dictionary {job.id: list of candidate jobs}.
+        By default, return None: configure_single_job requests them itself.
+
+        :param jobs: list of jobs to be configured.
+        :param previous_temporal_jobs: dictionary {job.id: previous temporal job}
+            returned by find_previous_temporal_jobs.
+        :param logger_func: Logger instance
+        '''
+
+        return None
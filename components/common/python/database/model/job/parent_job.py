@@ -1,4 +1,5 @@
 import logging
+import uuid
 
 from .job_priority import JobPriority
 from ...rest.rest_database import RestDatabase
@@ -38,12 +39,15 @@ class ParentJob(RestDatabase):
     DEFAULT_LOG_LEVEL = logging.DEBUG
     #DEFAULT_LOG_LEVEL = logging.WARNING
 
+    # Jobs inserted together are identified by their UUID, generated at creation
+    BULK_POST_KEY = 'unique_id'
+
     def __init__(self, log_level=None):
         '''
         :param log_level: Initial log level. Can be modified later by the operator for e.g. debugging jobs. 
         '''
         self.name = None
-        self.unique_id = None
+        self.unique_id = str(uuid.uuid4())
         self.priority = None
         self.tile_id = None
         self.next_log_level = log_level if log_level else ParentJob.DEFAULT_LOG_LEVEL
@@ -1,5 +1,6 @@
 from .rest_database import RestDatabase
 from ...util.exceptions import CsiInternalError
+from ...util.log_util import temp_logger
 
 
 class ForeignKey(RestDatabase):
@@ -176,6 +177,73 @@ class ForeignKey(RestDatabase):
             else:
                 raise
 
+    @staticmethod
+    def bulk_post(objects, post_foreign, logger_func=None):
+        '''
+        Bulk insert objects into the database, see RestDatabase.bulk_post
+
+        :param post_foreign: automatically bulk insert the foreign attributes first.
+        If the insertion fails, the foreign entries inserted by this call are
+        deleted, so that no foreign entry is left without its object.
+        :return: the list of inserted objects, or None if the database could
+        not be reached.
+        '''
+
+        # At least one object must be passed
+        if not objects:
+            return []
+
+        # Foreign objects inserted by this call
+        posted_foreign_objects = []
+
+        try:
+            # Post the foreign attributes first
+            if post_foreign:
+                for attr in objects[0].foreign_attrs:
+
+                    # Post the foreign objects
+                    foreign_objects = [_object.get_foreign_object(attr) for _object in objects]
+                    posted_foreign_objects.append([
+                        foreign_object for foreign_object in foreign_objects
+                        if foreign_object.get_id() is None])
+                    if RestDatabase.bulk_post(foreign_objects, logger_func) is None:
+                        ForeignKey.__delete_posted_foreign(posted_foreign_objects, logger_func)
+                        return None
+
+                    # Update the corresponding IDs in the current objects,
+                    # e.g. self.fk_foreign_id = foreign_object.id
+                    for _object, foreign_object in zip(objects, foreign_objects):
+                        _object.set_foreign_id(attr, foreign_object.get_id())
+
+            # Post the current objects
+            response = RestDatabase.bulk_post(objects, logger_func)
+            if response is None:
+                ForeignKey.__delete_posted_foreign(posted_foreign_objects, logger_func)
+            return response
+
+        except CsiInternalError as exception:
+            ForeignKey.__delete_posted_foreign(posted_foreign_objects, logger_func)
+            raise exception
+
+        except Exception as exception:
+            ForeignKey.__delete_posted_foreign(posted_foreign_objects, logger_func)
+            if post_foreign:
+                raise Exception(
+                    'Error posting interdependent entries. Consider using rollback or '
+                    'see http://postgrest.org/en/v6.0/api.html#stored-procedures') from exception
+            else:
+                raise
+
+    @staticmethod
+    def __delete_posted_foreign(posted_foreign_objects, logger_func=None):
+        '''Delete the foreign entries inserted by a failed bulk_post.'''
+
+        for foreign_objects in posted_foreign_objects:
+            try:
+                RestDatabase.bulk_delete(foreign_objects, logger_func)
+            except Exception as exception:
+                temp_logger.error(f'Could not delete the entries inserted before the error : {exception}')
+
     def patch(self, patch_foreign, logger_func=None):
         '''Patch (update) an object from the database.
 
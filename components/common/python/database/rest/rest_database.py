@@ -70,6 +70,19 @@ class RestDatabase():
                                        "set , stopping services."
 
     HTTP_CRITICAL_ERROR = [400, 409, 429]
+
+    # Max number of entries inserted by one bulk_post request
+    BULK_POST_SIZE = 500
+
+    # Max number of entries deleted by one bulk_delete request, so that their
+    # IDs fit in the URL
+    BULK_DELETE_SIZE = 100
+
+    # Name of a unique field, set before insertion, used by bulk_post to match
+    # the inserted entries returned by the database with the objects.
+    # None to match them by position.
+    BULK_POST_KEY = None
+
     # Counter to log only one error message
     __DATABASE_PREVIOUSLY_IN_ERROR = False
     __DATABASE_INCONSISTENT_CONTENT = False
@@ -402,42 +415,137 @@ class RestDatabase():
         
         return response
 
-#     @staticmethod
-#     def bulk_post(objects, logger_func=None):
-#         '''
-#         Bulk insert objects (=insert all objects with one call) into database.
-#         See: http://postgrest.org/en/v6.0/api.html#bulk-insert
-#         '''
-#
-#         # At least one object must be passed
-#         if not objects:
-#             return
-#
-#         # All the inserted objects must be of the same type
-#         types = set([str(type(_object)) for _object in objects])
-#         if len(types) != 1:
-#             raise Exception(
-#                 'All objects to bulk insert must be of the same type:\n - %s' %
-#                 '\n - '.join(types))
-#
-#         # Object instance example = first one of the list
-#         object_instance = objects[0]
-#
-#         # Create a JSON array of objects to insert
-#         data = json.dumps([_object.__to_post_data() for _object in objects])
-#
-#         # Insert the new records.
-#         # Get the inserted data in return.
-#         response = RestUtil().post(
-#             url=object_instance.uri,
-#             headers=RestDatabase.HEADERS_RETURN_REPRESENTATION,
-#             params=None,
-#             data=data,
-#             logger_func=logger_func)
-#
-#         # Note: does not work with auto-generated IDs (they are None before insertion)
-#         # Maybe we could try to insert into a view that copies the table columns but without the ID
-#         # + we should parse the response to attribute the auto-generated IDs to the input objects.
+    @staticmethod
+    def bulk_post(objects, logger_func=None):
+        '''
+        Bulk insert objects (=insert all objects with one call) into database.
+        See: http://postgrest.org/en/v6.0/api.html#bulk-insert
+
+        The objects are sent by chunks of BULK_POST_SIZE entries and the
+        database IDs attributed to the inserted entries are set in the objects.
+        The entries returned by the database are matched with the objects by
+        their BULK_POST_KEY field if it is defined, else by position.
+
+        :return: the list of inserted objects, or None if the database could
+        not be reached.
+        '''
+
+        # At least one object must be passed
+        if not objects:
+            return []
+
+        # All the inserted objects must be of the same type
+        types = set([str(type(_object)) for _object in objects])
+        if len(types) != 1:
+            raise Exception(
+                'All objects to bulk insert must be of the same type:\n - %s' %
+                '\n - '.join(types))
+
+        # Object instance example = first one of the list
+        object_instance = objects[0]
+
+        # Unique field identifying the inserted entries, if any
+        key_name = object_instance.BULK_POST_KEY
+        if key_name and any(getattr(_object, key_name) is None for _object in objects):
+            raise CsiInternalError(
+                'Bulk Insertion Error',
+                f'{key_name} must be set to bulk insert entries in {object_instance.table_name}.')
+
+        # Used to get the inserted ids, as in post
+        id_name = object_instance.id_name
+        fields_id = [object_instance.id_name] + ([key_name] if key_name else [])
+        class ParseId(RestDatabase):
+            '''Parse the database ID attributed to each inserted entry.'''
+            def __init__(self):
+                self.id_name = id_name
+                self.fields = fields_id
+
+        for start in range(0, len(objects), RestDatabase.BULK_POST_SIZE):
+            chunk = objects[start:start + RestDatabase.BULK_POST_SIZE]
+
+            # Create a JSON array of objects to insert
+            data = json.dumps([_object.__to_post_data() for _object in chunk])
+
+            # Insert the new records.
+            # Get the inserted data in return, in the insertion order.
+            try:
+                response = RestUtil().post(
+                    url=object_instance.uri,
+                    headers=RestDatabase.HEADERS_RETURN_REPRESENTATION,
+                    params=None,
+                    data=data,
+                    logger_func=logger_func)
+            except Exception as exception:
+                object_instance.catch_errors(exception, logger_func=logger_func)
+                return None
+
+            inserted = RestDatabase.parse_response(response, ParseId())
+            if len(inserted) != len(chunk):
+                raise CsiInternalError(
+                    'Bulk Insertion Error',
+                    f'{len(chunk)} entries sent to {object_instance.table_name}, '
+                    f'{len(inserted)} returned.')
+
+            # Attribute the auto-generated IDs to the input objects
+            if key_name:
+                inserted_ids = {
+                    str(getattr(inserted_object, key_name)): inserted_object.get_id()
+                    for inserted_object in inserted}
+                for _object in chunk:
+                    key_value = str(getattr(_object, key_name))
+                    if key_value not in inserted_ids:
+                        raise CsiInternalError(
+                            'Bulk Insertion Error',
+                            f'Entry with {key_name}={key_value} sent to '
+                            f'{object_instance.table_name} but not returned.')
+                    _object.set_id(inserted_ids[key_value])
+            else:
+                for _object, inserted_object in zip(chunk, inserted):
+                    _object.set_id(inserted_object.get_id())
+
+        if logger_func:
+            logger_func(f'Inserted {len(objects)} entries in {object_instance.table_name}')
+
+        return objects
+
+    @staticmethod
+    def bulk_delete(objects, logger_func=None):
+        '''
+        Delete objects from the database, identified by their database ID,
+        with one request per BULK_DELETE_SIZE entries. The IDs of the deleted
+        objects are reset.
+
+        :return: True, or None if the database could not be reached.
+        '''
+
+        # Only the objects inserted in the database can be deleted
+        objects = [_object for _object in objects if _object.get_id() is not None]
+        if not objects:
+            return True
+
+        # Object instance example = first one of the list
+        object_instance = objects[0]
+
+        for start in range(0, len(objects), RestDatabase.BULK_DELETE_SIZE):
+            chunk = objects[start:start + RestDatabase.BULK_DELETE_SIZE]
+            params = {object_instance.id_name: 'in.(%s)' % ','.join(
+                str(_object.get_id()) for _object in chunk)}
+            try:
+                RestUtil().delete(
+                    url=object_instance.uri,
+                    params=params,
+                    logger_func=logger_func)
+            except Exception as exception:
+                object_instance.catch_errors(exception, logger_func=logger_func)
+                return None
+
+            for _object in chunk:
+                _object.set_id(None)
+
+        if logger_func:
+            logger_func(f'Deleted {len(objects)} entries from {object_instance.table_name}')
+
+        return True
 
     def patch(self, logger_func=None, data=None, params=None):
         '''Patch (update) an object from the database.'''
@@ -200,7 +200,33 @@ class StoredProcedure(RestDatabase):
             set_timeout=set_timeout,
             logger_func=logger_func)
 
-            
+
+    @staticmethod
+    def job_status_history_by_parent_job(parent_job_ids, logger_func, set_timeout=True, chunk_size=500):
+        '''
+        Get all status changes associated with parent job IDs, requested by
+        chunks of chunk_size IDs, grouped by parent job ID.
+
+        :param parent_job_ids: [integer]
+        :param logger_func: logger.debug or logger.info or ...
+        :param set_timeout: [Boolean] to notify if a timeout should be set on the request
+        :return: dict {parent_job_id: [JobStatusChange]}, each parent job ID
+        being associated with a (possibly empty) list.
+        '''
+
+        # Unique IDs, an empty list would return the results for all parent jobs
+        parent_job_ids = list(dict.fromkeys(parent_job_ids))
+        history = {parent_job_id: [] for parent_job_id in parent_job_ids}
+
+        for start in range(0, len(parent_job_ids), chunk_size):
+            status_changes = StoredProcedure.job_status_history(
+                parent_job_ids[start:start + chunk_size],
+                logger_func=logger_func,
+                set_timeout=set_timeout)
+            for status_change in status_changes:
+                history.setdefault(status_change.parent_job_id, []).append(status_change)
+
+        return history
 
     @staticmethod
     def last_job_status(parent_job_ids, last_status, logger_func, set_timeout=True):
@@ -403,6 +429,46 @@ class StoredProcedure(RestDatabase):
 
         return fsc_rlie_jobs
 
+    @staticmethod
+    def fsc_rlie_jobs_with_tile_dates(tile_ids, measurement_times, fsc_rlie_job_object,
+            logger_func, set_timeout=True):
+        '''
+        Batch version of fsc_rlie_jobs_with_tile_date: get the FSC/RLIE jobs
+        matching any of the (tile id, measurement date) references.
+
+        :param tile_ids: [tile ID as a string]
+        :param measurement_times: [measurement time as a string], one per tile ID
+        :param fsc_rlie_job_object: FscRlieJob()
+        :param logger_func: logger.debug or logger.info or ...
+        :param set_timeout: [Boolean] to notify if a timeout should be set on the request
+        '''
+
+        if not tile_ids:
+            return []
+
+        # Get the FSC/RLIE jobs
+        fsc_rlie_jobs = StoredProcedure.call(
+            response_type_instance=fsc_rlie_job_object,
+            procedure_name='fsc_rlie_jobs_with_tile_dates',
+            tile_ids_ref=tile_ids,
+            measurement_times=measurement_times,
+            set_timeout=set_timeout,
+            logger_func=logger_func)
+
+        if fsc_rlie_jobs:
+            # Get the parent jobs
+            parent_jobs = StoredProcedure.call(
+                response_type_instance=ParentJob(),
+                procedure_name='parent_jobs_with_ids',
+                parent_job_ids=[j.fk_parent_job_id for j in fsc_rlie_jobs],
+                set_timeout=set_timeout,
+                logger_func=logger_func)
+
+            # Join results
+            StoredProcedure.join(fsc_rlie_jobs, parent_jobs)
+
+        return fsc_rlie_jobs
+
     @staticmethod
     def get_last_job_with_usable_l2a(
         tile_id, high_measurement_time_bound, high_esa_time_bound, l1c_id,
@@ -455,6 +521,84 @@ class StoredProcedure(RestDatabase):
 
         return fsc_rlie_jobs
 
+    class LastJobWithUsableL2a(RestDatabase):
+        '''returns table (ref_index bigint, job_id bigint)'''
+
+        def __init__(self):
+            self.ref_index = None
+            self.job_id = None
+
+            # Call the parent constructor AFTER all the attributes are initialized
+            super().__init__()
+
+    @staticmethod
+    def get_last_jobs_with_usable_l2a(
+        tile_ids, high_measurement_time_bounds, high_esa_time_bounds, l1c_ids,
+        allow_codated_jobs, backward_triggered_jobs, fsc_rlie_job_object, logger_func, set_timeout=True):
+        '''
+        Batch version of get_last_job_with_usable_l2a: the references are given
+        as lists of the same length, one element per job to find.
+
+        :param tile_ids: [tile ID as a string]
+        :param high_measurement_time_bounds: [Datetime object]
+        :param high_esa_time_bounds: [Datetime object]
+        :param l1c_ids: [L1C ID as a string]
+        :param allow_codated_jobs: Boolean, to allow taking as a reference an older 
+            codated version of the current job L1C
+        :param backward_triggered_jobs: [Boolean], to identify if the current jobs have 
+            been triggered by a backward reprocessing or not
+        :param fsc_rlie_job_object: FscRlieJob()
+        :param logger_func: logger.debug or logger.info or ...
+        :param set_timeout: [Boolean] to notify if a timeout should be set on the request
+        :return: list of FSC/RLIE jobs (or None if no job was found), one element per reference
+        '''
+
+        if not tile_ids:
+            return []
+
+        # Get the FSC/RLIE job IDs for each reference
+        last_jobs = StoredProcedure.call(
+            response_type_instance=StoredProcedure.LastJobWithUsableL2a(),
+            procedure_name='get_last_jobs_with_usable_l2a',
+            tile_ids_ref=tile_ids,
+            high_measurement_time_bounds=high_measurement_time_bounds,
+            high_esa_time_bounds=high_esa_time_bounds,
+            l1c_ids_ref=l1c_ids,
+            allow_codated_jobs=allow_codated_jobs,
+            backward_triggered_jobs=backward_triggered_jobs,
+            set_timeout=set_timeout,
+            logger_func=logger_func)
+
+        fsc_rlie_jobs = []
+        job_ids = list({last_job.job_id for last_job in last_jobs})
+        if job_ids:
+            # Get the FSC/RLIE jobs
+            fsc_rlie_jobs = StoredProcedure.call(
+                response_type_instance=fsc_rlie_job_object,
+                procedure_name='fsc_rlie_jobs_with_ids',
+                job_ids=job_ids,
+                set_timeout=set_timeout,
+                logger_func=logger_func)
+
+            # Get the parent jobs
+            parent_jobs = StoredProcedure.call(
+                response_type_instance=ParentJob(),
+                procedure_name='parent_jobs_with_ids',
+                parent_job_ids=[j.fk_parent_job_id for j in fsc_rlie_jobs],
+                set_timeout=set_timeout,
+                logger_func=logger_func)
+
+            # Join results
+            StoredProcedure.join(fsc_rlie_jobs, parent_jobs)
+
+        # Dispatch the jobs, reference indexes start at 1
+        fsc_rlie_jobs = {j.id: j for j in fsc_rlie_jobs}
+        results = [None] * len(tile_ids)
+        for last_job in last_jobs:
+            results[last_job.ref_index - 1] = fsc_rlie_jobs.get(last_job.job_id)
+
+        return results
+
     @staticmethod
     def fsc_rlie_jobs_following_measurement_with_tile_id(tile_id, low_measurement_time_bound, 
             low_l1c_esa_creation_time_bound, results_limit, fsc_rlie_job_object, logger_func, set_timeout=True):
@@ -499,6 +643,86 @@ class StoredProcedure(RestDatabase):
 
         return fsc_rlie_jobs
 
+    class BackwardCandidateJob(RestDatabase):
+        '''returns table (ref_index bigint, job_id bigint)'''
+
+        def __init__(self):
+            self.ref_index = None
+            self.job_id = None
+
+            # Call the parent constructor AFTER all the attributes are initialized
+            super().__init__()
+
+    @staticmethod
+    def fsc_rlie_backward_candidates_with_tile_ids(tile_ids, low_measurement_time_bounds,
+            low_l1c_esa_creation_time_bounds, results_limit, candidates_limit,
+            fsc_rlie_job_object, logger_func, set_timeout=True):
+        '''
+        Batch version of fsc_rlie_jobs_following_measurement_with_tile_id,
+        restricted to the jobs which can be used to run a MAJA backward: with
+        a degraded quality, which generated a L2A and were not reprocessed yet.
+        The references are given as lists of the same length, one element per
+        job to find the candidates of.
+
+        :param tile_ids: [tile ID as a string]
+        :param low_measurement_time_bounds: [Datetime object], jobs measurement dates
+        :param low_l1c_esa_creation_time_bounds: [Datetime object], jobs L1C esa creation dates
+        :param results_limit: integer, number of following jobs among which candidates are searched
+        :param candidates_limit: integer, max number of candidates per reference
+        :param fsc_rlie_job_object: FscRlieJob()
+        :param logger_func: logger.debug or logger.info or ...
+        :param set_timeout: [Boolean] to notify if a timeout should be set on the request
+        :return: list of FSC/RLIE jobs lists, with ascending measurement dates, one element per reference
+        '''
+
+        if not tile_ids:
+            return []
+
+        # Get the FSC/RLIE job IDs for each reference
+        candidates = StoredProcedure.call(
+            response_type_instance=StoredProcedure.BackwardCandidateJob(),
+            procedure_name='fsc_rlie_backward_candidates_with_tile_ids',
+            tile_ids_ref=tile_ids,
+            low_measurement_time_bounds=low_measurement_time_bounds,
+            low_l1c_esa_creation_time_bounds=low_l1c_esa_creation_time_bounds,
+            results_limit=results_limit,
+            candidates_limit=candidates_limit,
+            set_timeout=set_timeout,
+            logger_func=logger_func)
+
+        fsc_rlie_jobs = []
+        job_ids = list({candidate.job_id for candidate in candidates})
+        if job_ids:
+            # Get the FSC/RLIE jobs
+            fsc_rlie_jobs = StoredProcedure.call(
+                response_type_instance=fsc_rlie_job_object,
+                procedure_name='fsc_rlie_jobs_with_ids',
+                job_ids=job_ids,
+                set_timeout=set_timeout,
+                logger_func=logger_func)
+
+            # Get the parent jobs
+            parent_jobs = StoredProcedure.call(
+                response_type_instance=ParentJob(),
+                procedure_name='parent_jobs_with_ids',
+                parent_job_ids=[j.fk_parent_job_id for j in fsc_rlie_jobs],
+                set_timeout=set_timeout,
+                logger_func=logger_func)
+
+            # Join results
+            StoredProcedure.join(fsc_rlie_jobs, parent_jobs)
+
+        # Dispatch the jobs, reference indexes start at 1
+        fsc_rlie_jobs = {j.id: j for j in fsc_rlie_jobs}
+        results = [[] for _ in tile_ids]
+        for candidate in candidates:
+            if candidate.job_id in fsc_rlie_jobs:
+                results[candidate.ref_index - 1].append(fsc_rlie_jobs[candidate.job_id])
+        for candidate_jobs in results:
+            candidate_jobs.sort(key=lambda job: job.measurement_date)
+
+        return results
+
     @staticmethod
     def fsc_rlie_job_last_init_with_tile_id_no_backward(tile_id, high_time_bound, 
             fsc_rlie_job_object, logger_func, set_timeout=True):
@@ -0,0 +1,159 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+from contextlib import contextmanager
+from logging import Logger
+
+from .exceptions import CsiInternalError
+from .s3_util import S3Util
+
+
+class AuxCacheUtil(object):
+    '''
+    Node-level cache of the auxiliary files (DEM, masks, static archives...)
+    downloaded from S3 by the workers.
+
+    The cached files are keyed by endpoint, bucket path and ETag, so that a
+    modified object is downloaded again. They are shared by all the jobs run
+    on the same machine and hard linked into the job directories (or copied
+    if the job directory is on another file system). The cache size is bounded
+    and the least recently used files are evicted first.
+
+    As the hard links share the cached file inode, the files got through the
+    cache must never be opened for update (e.g. GDAL update mode, append or
+    in-place write) by a job: the modification would corrupt the cached file
+    for all the next jobs. The read-only mode set on the cached files doesn't
+    prevent it for jobs run as root. Files a job may modify must be downloaded
+    without the cache.
+
+    The cache is disabled if the CSI_AUX_CACHE_DIR environment variable is not
+    set or empty.
+    '''
+
+    CACHE_DIR = os.getenv('CSI_AUX_CACHE_DIR', '')
+    MAX_SIZE_BYTES = int(float(os.getenv('CSI_AUX_CACHE_MAX_SIZE_GB', '20')) * 1024**3)
+
+    # Lock file used for the eviction, the cache files are locked one by one
+    # while they are downloaded.
+    LOCK_FILE = '.lock'
+    LOCK_SUFFIX = '.lock'
+    PART_SUFFIX = '.part'
+
+    def __init__(self, cache_dir: str = None, max_size_bytes: int = None):
+        self.cache_dir = AuxCacheUtil.CACHE_DIR if cache_dir is None else cache_dir
+        self.max_size_bytes = (
+            AuxCacheUtil.MAX_SIZE_BYTES if max_size_bytes is None else max_size_bytes)
+
+    def is_enabled(self) -> bool:
+        return bool(self.cache_dir)
+
+    @contextmanager
+    def lock(self, lock_file_path: str):
+        '''Exclusive lock shared by all the processes of the machine.'''
+        with open(lock_file_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def cache_file_path(self, endpoint_url: str, bucket: str, object_in_bucket: str, etag: str) -> str:
+        '''Path of the cached file for an object version.'''
+        key = hashlib.sha256(
+            f'{endpoint_url}/{bucket}/{object_in_bucket}/{etag}'.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f'{key}_{os.path.basename(object_in_bucket)}')
+
+    def download_file_from_bucket(
+        self, s3_resource, bucket: str, object_in_bucket: str, local_file_name: str, logger: Logger = None
+    ):
+        '''
+        Download a file stored on an S3 endpoint storage through the cache.
+        The local file is shared with the cache and must never be opened for update.
+
+        :param s3_resource: s3 resource object.
+        :param bucket: name of the bucket in the s3 endpoint storage.
+        :param object_in_bucket: path leading to the object to download in the bucket.
+        :param local_file_name: path under which will be saved the downloaded file.
+        :param logger: logger object used to display messages.
+        '''
+
+        if not self.is_enabled():
+            S3Util.download_file_from_bucket(
+                s3_resource, bucket, object_in_bucket, local_file_name)
+            return
+
+        s3_client = s3_resource.meta.client
+        S3Util.check_bucket(s3_resource, bucket)
+        s3_object = S3Util.head_object(s3_resource, bucket, object_in_bucket)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_file = self.cache_file_path(
+            s3_client.meta.endpoint_url, bucket, object_in_bucket, s3_object.e_tag)
+
+        with self.lock(cache_file + AuxCacheUtil.LOCK_SUFFIX):
+            if os.path.isfile(cache_file):
+                if logger:
+                    logger.info(f'auxiliary file {object_in_bucket} found in cache')
+            else:
+                if logger:
+                    logger.info(f'auxiliary file {object_in_bucket} not in cache, downloading')
+                # Download in a temporary file so that an interrupted download
+                # never leaves a partial cache file.
+                file_descriptor, part_file = tempfile.mkstemp(
+                    dir=self.cache_dir, suffix=AuxCacheUtil.PART_SUFFIX)
+                os.close(file_descriptor)
+                try:
+                    S3Util.transfer_download(s3_client, bucket, object_in_bucket, part_file)
+                    # Cached files are shared by hard links, prevent their
+                    # accidental modification from a job directory (not
+                    # effective for jobs run as root).
+                    os.chmod(part_file, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+                    os.replace(part_file, cache_file)
+                finally:
+                    if os.path.exists(part_file):
+                        os.remove(part_file)
+            # Last use time, for the LRU eviction
+            os.utime(cache_file)
+            self.link_to(cache_file, local_file_name)
+
+        self.evict()
+
+    def link_to(self, cache_file: str, local_file_name: str):
+        '''Hard link (or copy if not possible) a cached file into a job directory.'''
+        if os.path.isdir(local_file_name):
+            raise CsiInternalError(
+                'File write error',
+                f'could not write the cached file because the target is a directory "{local_file_name}"')
+        if os.path.lexists(local_file_name):
+            os.remove(local_file_name)
+        try:
+            os.link(cache_file, local_file_name)
+        except OSError:
+            shutil.copyfile(cache_file, local_file_name)
+
+    def evict(self):
+        '''Remove the least recently used files until the cache size is below the maximum.'''
+        with self.lock(os.path.join(self.cache_dir, AuxCacheUtil.LOCK_FILE)):
+            cache_files = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(AuxCacheUtil.LOCK_SUFFIX) or name.endswith(AuxCacheUtil.PART_SUFFIX):
+                    continue
+                file_path = os.path.join(self.cache_dir, name)
+                try:
+                    file_stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                cache_files.append((file_stat.st_mtime, file_stat.st_size, file_path))
+
+            cache_size = sum(size for _, size, _ in cache_files)
+            for _, size, file_path in sorted(cache_files):
+                if cache_size <= self.max_size_bytes:
+                    break
+                # Don't remove a file while it is being linked
+                with self.lock(file_path + AuxCacheUtil.LOCK_SUFFIX):
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                    os.remove(file_path + AuxCacheUtil.LOCK_SUFFIX)
+                cache_size -= size
@@ -1,3 +1,5 @@
+import os
+import tempfile
 import time
 import urllib3
 import json
@@ -9,7 +11,7 @@ from requests import exceptions
 
 from .rest_util import RestUtil
 from .request_util import RequestUtil
-from .exceptions import CsiInternalError
+from .exceptions import CsiExternalError, CsiInternalError
 from .log_util import temp_logger
 from .xml_util import XmlUtil
 from .datetime_util import DatetimeUtil
@@ -85,6 +87,17 @@ class CreodiasUtil(RequestUtil):
 
     HTTP_CRITICAL_ERROR = [400, 409, 429]
 
+    # Fields parsed from the S1 manifest.safe files
+    S1Manifest = namedtuple('S1Manifest', ['sliceNumber', 'totalSlices'])
+
+    # On-disk cache of the fields parsed from the S1 manifests, keyed by
+    # product ID (manifests never change), and max number of cached products.
+    # The cache is disabled if the directory is empty.
+    MANIFEST_CACHE_DIR = os.getenv(
+        'CSI_S1_MANIFEST_CACHE_DIR',
+        os.path.join(tempfile.gettempdir(), 'csi_s1_manifest_cache'))
+    MANIFEST_CACHE_MAX_FILES = int(os.getenv('CSI_S1_MANIFEST_CACHE_MAX_FILES', '20000'))
+
     def __init__(self):
         self.mission_type = None
 
@@ -296,10 +309,14 @@ class CreodiasUtil(RequestUtil):
 
         # Read each feature
         for feature_index, feature in enumerate(features):
-            feature_read = self.read_input_product_feature(json_list, feature, feature_index, get_manifest=get_manifest)
+            feature_read = self.read_input_product_feature(json_list, feature, feature_index, get_manifest=False)
             if feature_read is not None:
                 products.append(feature_read)
 
+        # Retrieve the manifests of all the S1 products at once
+        if get_manifest:
+            products = self.set_s1_manifests(products, logger=logger)
+
         # Return the Sentinel products
         return products
 
@@ -352,42 +369,138 @@ class CreodiasUtil(RequestUtil):
             for key in mtd_key_list:
                 mtd_info_list.append(read(key))
             s1_metadata = S1Metadata._make(mtd_info_list)
-            manifest_url = None
 
+            product = Sentinel1Product(product_path, dias_publication_date, s1_metadata)
             if get_manifest:
-                # Now we need to retrieve the manifest content
-                if s1_metadata.thumbnail is not None:
-
-                    manifest_url = s1_metadata.thumbnail.split('.SAFE/')[0] + ".SAFE/manifest.safe"
-                elif s1_metadata.productIdentifier is not None:
-                    manifest_url = s1_metadata.productIdentifier.replace("/eodata", "https://finder.creodias.eu/files") + "/manifest.safe"
-                
-                if manifest_url is not None:
-                    response = CreodiasUtil()._multiprocessed_function_with_timeout(
-                        CreodiasUtil()._request_page, [manifest_url])[0]  
-
-                    # Check if the request response can be decoded
-                    if response is not None:
-                        manifest_root = ElementTree.fromstring(response.content)
-
-                        # XML namespaces
-                        ns = XmlUtil.namespace(response.content)
-                        # list to parse any manifest fields and get them in the object
-                        manifest_key_list = ['sliceNumber',
-                                            'totalSlices']
-                        S1Manifest = namedtuple('S1Manifest', manifest_key_list)
-                        manifest_info_list = []
-                        for key in manifest_key_list:
-                            element = './/s1sarl1:' + key
-                            manifest_info_list.append(manifest_root.find(element, ns).text)
-                        s1_manifest = S1Manifest._make(manifest_info_list)
-                else:
-                    return product
+                products = CreodiasUtil().set_s1_manifests([product])
+                product = products[0] if products else None
+        return product
+
+
+    @staticmethod
+    def s1_manifest_url(s1_product):
+        '''Return the URL of the manifest.safe of a S1 product, or None if unknown.'''
+
+        s1_metadata = s1_product.other_metadata
+        if s1_metadata.thumbnail is not None:
+            return s1_metadata.thumbnail.split('.SAFE/')[0] + ".SAFE/manifest.safe"
+        elif s1_metadata.productIdentifier is not None:
+            return s1_metadata.productIdentifier.replace("/eodata", "https://finder.creodias.eu/files") + "/manifest.safe"
+        return None
+
+    @staticmethod
+    def parse_s1_manifest(content):
+        '''Parse the fields of a S1 manifest.safe content.'''
+
+        manifest_root = ElementTree.fromstring(content)
+
+        # XML namespaces
+        ns = XmlUtil.namespace(content)
+        manifest_info_list = []
+        for key in CreodiasUtil.S1Manifest._fields:
+            element = './/s1sarl1:' + key
+            manifest_info_list.append(manifest_root.find(element, ns).text)
+        return CreodiasUtil.S1Manifest._make(manifest_info_list)
+
+    def set_s1_manifests(self, products, logger=None):
+        '''
+        Set the manifest fields of the S1 products. The manifests which are
+        not cached are downloaded simultaneously.
+
+        :param products: list of Sentinel-1|2 products, the Sentinel-2 ones are kept as is.
+        :param logger: logger object used to display messages.
+        :return: the products, without the S1 products whose manifest URL is unknown.
+        '''
+
+        # Products to keep, and S1 products whose manifest is not cached
+        kept_products = []
+        to_download = []
+        for product in products:
+            if not isinstance(product, Sentinel1Product):
+                kept_products.append(product)
+                continue
+
+            manifest_url = CreodiasUtil.s1_manifest_url(product)
+            if manifest_url is None:
+                continue
+            kept_products.append(product)
+
+            manifest = self.read_cached_s1_manifest(product.product_id)
+            if manifest is not None:
+                product.manifest = manifest
             else:
-                s1_manifest = None
+                to_download.append((product, manifest_url))
 
-            product = Sentinel1Product(product_path, dias_publication_date, s1_metadata, manifest=s1_manifest)
-        return product
+        if logger and to_download:
+            logger.debug('Download %d S1 manifests (%d cached)' % (
+                len(to_download), len(kept_products) - len(to_download)))
+
+        # Download the manifests simultaneously, with the shared HTTP session
+        responses = self._threaded_function_with_timeout(
+            self._request_page, [manifest_url for _, manifest_url in to_download])
+
+        for (product, manifest_url), response in zip(to_download, responses):
+            if response is None:
+                raise CsiExternalError(
+                    "Creodias Manifest Error",
+                    f"Couldn't retrieve S1 manifest '{manifest_url}'")
+            product.manifest = CreodiasUtil.parse_s1_manifest(response.content)
+            self.write_cached_s1_manifest(product.product_id, product.manifest)
+
+        if to_download:
+            self.evict_cached_s1_manifests()
+
+        return kept_products
+
+    @staticmethod
+    def cached_s1_manifest_path(product_id):
+        '''Path of the cached manifest fields of a S1 product.'''
+        return os.path.join(CreodiasUtil.MANIFEST_CACHE_DIR, os.path.basename(product_id) + '.json')
+
+    def read_cached_s1_manifest(self, product_id):
+        '''Return the cached manifest fields of a S1 product, or None if not cached.'''
+
+        if not CreodiasUtil.MANIFEST_CACHE_DIR:
+            return None
+        try:
+            with open(CreodiasUtil.cached_s1_manifest_path(product_id), 'r') as cache_file:
+                return CreodiasUtil.S1Manifest(**json.load(cache_file))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def write_cached_s1_manifest(self, product_id, manifest):
+        '''Cache the manifest fields of a S1 product. Failures are only logged.'''
+
+        if not CreodiasUtil.MANIFEST_CACHE_DIR:
+            return
+        try:
+            os.makedirs(CreodiasUtil.MANIFEST_CACHE_DIR, exist_ok=True)
+            # Write in a temporary file first so that concurrent processes
+            # never read a partial file.
+            file_descriptor, part_file = tempfile.mkstemp(
+                dir=CreodiasUtil.MANIFEST_CACHE_DIR, suffix='.part')
+            with os.fdopen(file_descriptor, 'w') as cache_file:
+                json.dump(manifest._asdict(), cache_file)
+            os.replace(part_file, CreodiasUtil.cached_s1_manifest_path(product_id))
+        except OSError as exception:
+            temp_logger.warning(f"Couldn't cache S1 manifest of '{product_id}' : {exception}")
+
+    def evict_cached_s1_manifests(self):
+        '''Remove the oldest cached manifests above the max number of cached products.'''
+
+        if not CreodiasUtil.MANIFEST_CACHE_DIR:
+            return
+        try:
+            cache_files = [
+                entry for entry in os.scandir(CreodiasUtil.MANIFEST_CACHE_DIR)
+                if entry.name.endswith('.json')]
+            if len(cache_files) <= CreodiasUtil.MANIFEST_CACHE_MAX_FILES:
+                return
+            cache_files.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in cache_files[:len(cache_files) - CreodiasUtil.MANIFEST_CACHE_MAX_FILES]:
+                os.remove(entry.path)
+        except OSError as exception:
+            temp_logger.warning(f"Couldn't evict cached S1 manifests : {exception}")
 
 
     @staticmethod
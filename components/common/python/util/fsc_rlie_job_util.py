@@ -56,6 +56,12 @@ class FscRlieJobUtil(object):
     #  operator for e.g. debugging jobs.
     __FSC_RLIE_LOG_LEVEL = None
 
+    # Number of following jobs among which the MAJA backward candidates are
+    #  searched (arbitrary number to ensure that we get all the degraded jobs),
+    #  and max number of degraded jobs used for a backward.
+    BACKWARD_FOLLOWING_JOBS_LIMIT = 1000
+    BACKWARD_CANDIDATES_LIMIT = 7
+
 
     @staticmethod
     def read_config_file():
@@ -110,7 +116,84 @@ class FscRlieJobUtil(object):
         return previous_job
 
     @staticmethod
-    def set_maja_mode(job, fsc_rlie_job_class, logger_func=None):
+    def find_previous_temporal_jobs_no_l2a_restriction(jobs, fsc_rlie_job_object, allow_codated_jobs=False, logger_func=None, chunk_size=500):
+        '''
+        Batch version of find_previous_temporal_job_no_l2a_restriction, the
+        previous temporal jobs being retrieved with one stored procedure call
+        per chunk of jobs.
+
+        :param jobs: job instances for which we want to find the previous temporal job.
+        :param fsc_rlie_job_object: FscRlieJob().
+        :param allow_codated_jobs: boolean, to notify if codated jobs can be returned.
+        :param logger_func: logger instance.
+        :param chunk_size: max number of jobs per stored procedure call.
+        :return: dictionary {job.id: previous temporal job, or None}.
+        '''
+
+        previous_jobs = {}
+        for start in range(0, len(jobs), chunk_size):
+            chunk = jobs[start:start + chunk_size]
+            chunk_previous_jobs = StoredProcedure.get_last_jobs_with_usable_l2a(
+                [job.tile_id for job in chunk],
+                [job.measurement_date.strftime('%Y-%m-%dT%H:%M:%S') for job in chunk],
+                [job.l1c_esa_creation_date.strftime('%Y-%m-%dT%H:%M:%S') for job in chunk],
+                [job.l1c_id for job in chunk],
+                allow_codated_jobs=allow_codated_jobs,
+                backward_triggered_jobs=[job.reprocessing_context == "backward" for job in chunk],
+                fsc_rlie_job_object=fsc_rlie_job_object,
+                logger_func=logger_func.debug
+                )
+
+            # Same filter as find_previous_temporal_job_no_l2a_restriction
+            for job, previous_job in zip(chunk, chunk_previous_jobs):
+                if previous_job is not None and previous_job.measurement_date >= job.measurement_date:
+                    previous_job = None
+                previous_jobs[job.id] = previous_job
+
+        return previous_jobs
+
+    @staticmethod
+    def find_backward_candidate_jobs(jobs, previous_temporal_jobs, fsc_rlie_job_object, logger_func=None, chunk_size=500):
+        '''
+        Batch retrieval of the jobs that is_backward_available checks, for the
+        jobs which set_maja_mode can't run with MAJA 'nominal' mode given their
+        previous temporal job, with one stored procedure call per chunk of jobs.
+
+        :param jobs: job instances for which we want to find the backward candidates.
+        :param previous_temporal_jobs: dictionary {job.id: previous temporal job}
+            returned by find_previous_temporal_jobs_no_l2a_restriction.
+        :param fsc_rlie_job_object: FscRlieJob().
+        :param logger_func: logger instance.
+        :param chunk_size: max number of jobs per stored procedure call.
+        :return: dictionary {job.id: list of candidate jobs}, to be passed to set_maja_mode.
+        '''
+
+        jobs = [
+            job for job in jobs
+            if job.maja_mode is None
+            and job.id in previous_temporal_jobs
+            and not FscRlieJobUtil.is_nominal_mode_available(previous_temporal_jobs[job.id], job)
+            ]
+
+        candidate_jobs = {}
+        for start in range(0, len(jobs), chunk_size):
+            chunk = jobs[start:start + chunk_size]
+            chunk_candidate_jobs = StoredProcedure.fsc_rlie_backward_candidates_with_tile_ids(
+                [job.tile_id for job in chunk],
+                [job.measurement_date.strftime('%Y-%m-%dT%H:%M:%S') for job in chunk],
+                [job.l1c_esa_creation_date.strftime('%Y-%m-%dT%H:%M:%S') for job in chunk],
+                results_limit=FscRlieJobUtil.BACKWARD_FOLLOWING_JOBS_LIMIT,
+                candidates_limit=FscRlieJobUtil.BACKWARD_CANDIDATES_LIMIT,
+                fsc_rlie_job_object=fsc_rlie_job_object,
+                logger_func=logger_func.debug
+                )
+            for job, job_candidates in zip(chunk, chunk_candidate_jobs):
+                candidate_jobs[job.id] = job_candidates
+
+        return candidate_jobs
+
+    @staticmethod
+    def set_maja_mode(job, fsc_rlie_job_class, logger_func=None, previous_temporal_jobs=None, backward_candidate_jobs=None):
         '''
         Check Database to define which MAJA mode the job should run with :
             - Init : no recent product is available and we don't have data for backward.
@@ -120,6 +203,11 @@ class FscRlieJobUtil(object):
         :param job: job instance for which we want to set the MAJA mode.
         :param fsc_rlie_job_class: FscRlieJob.
         :param logger_func: logger instance.
+        :param previous_temporal_jobs: dictionary {job.id: previous temporal job}
+            already retrieved, the database is requested if the job is missing.
+        :param backward_candidate_jobs: dictionary {job.id: list of candidate jobs}
+            retrieved by find_backward_candidate_jobs, the database is requested
+            if the job is missing.
         '''
 
         # Not overwritting MAJA mode if already set
@@ -139,21 +227,17 @@ class FscRlieJobUtil(object):
         # Find the most recent job which produced a valid L2A. At this stage all
         # previous jobs focusing on the same tile should be done as we set MAJA
         # mode once configuration dependencies are completed.
-        last_l2a_valid_job = FscRlieJobUtil.find_previous_temporal_job_no_l2a_restriction(
-            job,
-            fsc_rlie_job_class(),
-            allow_codated_jobs=False,
-            logger_func=logger_func
-            )
+        if previous_temporal_jobs is not None and job.id in previous_temporal_jobs:
+            last_l2a_valid_job = previous_temporal_jobs[job.id]
+        else:
+            last_l2a_valid_job = FscRlieJobUtil.find_previous_temporal_job_no_l2a_restriction(
+                job,
+                fsc_rlie_job_class(),
+                allow_codated_jobs=False,
+                logger_func=logger_func
+                )
 
-        # Check if dependent job exists,
-        # if it's consecutive to the job to configure,
-        # and if its L2A product is available
-        if (
-            last_l2a_valid_job
-            and FscRlieJobUtil.are_jobs_consecutives(last_l2a_valid_job, job)
-            and FscRlieJobUtil.l2a_product_exists(last_l2a_valid_job)
-            ):
+        if FscRlieJobUtil.is_nominal_mode_available(last_l2a_valid_job, job):
             # Conditions verified -> configure job to run it with MAJA 'nominal' mode
             job.maja_mode = MajaMode.nominal
             job.job_id_for_last_valid_l2a = last_l2a_valid_job.id
@@ -164,7 +248,8 @@ class FscRlieJobUtil(object):
         else:
             # Try to retreive jobs that could be used to run a "backward" mode
             backward_required_jobs = FscRlieJobUtil.is_backward_available(
-                job, fsc_rlie_job_class(), logger_func)
+                job, fsc_rlie_job_class(), logger_func,
+                following_jobs=(backward_candidate_jobs or {}).get(job.id))
 
             # Check if enough data are available to run a "backward"
             if backward_required_jobs and activate_backward_reprocessing:
@@ -199,6 +284,24 @@ class FscRlieJobUtil(object):
             FscRlieJobUtil.reprocess_with_backward(job, fsc_rlie_job_class, logger_func)
 
 
+    @staticmethod
+    def is_nominal_mode_available(last_l2a_valid_job, job):
+        '''
+        Check if a job can be run with MAJA 'nominal' mode : if the dependent
+        job exists, if it's consecutive to the job to configure, and if its L2A
+        product is available.
+
+        :param last_l2a_valid_job: most recent job which produced a valid L2A, or None.
+        :param job: job instance.
+        '''
+
+        return bool(
+            last_l2a_valid_job
+            and FscRlieJobUtil.are_jobs_consecutives(last_l2a_valid_job, job)
+            and FscRlieJobUtil.l2a_product_exists(last_l2a_valid_job)
+            )
+
+
     @staticmethod
     def are_jobs_consecutives(previous_job, job):
         '''
@@ -226,7 +329,7 @@ class FscRlieJobUtil(object):
 
 
     @staticmethod
-    def is_backward_available(job, fsc_rlie_job_object, logger_func=None):
+    def is_backward_available(job, fsc_rlie_job_object, logger_func=None, following_jobs=None):
         '''
         Check if enough jobs have been processed to be able to process selected
         job with BACKWARD mode.
@@ -236,6 +339,8 @@ class FscRlieJobUtil(object):
         :param job: job instance for which we want to check if Backward is available.
         :param fsc_rlie_job_object: FscRlieJob().
         :param logger_func: logger instance.
+        :param following_jobs: jobs following the selected one already retrieved
+            (see find_backward_candidate_jobs), the database is requested if None.
         '''
 
         # Number of job data (L1C) required by MAJA to be able to run a
@@ -245,14 +350,17 @@ class FscRlieJobUtil(object):
 
         # Call stored procedure to retreive closest jobs, with measurement
         #  date more recent than the current job, and focusing on the same tile
-        init_following_jobs = StoredProcedure.fsc_rlie_jobs_following_measurement_with_tile_id(
-            job.tile_id,
-            job.measurement_date.strftime('%Y-%m-%dT%H:%M:%S'),
-            job.l1c_esa_creation_date.strftime('%Y-%m-%dT%H:%M:%S'),
-            results_limit=1000, # arbitrary nuber to ensure that we get all the degraded jobs
-            fsc_rlie_job_object=fsc_rlie_job_object,
-            logger_func=logger_func.debug
-            )
+        if following_jobs is not None:
+            init_following_jobs = following_jobs
+        else:
+            init_following_jobs = StoredProcedure.fsc_rlie_jobs_following_measurement_with_tile_id(
+                job.tile_id,
+                job.measurement_date.strftime('%Y-%m-%dT%H:%M:%S'),
+                job.l1c_esa_creation_date.strftime('%Y-%m-%dT%H:%M:%S'),
+                results_limit=FscRlieJobUtil.BACKWARD_FOLLOWING_JOBS_LIMIT,
+                fsc_rlie_job_object=fsc_rlie_job_object,
+                logger_func=logger_func.debug
+                )
 
         # Keep only the jobs with degraded quality, which generated a L2A,
         # and which did not get reprocessed yet.
@@ -269,8 +377,8 @@ class FscRlieJobUtil(object):
         # There should be 7 degraded jobs for each backward, so if the list
         # is longer, as the jobs are ordered with ascending measurement date,
         # we only keep the 7 first jobs.
-        if len(backward_required_jobs) > 7:
-            backward_required_jobs = backward_required_jobs[:7]
+        if len(backward_required_jobs) > FscRlieJobUtil.BACKWARD_CANDIDATES_LIMIT:
+            backward_required_jobs = backward_required_jobs[:FscRlieJobUtil.BACKWARD_CANDIDATES_LIMIT]
 
         if len(backward_required_jobs) == (
             maja_backward_required_job_number - 1
@@ -610,7 +718,7 @@ class FscRlieJobUtil(object):
 
 
     @staticmethod
-    def get_unique_jobs(jobs, last_inserted_job, fsc_rlie_job_class, internal_database_parallel_request, logger):
+    def get_unique_jobs(jobs, last_inserted_job, fsc_rlie_job_class, internal_database_parallel_request, logger, chunk_size=500):
         '''
         Keep only the jobs that do not already exist in the database.
 
@@ -620,41 +728,23 @@ class FscRlieJobUtil(object):
         :param internal_database_parallel_request: number of requests to the
             database that can be done in parallel.
         :param logger_func: Logger instance.
+        :param chunk_size: max number of jobs tested per database request.
         '''
 
         if not jobs:
             return []
 
-        # Send Get requests to the database to find the existing jobs,
-        # based on their tile ID and measurement_date.
+        # Jobs are compared on their tile ID and measurement date, or "strictly"
+        # on their input product ID.
         # Maybe we should use a more complex condition, e.g. ID + publication date.
-        def is_same(job1, job2, strictly=False):
-            if (job1 is None) and (job2 is None):
-                return True
-            elif (job1 is None) or (job2 is None):
-                return False
-            else:
-                if strictly:
-                    return job1.get_input_product_id() == job2.get_input_product_id()
-                else:
-                    return (
-                        job1.tile_id == job2.tile_id
-                        and (job1.measurement_date.replace(tzinfo=None) 
-                            == job2.measurement_date.replace(tzinfo=None))
-                    )
+        def tile_date_key(job):
+            return (job.tile_id, job.measurement_date.replace(tzinfo=None))
 
-        def contains(jobs, job1, strictly=False):
-            return any(is_same(job1, job2, strictly) for job2 in jobs)
-
-
-        # We split the ID list into smaller lists so the sent URL is not too long.
-        jobs_split = []
-        jobs_sub = []
-        for job in jobs:
-            if (len(jobs_sub) == 0) or (len(jobs_sub) >= 20):
-                jobs_sub = []
-                jobs_split.append([jobs_sub, logger.debug])
-            jobs_sub.append(job)
+        # Send requests to the database to find the existing jobs, based on
+        # their tile ID and measurement_date, by chunks of jobs.
+        jobs_split = [
+            [jobs[start:start + chunk_size], logger.debug]
+            for start in range(0, len(jobs), chunk_size)]
 
         # Run the multithreaded requests and wait for finish.
         pool = Pool(internal_database_parallel_request)
@@ -662,38 +752,49 @@ class FscRlieJobUtil(object):
         pool.close()
         pool.join()
 
-        # Flatten the list of lists
-        existing_jobs = list(itertools.chain.from_iterable(existing_jobs))
+        # Index the existing jobs by tile ID and measurement date, and by input
+        # product ID. The same job can be returned for several chunks.
+        existing_jobs_by_key = {}
+        existing_job_ids = set()
+        for existing_job in itertools.chain.from_iterable(existing_jobs):
+            if existing_job.id in existing_job_ids:
+                continue
+            existing_job_ids.add(existing_job.id)
+            existing_jobs_by_key.setdefault(tile_date_key(existing_job), []).append(existing_job)
+        existing_input_product_ids = {
+            existing_job.get_input_product_id()
+            for same_jobs in existing_jobs_by_key.values() for existing_job in same_jobs}
 
         # Only keep the jobs that do not already exist in the database
         # or that are re-published within 24h after their measurement.
         valid_jobs = []
+        valid_input_product_ids = set()
         for job in jobs:
+            same_existing_jobs = existing_jobs_by_key.get(tile_date_key(job), [])
             if (
-                not contains(existing_jobs, job, strictly=False)
-                and not contains(valid_jobs, job, strictly=True)
+                not same_existing_jobs
+                and job.get_input_product_id() not in valid_input_product_ids
             ):
                 valid_jobs.append(job)
+                valid_input_product_ids.add(job.get_input_product_id())
 
             # Ensure the input product has been published within 24h after its measurement
             elif (
-                not contains(existing_jobs, job, strictly=True)
+                job.get_input_product_id() not in existing_input_product_ids
                 and (job.get_input_product_dias_publication_date().replace(tzinfo=None) 
                 - job.measurement_date.replace(tzinfo=None)
                 ) <= fsc_rlie_job_class.DUPLICATE_INPUT_PRODUCT_VALID_TIME
             ):
-                for existing_job in existing_jobs:
+                for existing_job in same_existing_jobs:
                     # Ensure the input product has been re-published
                     if (
-                        is_same(job, existing_job, strictly=False)
-                        and (
-                            job.get_input_product_esa_creation_date().replace(tzinfo=None) 
-                            != existing_job.get_input_product_esa_creation_date().replace(tzinfo=None)
-                        )
+                        job.get_input_product_esa_creation_date().replace(tzinfo=None) 
+                        != existing_job.get_input_product_esa_creation_date().replace(tzinfo=None)
                     ):
                         # Only add job to the list if it's not present in it already
-                        if not contains(valid_jobs, job, strictly=True):
+                        if job.get_input_product_id() not in valid_input_product_ids:
                             valid_jobs.append(job)
+                            valid_input_product_ids.add(job.get_input_product_id())
 
                         # Update old job to notify that it's not the reference for
                         # the given input product anymore, the one we are ceating
@@ -707,10 +808,11 @@ class FscRlieJobUtil(object):
         # Do not print about the last inserted job. We know that it already exists.
         # It appears here because the date_max of the last search = the date_min of
         # the new search.
+        last_inserted_key = tile_date_key(last_inserted_job) if last_inserted_job is not None else None
         duplicate_jobs = [
             job
             for job in jobs
-            if contains(existing_jobs, job) and not is_same(job, last_inserted_job)]
+            if tile_date_key(job) in existing_jobs_by_key and tile_date_key(job) != last_inserted_key]
         if duplicate_jobs:
             logger.warning(
                 '%s jobs with the following input product IDs '\
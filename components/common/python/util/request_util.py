@@ -1,13 +1,47 @@
-from concurrent.futures import TimeoutError
-from pebble import ProcessPool, ProcessExpired
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 
 from .rest_util import RestUtil
 from .log_util import temp_logger
 
 class RequestUtil(object):
+    '''
+    Base class of the catalogue request utilities, which request several
+    pages simultaneously.
+    '''
+
     # Number of pages to request simultaneously
     PARALLEL_REQUESTS = 1
 
+    # Timeout in seconds of each page request, and max number of times the
+    # timed out pages are requested again.
+    REQUEST_TIMEOUT = float(os.getenv('CSI_CATALOGUE_REQUEST_TIMEOUT', '60'))
+    MAX_RETRY = int(os.getenv('CSI_CATALOGUE_MAX_RETRY', '5'))
+
+    # Process-wide thread pool, see executor
+    __executor = None
+    __executor_pid = None
+    __executor_lock = threading.Lock()
+
+    @staticmethod
+    def executor():
+        '''
+        Return the thread pool shared by all the catalogue requests of the
+        current process. Its threads send their requests with the pooled
+        RestUtil session, so that successive pages reuse the same connections.
+        '''
+        with RequestUtil.__executor_lock:
+            if (RequestUtil.__executor is None) or \
+                    (RequestUtil.__executor_pid != os.getpid()):
+                RequestUtil.__executor = ThreadPoolExecutor(
+                    max_workers=RestUtil.POOL_SIZE,
+                    thread_name_prefix='request_util')
+                RequestUtil.__executor_pid = os.getpid()
+            return RequestUtil.__executor
+
     def _populate_url(self, *args, **kwargs):
         raise NotImplementedError()
 
@@ -24,51 +58,54 @@ class RequestUtil(object):
             url_params = [url_params]
         # Run the multithreaded requests and wait for finish.
         # Responses from the multithreaded requests: a list of lists of resulting jobs
-        response = self._multiprocessed_function_with_timeout(self._request_page, url_params)
+        response = self._threaded_function_with_timeout(self._request_page, url_params)
         return response
 
-    def _multiprocessed_function_with_timeout(self, func, args, timeout=60, max_retry=5):
+    def _threaded_function_with_timeout(self, func, args, timeout=None, max_retry=None):
+        '''
+        Call func on each argument in the shared thread pool and return the
+        results in the same order. The calls which did not finish within
+        timeout seconds are retried, at most max_retry times.
+        '''
+        if timeout is None:
+            timeout = RequestUtil.REQUEST_TIMEOUT
+        if max_retry is None:
+            max_retry = RequestUtil.MAX_RETRY
+
+        executor = RequestUtil.executor()
         index = list(range(len(args)))
         out = [None for _ in range(len(args))]
 
         n_try = -1
         while len(args) > 0:
             n_try += 1
-            with ProcessPool() as pool:
-                future = pool.map(func, args, timeout=timeout)
-                iterator = future.result()
-                i = -1
-                failed = []
-                failed_index = []
-                while True:
-                    i += 1
-                    try:
-                        result = next(iterator)
-                        out[index[i]] = result
-                    except StopIteration:
-                        break
-                    except TimeoutError:
-                        failed.append(args[i])
-                        failed_index.append(index[i])
-                    except Exception as err:
-                        temp_logger.error(f"RequestUtil error : {err} with properties : {dir(err)}")
-                        if err.args:
-                            temp_logger.error(f"RequestUtil error args : {err.args}")
-                        if err.errno:
-                            temp_logger.error(f"RequestUtil error errno : {err.errno}")
-                        if err.exitcode:
-                            temp_logger.error(f"RequestUtil error exitcode : {err.exitcode}")
-                        if err.strerror:
-                            temp_logger.error(f"RequestUtil error strerror : {err.strerror}")
-                        if err.with_traceback:
-                            temp_logger.error(f"RequestUtil error traceback : {err.with_traceback}")
-                        raise err
-            args = failed
-            index = failed_index
+            futures = [executor.submit(func, arg) for arg in args]
+
+            # Calls are run by waves of pool size
+            waves = math.ceil(len(args) / RestUtil.POOL_SIZE)
+            deadline = time.monotonic() + timeout * waves
+
+            failed = []
+            failed_index = []
+            for i, future in enumerate(futures):
+                try:
+                    out[index[i]] = future.result(timeout=max(0, deadline - time.monotonic()))
+                except TimeoutError:
+                    # A running thread can't be stopped, but its HTTP request
+                    # is itself bounded by the timeout, see send_request.
+                    future.cancel()
+                    failed.append(args[i])
+                    failed_index.append(index[i])
+                except Exception as err:
+                    temp_logger.error(f"RequestUtil error : {err!r}")
+                    raise err
+
             if len(failed) > 0:
                 temp_logger.warning('Requests timeout [%d/%d]. Retry [%d/%d]' % (len(failed), len(args), n_try, max_retry))
+            args = failed
+            index = failed_index
 
-            if n_try >= max_retry > 0:
+            if len(args) > 0 and n_try >= max_retry > 0:
                 raise Exception('Request Error: Reached max number of retry.')
 
         return out
@@ -85,4 +122,5 @@ class RequestUtil(object):
         Check response from the Python requests module,
         Raise exception with error message if the response status is !=OK
         '''
-        return RestUtil().get(url=url, params=params, **kwargs)
\ No newline at end of file
+        kwargs.setdefault('timeout', RequestUtil.REQUEST_TIMEOUT)
+        return RestUtil().get(url=url, params=params, **kwargs)
@@ -1,4 +1,9 @@
+import os
+import threading
+
 from requests import Session, Request
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from .log_util import temp_logger
 
 
@@ -12,11 +17,65 @@ class RestUtil(object):
     # Max URL size (number of characters)
     MAX_URL_SIZE = 2000
 
+    # Shared session configuration: max number of kept-alive connections per
+    # host, number of retries on connection errors and 502/503/504 responses
+    # (only for idempotent methods), and backoff factor between retries (s).
+    POOL_SIZE = int(os.getenv('CSI_HTTP_POOL_SIZE', '20'))
+    MAX_RETRIES = int(os.getenv('CSI_HTTP_MAX_RETRIES', '3'))
+    BACKOFF_FACTOR = float(os.getenv('CSI_HTTP_BACKOFF_FACTOR', '0.5'))
+
+    # Process-wide session, see shared_session
+    __shared_session = None
+    __shared_session_pid = None
+    __shared_session_lock = threading.Lock()
+
     def __init__(self, session=None):
         if not session:
-            session = Session()
+            session = RestUtil.shared_session()
         self.session = session
 
+    @staticmethod
+    def new_session(pool_size=None, max_retries=None, backoff_factor=None):
+        '''
+        Create a new HTTP session whose connections are kept alive in a pool
+        and whose failed requests are retried with an exponential backoff.
+        '''
+        if pool_size is None:
+            pool_size = RestUtil.POOL_SIZE
+        if max_retries is None:
+            max_retries = RestUtil.MAX_RETRIES
+        if backoff_factor is None:
+            backoff_factor = RestUtil.BACKOFF_FACTOR
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False)
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry)
+        session = Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @staticmethod
+    def shared_session():
+        '''
+        Return the HTTP session shared by all the threads of the current
+        process, so that successive requests reuse the same connections.
+        A new session is created in forked child processes, as the pooled
+        sockets cannot be shared with the parent.
+        '''
+        with RestUtil.__shared_session_lock:
+            if (RestUtil.__shared_session is None) or \
+                    (RestUtil.__shared_session_pid != os.getpid()):
+                RestUtil.__shared_session = RestUtil.new_session()
+                RestUtil.__shared_session_pid = os.getpid()
+            return RestUtil.__shared_session
+
     def __prepare_request(self, **kwargs):
         '''
         Prepare request.
@@ -24,7 +83,7 @@ class RestUtil(object):
         '''
         return self.session.prepare_request(Request(**kwargs))
 
-    def __request(self, logger_func=None, return_url=False, **kwargs):
+    def __request(self, logger_func=None, return_url=False, timeout=None, **kwargs):
         '''
         Send request, check status (raise exception if status !=OK), return response.
 
@@ -36,6 +95,7 @@ class RestUtil(object):
         :param data: (dict) POST data.
         :param logger_func: logger.debug or logger.info or ...
         :param return_url: True to return the full URL (for debugging)
+        :param timeout: connection and read timeout in seconds, None to wait forever.
         :return: response or (response, full_url) if return_url is True
         '''
 
@@ -62,7 +122,7 @@ class RestUtil(object):
 
         try:
             # Send request and check response
-            response = self.session.send(request)
+            response = self.session.send(request, timeout=timeout)
             response.raise_for_status()
         except Exception as e:
             raise e
@@ -95,6 +155,13 @@ class RestUtil(object):
         '''
         return self.__request(logger_func=logger_func, method='PATCH', **kwargs)
 
+    def delete(self, logger_func=None, **kwargs):
+        '''
+        Send a Delete request.
+        :see: __request.
+        '''
+        return self.__request(logger_func=logger_func, method='DELETE', **kwargs)
+
     def format_url(self, url, params):
         '''Format and return an URL with params.'''
 
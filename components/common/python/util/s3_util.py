@@ -2,11 +2,15 @@
 # notions of Object, Key, Prefix and Delimiter. Here is a blog post explaining
 # that: https://realguess.net/2014/05/24/amazon-s3-delimiter-and-prefix/
 
+import hashlib
 import os
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
 import botocore
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from logging import Logger
 
 from .exceptions import CsiInternalError, CsiExternalError
@@ -14,6 +18,17 @@ from .exceptions import CsiInternalError, CsiExternalError
 class S3Util(object):
     '''S3 storage access utility functions'''
 
+    # Number of objects transferred concurrently by the multi-object
+    # download and upload functions, and number of threads used by boto3 to
+    # transfer the parts of a single large object.
+    TRANSFER_THREADS = int(os.getenv('CSI_S3_TRANSFER_THREADS', '8'))
+    OBJECT_TRANSFER_THREADS = int(os.getenv('CSI_S3_OBJECT_TRANSFER_THREADS', '4'))
+
+    # Transfer configuration shared by all the transfers
+    TRANSFER_CONFIG = TransferConfig(
+        max_concurrency=OBJECT_TRANSFER_THREADS,
+        use_threads=True)
+
     @staticmethod
     def get_s3(endpoint_url: str, access_key: str, secret_key: str):
         '''
@@ -30,11 +45,15 @@ class S3Util(object):
         # will have some error while trying to connect to bucket or object but the
         # message won't be clear.
 
+        # The connection pool must be large enough for all the concurrent
+        # transfers, which all use the same client.
         s3_resource = boto3.resource(
             's3',
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
-            endpoint_url=endpoint_url
+            endpoint_url=endpoint_url,
+            config=Config(
+                max_pool_connections=S3Util.TRANSFER_THREADS * S3Util.OBJECT_TRANSFER_THREADS)
             )
         return s3_resource
 
@@ -175,9 +194,31 @@ class S3Util(object):
         # exceptions and some meta info below.
         s3_client = s3_resource.meta.client
         S3Util.check_bucket(s3_resource, bucket)
+        S3Util.head_object(s3_resource, bucket, object_in_bucket)
+
+        # Everything is fine on the S3 side, we can launch the download
+        S3Util.transfer_download(s3_client, bucket, object_in_bucket, local_file_name)
+
+
+    @staticmethod
+    def head_object(s3_resource, bucket: str, object_in_bucket: str):
+        '''
+        Utility function loading the metadata (size, ETag...) of an object
+        stored on an S3 endpoint storage, raising an error if it doesn't exist.
+
+        :param s3_resource: s3 resource object.
+        :param bucket: name of the bucket in the s3 endpoint storage.
+        :param object_in_bucket: path leading to the object in the bucket.
+        :return: the loaded s3 Object.
+        '''
+
+        # We need to access to the S3 client for this resource to reference
+        # exceptions and some meta info below.
+        s3_client = s3_resource.meta.client
+        s3_object = s3_resource.Object(bucket, object_in_bucket)
         try:
             # This command will fail if object doesn't exist on the S3 bucket.
-            s3_resource.Object(bucket, object_in_bucket).load()
+            s3_object.load()
         except s3_client.exceptions.ClientError as s3_error:
             code = s3_error.response['Error']['Code']
             if code == '404':
@@ -223,11 +264,28 @@ class S3Util(object):
             # Use the 'raise e1 from e2' form to keep the trace of the error.
             raise external_error from s3_error
 
+        return s3_object
+
+
+    @staticmethod
+    def transfer_download(
+        s3_client, bucket: str, object_in_bucket: str, local_file_name: str
+    ):
+        '''
+        Utility function downloading an object with the shared transfer
+        configuration, without any check on the bucket or the object. The
+        S3 client can be shared between threads.
+
+        :param s3_client: s3 client object.
+        :param bucket: name of the bucket in the s3 endpoint storage.
+        :param object_in_bucket: path leading to the object to download in the bucket.
+        :param local_file_name: path under which will be saved the downloaded file.
+        '''
 
-        # Everything is fine on the S3 side, we can launch the download
         try:
-            s3_resource.Bucket(bucket).download_file(
-                object_in_bucket, local_file_name
+            s3_client.download_file(
+                bucket, object_in_bucket, local_file_name,
+                Config=S3Util.TRANSFER_CONFIG
                 )
         except PermissionError as error:
             message = (
@@ -258,17 +316,100 @@ class S3Util(object):
 
 
     @staticmethod
-    def compute_local_file_path(
-        s3_object: str, local_directory_name: str, objects_prefix: str = 'None', logger: Logger = None
+    def transfer_upload(
+        s3_client, bucket: str, local_file_name: str, s3_destination_filepath: str
     ):
         '''
-        Utility function computing the local path on the worker of an object 
-        stored on an S3 endpoint storage.
+        Utility function uploading a file with the shared transfer
+        configuration, without any check on the bucket. The S3 client can be
+        shared between threads.
+
+        :param s3_client: s3 client object.
+        :param bucket: name of the bucket in the s3 endpoint storage.
+        :param local_file_name: path of the input file
+        :param s3_destination_filepath: filepath to store file on bucket
+        '''
+
+        try:
+            s3_client.upload_file(
+                local_file_name, bucket, s3_destination_filepath,
+                Config=S3Util.TRANSFER_CONFIG
+                )
+        except Exception as error:
+            message = (
+                f'an unexpected error occured during the upload of '
+                f'{local_file_name} to the bucket {bucket}, raise an '
+                f'external error so that it might be tried again in case '
+                f'it is due to a temporary issue'
+            )
+            external_error = CsiExternalError('unknown S3 upload error', message)
+            # Use the 'raise e1 from e2' form to keep the trace of the error.
+            raise external_error from error
+
+
+    @staticmethod
+    def run_transfers(transfer_function, transfer_args: list):
+        '''
+        Utility function running transfers concurrently in a pool of
+        TRANSFER_THREADS threads. The first transfer error is raised once all
+        the transfers are finished.
+
+        :param transfer_function: function called for each transfer.
+        :param transfer_args: list of argument tuples, one per transfer.
+        '''
+
+        if not transfer_args:
+            return
+        max_workers = min(S3Util.TRANSFER_THREADS, len(transfer_args))
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [
+                executor.submit(transfer_function, *args)
+                for args in transfer_args
+            ]
+        for future in futures:
+            future.result()
+
+
+    @staticmethod
+    def is_same_file(local_file_name: str, s3_object: dict, compare_checksum: bool = False) -> bool:
+        '''
+        Utility function checking if a local file is identical to an object
+        listed on an S3 endpoint storage, based on its size and optionally
+        on its MD5 checksum. The checksum can only be compared with the ETag
+        of objects not uploaded in multiple parts, other objects are only
+        compared on their size.
+
+        :param local_file_name: path of the local file.
+        :param s3_object: object description as returned by list_prefixed_objects.
+        :param compare_checksum: also compare the MD5 checksum of the file.
+        '''
+
+        if not os.path.isfile(local_file_name):
+            return False
+        if os.path.getsize(local_file_name) != s3_object['Size']:
+            return False
+        etag = s3_object.get('ETag', '').strip('"')
+        if compare_checksum and etag and '-' not in etag:
+            md5 = hashlib.md5()
+            with open(local_file_name, 'rb') as local_file:
+                for chunk in iter(lambda: local_file.read(1024 * 1024), b''):
+                    md5.update(chunk)
+            return md5.hexdigest() == etag
+        return True
+
+
+    @staticmethod
+    def local_file_path_of(
+        s3_object: str, local_directory_name: str, objects_prefix: str = 'None'
+    ) -> str:
+        '''
+        Utility function returning the local path on the worker of an object
+        stored on an S3 endpoint storage, without any check or directory
+        creation.
 
         :param s3_object: path leading to the object to download on the bucket.
         :param local_directory_name: path of the directory under which will be saved the file to download.
         :param objects_prefix: bucket path prefix which won't be added to the "local_directory_name".
-        :param logger: logger object used to display messages.
         '''
 
         # If the request concerns an unitary file, we have no object_prefix so we use the path on the bucket
@@ -278,9 +419,26 @@ class S3Util(object):
         prefix_without_ending_slash = objects_prefix.rstrip('/')
         prefix_parent_dir_with_ending_slash = f'{os.path.dirname(prefix_without_ending_slash)}/'
         name_without_prefix = S3Util.remove_prefix(s3_object, prefix_parent_dir_with_ending_slash)
-        local_file_path = os.path.join(local_directory_name, name_without_prefix)
+        return os.path.join(local_directory_name, name_without_prefix)
+
+
+    @staticmethod
+    def compute_local_file_path(
+        s3_object: str, local_directory_name: str, objects_prefix: str = 'None', logger: Logger = None
+    ):
+        '''
+        Utility function computing the local path on the worker of an object 
+        stored on an S3 endpoint storage.
+
+        :param s3_object: path leading to the object to download on the bucket.
+        :param local_directory_name: path of the directory under which will be saved the file to download.
+        :param objects_prefix: bucket path prefix which won't be added to the "local_directory_name".
+        :param logger: logger object used to display messages.
+        '''
+
+        local_file_path = S3Util.local_file_path_of(s3_object, local_directory_name, objects_prefix)
         # Raise a warning if the file already exists on worker
-        if os.path.isfile(local_file_path):
+        if logger is not None and os.path.isfile(local_file_path):
             logger.warning(f'The file \'{local_file_path}\' already exists on the worker.')
 
         local_directory_path = os.path.dirname(local_file_path)
@@ -314,22 +472,20 @@ class S3Util(object):
 
     @staticmethod
     # Code from https://stackoverflow.com/a/56267603
-    def download_prefixed_objects(
-        s3_resource, bucket: str, objects_prefix: str, local_directory_name: str, logger: Logger = None
-    ):
+    def list_prefixed_objects(
+        s3_resource, bucket: str, objects_prefix: str
+    ) -> list:
         '''
-        Utility function to download a set of objects which have a path matching 
-        a prefix on an S3 endpoint storage, into a specified folder on a local 
-        worker machine.
+        Utility function listing the objects which have a path matching a
+        prefix on an S3 endpoint storage, over all the listing pages.
+        Directories (objects which names end with a "/") are not returned.
 
         :param s3_resource: s3 resource object.
         :param bucket: name of the bucket in the s3 endpoint storage.
-        :param objects_prefix: path prefix leading to the objects to download on the bucket.
-        :param local_directory_name: path of the directory under which will be saved the downloaded file.
-        :param logger: logger object used to display messages.
+        :param objects_prefix: path prefix leading to the objects to list on the bucket.
+        :return: list of dicts with the "Key", "Size" and "ETag" of each object.
         '''
 
-        S3Util.check_bucket(s3_resource, bucket)
         s3_client = s3_resource.meta.client
 
         s3_objects = []
@@ -358,36 +514,55 @@ class S3Util(object):
                 # Use the 'raise e1 from e2' form to keep the trace of the error.
                 raise external_error from error
 
-            s3_object_contents = results.get('Contents')
-
-            if s3_object_contents is None:
-                message = (
-                    f'there is no object with prefix "{objects_prefix}" in the bucket '
-                    f'"{bucket}" in the S3 storage which endpoint URL is '
-                    f'"{s3_client.meta.endpoint_url}" and with the given '
-                    f'credentials'
-                )
-                external_error = CsiExternalError('S3 object not found', message)
-                raise external_error
-
-            # Actually, the object string is in the "Key" field of the contents
-            # returned by the request above.
-            s3_objects = [
-                s3_object.get('Key')
-                for s3_object in s3_object_contents
-            ]
-
             # We don't want to keep directories in this list, i.e. objects which
             # names end with a "/"
-            s3_objects = [
+            s3_objects += [
                 s3_object
-                for s3_object in s3_objects
-                if s3_object[-1] != '/'
+                for s3_object in results.get('Contents', [])
+                if s3_object.get('Key')[-1] != '/'
             ]
 
             next_token = results.get('NextContinuationToken')
 
-        # Actually download all the s3_objects
+        return s3_objects
+
+
+    @staticmethod
+    def download_prefixed_objects(
+        s3_resource, bucket: str, objects_prefix: str, local_directory_name: str, logger: Logger = None,
+        skip_existing: bool = False, compare_checksum: bool = False
+    ):
+        '''
+        Utility function to download a set of objects which have a path matching 
+        a prefix on an S3 endpoint storage, into a specified folder on a local 
+        worker machine. The objects are downloaded concurrently.
+
+        :param s3_resource: s3 resource object.
+        :param bucket: name of the bucket in the s3 endpoint storage.
+        :param objects_prefix: path prefix leading to the objects to download on the bucket.
+        :param local_directory_name: path of the directory under which will be saved the downloaded file.
+        :param logger: logger object used to display messages.
+        :param skip_existing: don't download the objects whose local file already exists with the same size.
+        :param compare_checksum: with skip_existing, also compare the MD5 checksum of the local files.
+        '''
+
+        S3Util.check_bucket(s3_resource, bucket)
+        s3_client = s3_resource.meta.client
+
+        s3_objects = S3Util.list_prefixed_objects(s3_resource, bucket, objects_prefix)
+        if not s3_objects:
+            message = (
+                f'there is no object with prefix "{objects_prefix}" in the bucket '
+                f'"{bucket}" in the S3 storage which endpoint URL is '
+                f'"{s3_client.meta.endpoint_url}" and with the given '
+                f'credentials'
+            )
+            external_error = CsiExternalError('S3 object not found', message)
+            raise external_error
+
+        # Compute the local file paths (and create their directories) before
+        # the downloads
+        transfer_args = []
         for s3_object in s3_objects:
             # if
             #   objects_prefix = 'some/path/to/object'
@@ -395,27 +570,37 @@ class S3Util(object):
             #   local_directory_name = '/some/local/dir'
             # in the end we want to have all objects in this directory
             #   '/some/local/dir/object'
+            if skip_existing and S3Util.is_same_file(
+                    S3Util.local_file_path_of(s3_object['Key'], local_directory_name, objects_prefix),
+                    s3_object, compare_checksum):
+                continue
 
             # Compute the local file path
             local_file_path = S3Util.compute_local_file_path(
-                s3_object, local_directory_name, objects_prefix, logger)
+                s3_object['Key'], local_directory_name, objects_prefix, logger)
+            transfer_args.append((s3_client, bucket, s3_object['Key'], local_file_path))
 
-            # Download the file from bucket
-            S3Util.download_file_from_bucket(s3_resource, bucket, s3_object, local_file_path)
+        # Actually download all the s3_objects, the listing above already
+        # ensures that they exist
+        S3Util.run_transfers(S3Util.transfer_download, transfer_args)
 
 
     @staticmethod
     def upload_directory(
-        s3_resource, bucket: str, local_directory_name: str, s3_destination: str
+        s3_resource, bucket: str, local_directory_name: str, s3_destination: str,
+        skip_existing: bool = False, compare_checksum: bool = False
     ):
         '''
         Utility function uploading a given directory stored on a local worker 
-        machine into a specified location on an S3 endpoint storage.
+        machine into a specified location on an S3 endpoint storage. The files
+        are uploaded concurrently.
         
         :param s3_resource: s3 resource object.
         :param bucket: name of the bucket in the s3 endpoint storage.
         :param local_directory_name: path of the directory under which is saved the directory to upload.
         :param s3_destination: path under which will be saved the directory on the bucket.
+        :param skip_existing: don't upload the files already stored on the bucket with the same size.
+        :param compare_checksum: with skip_existing, also compare the MD5 checksum of the files.
         '''
 
         S3Util.check_bucket(s3_resource, bucket)
@@ -426,6 +611,17 @@ class S3Util(object):
                 'Directory not found',
                 f'could not find local directory ({local_directory_name}) to upload to S3 bucket')
 
+        existing_objects = {}
+        if skip_existing:
+            destination_prefix = os.path.normpath(os.path.join(
+                s3_destination,
+                os.path.relpath(local_directory_name, os.path.dirname(local_directory_name))))
+            existing_objects = {
+                s3_object['Key']: s3_object
+                for s3_object in S3Util.list_prefixed_objects(s3_resource, bucket, destination_prefix)
+            }
+
+        transfer_args = []
         for root, _, files in os.walk(local_directory_name):
             for filename in files:
                 local_path = os.path.join(root, filename)
@@ -434,18 +630,12 @@ class S3Util(object):
                     os.path.dirname(local_directory_name)
                     )
                 s3_object_path = os.path.join(s3_destination, relative_path)
-                try:
-                    s3_client.upload_file(local_path, bucket, s3_object_path)
-                except Exception as error:
-                    message = (
-                        f'an unexpected error occured during the upload of '
-                        f'{local_directory_name} to the bucket {bucket}, raise an '
-                        f'external error so that it might be tried again in case '
-                        f'it is due to a temporary issue'
-                    )
-                    external_error = CsiExternalError('unknown S3 upload error', message)
-                    # Use the 'raise e1 from e2' form to keep the trace of the error.
-                    raise external_error from error
+                if (s3_object_path in existing_objects) and S3Util.is_same_file(
+                        local_path, existing_objects[s3_object_path], compare_checksum):
+                    continue
+                transfer_args.append((s3_client, bucket, local_path, s3_object_path))
+
+        S3Util.run_transfers(S3Util.transfer_upload, transfer_args)
 
     @staticmethod
     def upload_file(
@@ -469,15 +659,4 @@ class S3Util(object):
                 'File not found',
                 f'could not find local file ({local_file_name}) to upload to S3 bucket')
 
-        try:
-            s3_client.upload_file(local_file_name, bucket, s3_destination_filepath)
-        except Exception as error:
-            message = (
-                f'an unexpected error occured during the upload of '
-                f'{local_file_name} to the bucket {bucket}, raise an '
-                f'external error so that it might be tried again in case '
-                f'it is due to a temporary issue'
-            )
-            external_error = CsiExternalError('unknown S3 upload error', message)
-            # Use the 'raise e1 from e2' form to keep the trace of the error.
-            raise external_error from error
+        S3Util.transfer_upload(s3_client, bucket, local_file_name, s3_destination_filepath)
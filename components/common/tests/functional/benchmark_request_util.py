@@ -0,0 +1,73 @@
+'''
+Measure the number of catalogue pages requested per second by RequestUtil,
+against the local HTTP stand-in server.
+
+Run from the repository root, e.g.:
+    python -m components.common.tests.functional.benchmark_request_util --pages 200 --parallel 10
+
+With --legacy, the pages are requested as before RequestUtil shared its
+thread pool: by a new process pool for each batch of parallel pages.
+'''
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ...python.util.request_util import RequestUtil
+from ...python.util.rest_util import RestUtil
+from ..http_stand_in_server import HttpStandInServer
+
+
+class BenchmarkRequestUtil(RequestUtil):
+    '''Request the pages of the local stand-in catalogue.'''
+
+    def __init__(self, url):
+        self.url = url
+
+    def _populate_url(self, pages):
+        return [{'page': page} for page in pages]
+
+    def _send_and_check_request(self, url_params_page):
+        return self.send_request(self.url, url_params_page).json()
+
+
+def legacy_request_page(url, url_params_page):
+    '''Request a page with a new HTTP session, as the forked processes did.'''
+    return RestUtil(RestUtil.new_session()).get(url=url, params=url_params_page).json()
+
+
+def run(request_util, pages, parallel, legacy):
+    '''Request all the pages, parallel pages at a time.'''
+    for start in range(0, pages, parallel):
+        batch = list(range(start, min(start + parallel, pages)))
+        if legacy:
+            with ProcessPoolExecutor(max_workers=len(batch)) as pool:
+                list(pool.map(
+                    legacy_request_page,
+                    [request_util.url] * len(batch),
+                    request_util._populate_url(batch)))
+        else:
+            request_util._request(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=200, help='total number of pages to request')
+    parser.add_argument('--parallel', type=int, default=10, help='number of pages requested simultaneously')
+    parser.add_argument('--latency', type=float, default=0.01, help='server latency in seconds')
+    parser.add_argument('--legacy', action='store_true', help='use a new process pool per batch of pages')
+    args = parser.parse_args()
+
+    with HttpStandInServer(latency=args.latency) as server:
+        request_util = BenchmarkRequestUtil(server.url)
+        start = time.monotonic()
+        run(request_util, args.pages, args.parallel, args.legacy)
+        elapsed = time.monotonic() - start
+
+    print('%d pages in %.2f s: %.1f requests/s (%s, %d in parallel, %.3f s latency)' % (
+        server.requests_count, elapsed, server.requests_count / elapsed,
+        'process pool per batch' if args.legacy else 'shared thread pool',
+        args.parallel, args.latency))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+
+class CatalogueRequestHandler(BaseHTTPRequestHandler):
+    '''
+    Answer each GET request with the server file at the requested path, or
+    else with a JSON page echoing the query parameters, after the server latency.
+    '''
+
+    # Keep the connections alive, as a real catalogue does
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.count_request(self.path)
+        url = urlparse(self.path)
+        params = dict(parse_qsl(url.query))
+        time.sleep(float(params.get('delay', self.server.latency)))
+
+        if url.path in self.server.files:
+            content_type = 'application/xml'
+            body = self.server.files[url.path]
+        else:
+            content_type = 'application/json'
+            body = json.dumps({
+                'type': 'FeatureCollection',
+                'properties': {'itemsPerPage': 1, 'params': params},
+                'features': [{'id': params.get('page')}]
+            }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpStandInServer(ThreadingHTTPServer):
+    '''
+    Local HTTP server standing in for a product catalogue, used by the
+    catalogue request tests and benchmark.
+
+    :param latency: time in seconds before answering each request.
+    :param files: contents served as is, by URL path.
+    '''
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, latency=0.0, files=None):
+        super().__init__(('127.0.0.1', 0), CatalogueRequestHandler)
+        self.latency = latency
+        self.files = files or {}
+        self.requests_count = 0
+        self.requested_paths = []
+        self.__lock = threading.Lock()
+        self.__thread = None
+
+    @property
+    def root_url(self):
+        return 'http://127.0.0.1:%d' % self.server_address[1]
+
+    @property
+    def url(self):
+        return self.root_url + '/search.json'
+
+    def count_request(self, path):
+        with self.__lock:
+            self.requests_count += 1
+            self.requested_paths.append(path)
+
+    def __enter__(self):
+        self.__thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+        self.__thread.join()
@@ -0,0 +1,86 @@
+import json
+import re
+from urllib.parse import parse_qsl, urlparse
+
+from requests import Response, Session
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectionError
+
+from ..python.database.rest.rest_database import RestDatabase
+from ..python.util.rest_util import RestUtil
+
+
+class PostgrestStandIn(BaseAdapter):
+    '''
+    Answer the insertion and deletion requests as PostgREST would, keeping
+    the rows of each table in memory.
+
+    :param reverse_returned_rows: return the inserted rows in reverse order.
+    :param failing_posts: set of (table name, index of the POST request to
+    this table) which fail as if the database was unreachable.
+    '''
+
+    def __init__(self, reverse_returned_rows=False, failing_posts=None):
+        super().__init__()
+        self.reverse_returned_rows = reverse_returned_rows
+        self.failing_posts = failing_posts or set()
+        self.tables = {}
+        self.requests = []
+        self.__next_ids = {}
+
+    def mount(self, monkeypatch):
+        '''Send the database requests of RestDatabase to this stand-in.'''
+        session = Session()
+        session.mount('http://', self)
+        monkeypatch.setattr(RestUtil, 'shared_session', staticmethod(lambda: session))
+        monkeypatch.setattr(RestDatabase, 'URI_ROOT', 'http://localhost:3000/%s')
+        return self
+
+    def posts(self, table):
+        '''Rows sent by each POST request to a table.'''
+        return [rows for method, _table, rows in self.requests if method == 'POST' and _table == table]
+
+    def send(self, request, **kwargs):
+        url = urlparse(request.url)
+        table = url.path.strip('/')
+        if request.method == 'POST':
+            rows = json.loads(request.body)
+            if (table, len(self.posts(table))) in self.failing_posts:
+                self.requests.append((request.method, table, rows))
+                raise ConnectionError('database unreachable')
+            self.requests.append((request.method, table, rows))
+            body = self.insert(table, rows)
+            status_code = 201
+        elif request.method == 'DELETE':
+            ids = [int(_id) for _id in re.match(r'in\.\((.*)\)', dict(parse_qsl(url.query))['id']).group(1).split(',')]
+            self.requests.append((request.method, table, ids))
+            self.delete(table, ids)
+            body = []
+            status_code = 204
+        else:
+            raise NotImplementedError(request.method)
+
+        response = Response()
+        response.status_code = status_code
+        response._content = json.dumps(body).encode()
+        response.url = request.url
+        return response
+
+    def insert(self, table, rows):
+        rows = [dict(row) for row in rows]
+        for row in rows:
+            row['id'] = self.__next_ids.get(table, 1)
+            self.__next_ids[table] = row['id'] + 1
+        self.tables.setdefault(table, []).extend(rows)
+        return rows[::-1] if self.reverse_returned_rows else rows
+
+    def delete(self, table, ids):
+        ids = set(ids)
+        self.tables[table] = [row for row in self.tables.get(table, []) if row['id'] not in ids]
+        # Foreign keys to the parent jobs are deleted in cascade
+        if table == 'parent_jobs':
+            for name, rows in self.tables.items():
+                self.tables[name] = [row for row in rows if row.get('fk_parent_job_id') not in ids]
+
+    def close(self):
+        pass
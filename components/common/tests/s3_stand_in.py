@@ -0,0 +1,70 @@
+import threading
+from types import SimpleNamespace
+
+import botocore
+
+
+class FakeS3Client(object):
+    '''
+    In-memory S3 client recording the transfers, and returning listings in
+    pages of PAGE_SIZE objects.
+    '''
+
+    PAGE_SIZE = 2
+    exceptions = botocore.exceptions
+
+    def __init__(self, objects=None):
+        self.objects = {} if objects is None else objects
+        self.head_bucket_calls = 0
+        self.downloads = []
+        self.lock = threading.Lock()
+        self.meta = SimpleNamespace(endpoint_url='http://localhost:9000')
+
+    @staticmethod
+    def etag(content):
+        return '"%d"' % hash(content)
+
+    def head_bucket(self, Bucket):
+        self.head_bucket_calls += 1
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken='0'):
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        start = int(ContinuationToken)
+        page = keys[start:start + self.PAGE_SIZE]
+        results = {}
+        if page:
+            results['Contents'] = [
+                {'Key': key, 'Size': len(self.objects[key]), 'ETag': self.etag(self.objects[key])}
+                for key in page
+            ]
+        if start + self.PAGE_SIZE < len(keys):
+            results['NextContinuationToken'] = str(start + self.PAGE_SIZE)
+        return results
+
+    def download_file(self, Bucket, Key, Filename, Config=None):
+        with self.lock:
+            self.downloads.append(Key)
+        with open(Filename, 'wb') as local_file:
+            local_file.write(self.objects[Key])
+
+    def upload_file(self, Filename, Bucket, Key, Config=None):
+        with open(Filename, 'rb') as local_file:
+            content = local_file.read()
+        with self.lock:
+            self.objects[Key] = content
+
+
+class FakeS3Resource(object):
+    '''S3 resource of a FakeS3Client, sharing its objects dictionary.'''
+
+    def __init__(self, objects=None):
+        self.meta = SimpleNamespace(client=FakeS3Client(objects))
+
+    def Object(self, bucket, key):
+        s3_client = self.meta.client
+        s3_object = SimpleNamespace()
+
+        def load():
+            s3_object.e_tag = s3_client.etag(s3_client.objects[key])
+        s3_object.load = load
+        return s3_object
@@ -0,0 +1,63 @@
+import os
+
+from ...python.util.aux_cache_util import AuxCacheUtil
+from ..s3_stand_in import FakeS3Client, FakeS3Resource
+
+
+def test_cached_file_is_downloaded_once(tmp_path):
+    """Test that a cached file is linked in the next job directories without download"""
+
+    s3_resource = FakeS3Resource({'aux/dem.tif': b'dem'})
+    cache = AuxCacheUtil(cache_dir=str(tmp_path / 'cache'), max_size_bytes=1000)
+    for job in ['job1', 'job2']:
+        os.makedirs(tmp_path / job)
+        cache.download_file_from_bucket(
+            s3_resource, 'aux', 'aux/dem.tif', str(tmp_path / job / 'dem.tif'))
+        assert (tmp_path / job / 'dem.tif').read_bytes() == b'dem'
+
+    assert s3_resource.meta.client.downloads == ['aux/dem.tif']
+
+
+def test_modified_object_is_downloaded_again(tmp_path):
+    """Test that the ETag is part of the cache key"""
+
+    objects = {'aux/dem.tif': b'dem'}
+    s3_resource = FakeS3Resource(objects)
+    cache = AuxCacheUtil(cache_dir=str(tmp_path / 'cache'), max_size_bytes=1000)
+    cache.download_file_from_bucket(s3_resource, 'aux', 'aux/dem.tif', str(tmp_path / 'dem1.tif'))
+    objects['aux/dem.tif'] = b'dem v2'
+    cache.download_file_from_bucket(s3_resource, 'aux', 'aux/dem.tif', str(tmp_path / 'dem2.tif'))
+
+    assert len(s3_resource.meta.client.downloads) == 2
+    assert (tmp_path / 'dem1.tif').read_bytes() == b'dem'
+    assert (tmp_path / 'dem2.tif').read_bytes() == b'dem v2'
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    """Test that the cache size stays below its maximum"""
+
+    s3_resource = FakeS3Resource({'a': b'a' * 10, 'b': b'b' * 10, 'c': b'c' * 10})
+    cache = AuxCacheUtil(cache_dir=str(tmp_path / 'cache'), max_size_bytes=25)
+    cache.download_file_from_bucket(s3_resource, 'aux', 'a', str(tmp_path / 'a'))
+    cache.download_file_from_bucket(s3_resource, 'aux', 'b', str(tmp_path / 'b'))
+    # Make "b" the least recently used file
+    os.utime(cache.cache_file_path('http://localhost:9000', 'aux', 'b', FakeS3Client.etag(b'b' * 10)), (0, 0))
+    cache.download_file_from_bucket(s3_resource, 'aux', 'c', str(tmp_path / 'c'))
+
+    cached_files = sorted(
+        name.split('_')[-1] for name in os.listdir(tmp_path / 'cache')
+        if not name.endswith(AuxCacheUtil.LOCK_SUFFIX))
+    assert cached_files == ['a', 'c']
+    # Files linked in job directories are kept
+    assert (tmp_path / 'b').read_bytes() == b'b' * 10
+
+
+def test_disabled_cache(tmp_path):
+    """Test that files are directly downloaded when the cache is disabled"""
+
+    s3_resource = FakeS3Resource({'aux/dem.tif': b'dem'})
+    cache = AuxCacheUtil(cache_dir='')
+    cache.download_file_from_bucket(s3_resource, 'aux', 'aux/dem.tif', str(tmp_path / 'dem.tif'))
+
+    assert (tmp_path / 'dem.tif').read_bytes() == b'dem'
+    assert os.listdir(tmp_path) == ['dem.tif']
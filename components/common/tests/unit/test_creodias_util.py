@@ -0,0 +1,106 @@
+import os
+from collections import namedtuple
+from datetime import datetime
+
+from ...python.sentinel.sentinel1_product import Sentinel1Product
+from ...python.sentinel.sentinel2_product import Sentinel2Product
+from ...python.util.creodias_util import CreodiasUtil
+from ...python.util.log_util import temp_logger
+from ..http_stand_in_server import HttpStandInServer
+
+MANIFEST = b'''<?xml version="1.0" encoding="UTF-8"?>
+<xfdu:XFDU xmlns:xfdu="urn:ccsds:schema:xfdu:1" xmlns:s1sarl1="http://www.esa.int/safe/sentinel-1.0/sentinel-1/sar/level-1">
+  <metadataSection>
+    <s1sarl1:standAloneProductInformation>
+      <s1sarl1:sliceNumber>%d</s1sarl1:sliceNumber>
+      <s1sarl1:totalSlices>9</s1sarl1:totalSlices>
+    </s1sarl1:standAloneProductInformation>
+  </metadataSection>
+</xfdu:XFDU>'''
+
+S1Metadata = namedtuple('S1Metadata', ['thumbnail', 'productIdentifier'])
+
+
+def s1_product_name(i):
+    return f'S1A_IW_GRDH_1SDV_20210412T1511{i:02d}_20210412T151136_037419_046917_218A.SAFE'
+
+
+def s1_products(root_url, count):
+    '''S1 products whose manifests are served by the stand-in server.'''
+    return [
+        Sentinel1Product(
+            f'/eodata/Sentinel-1/{s1_product_name(i)}',
+            datetime(2021, 4, 12),
+            S1Metadata(f'{root_url}/{s1_product_name(i)}/preview/thumbnail.png', None))
+        for i in range(count)]
+
+
+def test_s1_manifests_are_downloaded_once(tmp_path, monkeypatch):
+    """Test that the S1 manifests are downloaded simultaneously and then read from the cache"""
+
+    monkeypatch.setattr(CreodiasUtil, 'MANIFEST_CACHE_DIR', str(tmp_path))
+    with HttpStandInServer() as server:
+        for i in range(5):
+            server.files[f'/{s1_product_name(i)}/manifest.safe'] = MANIFEST % i
+        products = s1_products(server.root_url, 4)
+        s2_product = Sentinel2Product(
+            '/eodata/Sentinel-2/S2A_MSIL1C_20160528T104032_N0202_R008_T31TGL_20160528T104248.SAFE',
+            datetime(2016, 5, 28), 6.0, 0)
+
+        kept_products = CreodiasUtil().set_s1_manifests(products + [s2_product])
+        assert kept_products == products + [s2_product]
+        assert [product.manifest for product in products] == [
+            CreodiasUtil.S1Manifest(str(i), '9') for i in range(4)]
+        assert server.requests_count == 4
+
+        # Overlapping search window: only the new product manifest is downloaded
+        new_products = s1_products(server.root_url, 5)
+        CreodiasUtil().set_s1_manifests(new_products)
+        assert [product.manifest.sliceNumber for product in new_products] == ['0', '1', '2', '3', '4']
+        assert server.requests_count == 5
+
+
+def test_s1_product_without_manifest_url(tmp_path, monkeypatch):
+    """Test that the S1 products without manifest URL are removed"""
+
+    monkeypatch.setattr(CreodiasUtil, 'MANIFEST_CACHE_DIR', str(tmp_path))
+    product = s1_products('http://localhost', 1)[0]
+    product.other_metadata = S1Metadata(None, None)
+
+    assert CreodiasUtil().set_s1_manifests([product]) == []
+
+
+def test_s1_manifest_cache_eviction(tmp_path, monkeypatch):
+    """Test that the oldest cached manifests are removed"""
+
+    monkeypatch.setattr(CreodiasUtil, 'MANIFEST_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(CreodiasUtil, 'MANIFEST_CACHE_MAX_FILES', 2)
+    creodias_util = CreodiasUtil()
+    for i in range(3):
+        creodias_util.write_cached_s1_manifest(f'P{i}', CreodiasUtil.S1Manifest(str(i), '3'))
+        os.utime(CreodiasUtil.cached_s1_manifest_path(f'P{i}'), (i, i))
+    creodias_util.evict_cached_s1_manifests()
+
+    assert creodias_util.read_cached_s1_manifest('P0') is None
+    assert creodias_util.read_cached_s1_manifest('P2') == CreodiasUtil.S1Manifest('2', '3')
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_disabled_s1_manifest_cache(tmp_path, monkeypatch):
+    """Test that the manifests are downloaded each time, without warning, when the cache is disabled"""
+
+    monkeypatch.setattr(CreodiasUtil, 'MANIFEST_CACHE_DIR', '')
+    monkeypatch.chdir(tmp_path)
+    warnings = []
+    monkeypatch.setattr(temp_logger, 'warning', lambda message, *args: warnings.append(message))
+    with HttpStandInServer() as server:
+        for i in range(2):
+            server.files[f'/{s1_product_name(i)}/manifest.safe'] = MANIFEST % i
+        for _ in range(2):
+            products = s1_products(server.root_url, 2)
+            CreodiasUtil().set_s1_manifests(products)
+            assert [product.manifest.sliceNumber for product in products] == ['0', '1']
+        assert server.requests_count == 4
+
+    assert warnings == []
+    assert list(tmp_path.iterdir()) == []
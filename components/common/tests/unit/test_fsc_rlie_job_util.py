@@ -0,0 +1,133 @@
+import logging
+from datetime import datetime, timedelta
+
+from ...python.database.model.job.fsc_rlie_job import FscRlieJob
+from ...python.database.model.job.l2a_status import L2aStatus
+from ...python.database.model.job.maja_mode import MajaMode
+from ...python.database.model.job.system_parameters import SystemPrameters
+from ...python.database.rest.stored_procedure import StoredProcedure
+from ...python.util.fsc_rlie_job_util import FscRlieJobUtil
+
+
+def new_job(tile_id, measurement_date, l1c_id, esa_creation_date, dias_publication_date):
+    return FscRlieJob(
+        tile_id=tile_id,
+        l1c_id=l1c_id,
+        measurement_date=measurement_date,
+        l1c_esa_creation_date=esa_creation_date,
+        l1c_dias_publication_date=dias_publication_date)
+
+
+def test_get_unique_jobs(monkeypatch):
+    """Test that the new and re-published jobs are kept, without duplicates"""
+
+    date_1 = datetime(2021, 4, 13, 10, 13, 47)
+    date_2 = datetime(2021, 4, 14, 10, 13, 47)
+    existing_job = new_job('32TLR', date_1, 'L1C_1', date_1, date_1)
+    existing_job.id = 1
+
+    requested_chunks = []
+
+    def get_existing_input_products(jobs, logger_func):
+        requested_chunks.append(jobs)
+        return [existing_job] if existing_job.measurement_date in [job.measurement_date for job in jobs] else []
+
+    patched_jobs = []
+    monkeypatch.setattr(FscRlieJob, 'get_existing_input_products', staticmethod(get_existing_input_products))
+    monkeypatch.setattr(FscRlieJob, 'patch', lambda job, **kwargs: patched_jobs.append(job))
+
+    jobs = [
+        # Already in the database
+        new_job('32TLR', date_1, 'L1C_1', date_1, date_1),
+        # Re-published within 24h with another ESA creation date
+        new_job('32TLR', date_1, 'L1C_2', date_1 + timedelta(hours=2), date_1 + timedelta(hours=3)),
+        # New jobs, the second one being a duplicate
+        new_job('31TCH', date_2, 'L1C_3', date_2, date_2),
+        new_job('31TCH', date_2, 'L1C_3', date_2, date_2),
+        # Re-published too late
+        new_job('32TLR', date_1, 'L1C_4', date_1 + timedelta(hours=2), date_1 + timedelta(days=2)),
+    ]
+
+    unique_jobs = FscRlieJobUtil.get_unique_jobs(
+        jobs, None, FscRlieJob, 2, logging.getLogger('test'), chunk_size=2)
+
+    assert unique_jobs == [jobs[1], jobs[2]]
+    assert [len(chunk) for chunk in requested_chunks] == [2, 2, 1]
+    assert patched_jobs == [existing_job]
+    assert existing_job.l1c_reference_job is False
+
+
+def degraded_job(job_id, measurement_date):
+    job = new_job('32TLR', measurement_date, 'L1C_%d' % job_id, measurement_date, measurement_date)
+    job.id = job_id
+    job.l1c_path = 'path_%d' % job_id
+    job.l2a_status = L2aStatus.generated.name
+    job.fsc_path = 'FSC_%d_0' % job_id
+    return job
+
+
+def test_find_backward_candidate_jobs(monkeypatch):
+    """Test that the backward candidates are only requested, in batch, for the jobs which can't run in nominal mode"""
+
+    monkeypatch.setattr(SystemPrameters, 'get', lambda self, logger_func=None: self)
+    requested_chunks = []
+
+    def fsc_rlie_backward_candidates_with_tile_ids(tile_ids, low_measurement_time_bounds,
+            low_l1c_esa_creation_time_bounds, results_limit, candidates_limit, fsc_rlie_job_object, logger_func):
+        requested_chunks.append(low_measurement_time_bounds)
+        return [[degraded_job(100 + len(requested_chunks), datetime(2021, 5, 1))] for _ in tile_ids]
+    monkeypatch.setattr(StoredProcedure, 'fsc_rlie_backward_candidates_with_tile_ids',
+        staticmethod(fsc_rlie_backward_candidates_with_tile_ids))
+
+    date = datetime(2021, 4, 13, 10, 13, 47)
+    jobs = [new_job('32TLR', date + timedelta(days=i), 'L1C_%d' % i, date, date) for i in range(5)]
+    for i, job in enumerate(jobs):
+        job.id = i
+    jobs[2].maja_mode = MajaMode.nominal
+    previous_l2a_job = degraded_job(10, date - timedelta(days=5))
+    previous_temporal_jobs = {
+        # No previous job, previous job too old, then nominal mode available
+        0: None, 1: degraded_job(11, date - timedelta(days=100)), 2: None, 3: previous_l2a_job,
+        # jobs[4] is missing: requested by set_maja_mode itself
+    }
+
+    candidate_jobs = FscRlieJobUtil.find_backward_candidate_jobs(
+        jobs, previous_temporal_jobs, FscRlieJob(), logging.getLogger('test'), chunk_size=1)
+
+    assert sorted(candidate_jobs) == [0, 1]
+    assert [job.id for job in candidate_jobs[1]] == [102]
+    assert len(requested_chunks) == 2
+
+
+def test_set_maja_mode_with_backward_candidates(monkeypatch):
+    """Test that the backward candidates retrieved in batch are used instead of requesting them"""
+
+    monkeypatch.setattr(SystemPrameters, 'get', lambda self, logger_func=None: self)
+    requested = []
+    monkeypatch.setattr(StoredProcedure, 'fsc_rlie_jobs_following_measurement_with_tile_id',
+        staticmethod(lambda *args, **kwargs: requested.append(args) or []))
+    monkeypatch.setattr(FscRlieJobUtil, 'reprocess_with_backward',
+        staticmethod(lambda job, fsc_rlie_job_class, logger_func=None: None))
+
+    date = datetime(2021, 4, 13, 10, 13, 47)
+    job = degraded_job(1, date)
+    job.l2a_status = L2aStatus.pending
+    job.fsc_path = None
+    candidates = [degraded_job(10 + i, date + timedelta(days=5 * (i + 1))) for i in range(7)]
+
+    FscRlieJobUtil.set_maja_mode(
+        job, FscRlieJob, logging.getLogger('test'),
+        previous_temporal_jobs={job.id: None}, backward_candidate_jobs={job.id: candidates})
+
+    assert requested == []
+    assert job.maja_mode == MajaMode.backward
+    assert job.l1c_id_list == ';'.join(['L1C_1'] + ['L1C_%d' % (10 + i) for i in range(7)])
+
+    # Jobs without batched candidates are requested one by one
+    job = degraded_job(2, date)
+    FscRlieJobUtil.set_maja_mode(
+        job, FscRlieJob, logging.getLogger('test'),
+        previous_temporal_jobs={job.id: None}, backward_candidate_jobs={})
+
+    assert len(requested) == 1
+    assert job.maja_mode is None
@@ -0,0 +1,45 @@
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from ...python.database.model.job.gfsc_job import GfscJob
+
+
+def make_product_list(count=500):
+    '''Products of a few tiles, in random measurement date order.'''
+    rand = random.Random(0)
+    return [
+        SimpleNamespace(
+            product_id='product_%d' % i,
+            tile_id=rand.choice(['32TLR', '32TLS', '31TGM']),
+            measurement_date=datetime(2021, 1, 1) + timedelta(hours=rand.randrange(24 * 30)))
+        for i in range(count)]
+
+
+def test_indexed_filter_matches_linear_filter():
+    """Test that the indexed filter returns the same products, in the same order"""
+
+    product_list = make_product_list()
+    product_index = GfscJob.index_product_list(product_list)
+
+    for tile_id in ['32TLR', '32TLS', '31TGM', '30TXX']:
+        for day in range(0, 35, 3):
+            date_max = datetime(2021, 1, 1) + timedelta(days=day)
+            date_min = date_max - timedelta(days=7)
+            assert GfscJob.filter_indexed_product_list(
+                product_index, tile_id, measurement_date_min=date_min, measurement_date_max=date_max) == \
+                GfscJob.filter_product_list(
+                    product_list, tile_id=tile_id, measurement_date_min=date_min, measurement_date_max=date_max)
+
+
+def test_indexed_filter_bounds():
+    """Test that the measurement date bounds are inclusive and optional"""
+
+    product_list = make_product_list()
+    product_index = GfscJob.index_product_list(product_list)
+    tile_products = [product for product in product_list if product.tile_id == '32TLR']
+    date = tile_products[0].measurement_date
+
+    assert GfscJob.filter_indexed_product_list(product_index, '32TLR') == tile_products
+    assert tile_products[0] in GfscJob.filter_indexed_product_list(
+        product_index, '32TLR', measurement_date_min=date, measurement_date_max=date)
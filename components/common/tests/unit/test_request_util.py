@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from ...python.util.request_util import RequestUtil
+from ..http_stand_in_server import HttpStandInServer
+
+
+class StandInRequestUtil(RequestUtil):
+    '''Request the pages of the local stand-in catalogue.'''
+
+    def __init__(self, url):
+        self.url = url
+
+    def _populate_url(self, pages, delay=0.0):
+        return [{'page': page, 'delay': delay} for page in pages]
+
+    def _send_and_check_request(self, url_params_page):
+        return self.send_request(self.url, url_params_page).json()
+
+
+def test_pages_are_requested_simultaneously():
+    """Test that the pages are requested in parallel and returned in order"""
+
+    with HttpStandInServer() as server:
+        start = time.monotonic()
+        response = StandInRequestUtil(server.url)._request(list(range(8)), delay=0.5)
+        elapsed = time.monotonic() - start
+
+    assert [page['features'][0]['id'] for page in response] == [str(i) for i in range(8)]
+    assert server.requests_count == 8
+    assert elapsed < 2
+
+
+def test_executor_is_reused():
+    """Test that the same thread pool is used by successive requests"""
+
+    assert RequestUtil.executor() is RequestUtil.executor()
+
+
+def test_timed_out_calls_are_retried():
+    """Test that only the calls which timed out are run again"""
+
+    calls = []
+    lock = threading.Lock()
+
+    def func(arg):
+        with lock:
+            calls.append(arg)
+            first_call = calls.count(arg) == 1
+        if arg == 'slow' and first_call:
+            time.sleep(0.5)
+        return arg.upper()
+
+    out = RequestUtil()._threaded_function_with_timeout(
+        func, ['a', 'slow', 'b'], timeout=0.2, max_retry=2)
+
+    assert out == ['A', 'SLOW', 'B']
+    assert sorted(calls) == ['a', 'b', 'slow', 'slow']
+
+
+def test_max_retry():
+    """Test that an exception is raised when the calls keep timing out"""
+
+    with pytest.raises(Exception, match='max number of retry'):
+        RequestUtil()._threaded_function_with_timeout(
+            lambda _: time.sleep(0.3), ['a'], timeout=0.05, max_retry=1)
@@ -0,0 +1,93 @@
+from ...python.database.model.job.other_job import OtherJob
+from ...python.database.model.job.parent_job import ParentJob
+from ...python.database.rest.foreign_key import ForeignKey
+from ...python.database.rest.rest_database import RestDatabase
+from ..postgrest_stand_in import PostgrestStandIn
+
+
+class Entry(RestDatabase):
+    '''Minimal table entry.'''
+
+    def __init__(self, name=None):
+        self.name = name
+        super().__init__('entries')
+
+
+def test_bulk_post(monkeypatch):
+    """Test that the entries are inserted by chunks and that their IDs are set"""
+
+    database = PostgrestStandIn().mount(monkeypatch)
+    monkeypatch.setattr(RestDatabase, 'BULK_POST_SIZE', 2)
+
+    entries = [Entry(name) for name in 'abcde']
+    inserted = RestDatabase.bulk_post(entries)
+
+    assert inserted == entries
+    assert [entry.get_id() for entry in entries] == [1, 2, 3, 4, 5]
+    assert [len(request) for request in database.posts('entries')] == [2, 2, 1]
+    assert [entry['name'] for request in database.posts('entries') for entry in request] == list('abcde')
+    assert RestDatabase.bulk_post([]) == []
+
+
+def test_bulk_post_matches_rows_by_key(monkeypatch):
+    """Test that the returned rows are matched with the objects by their key, not by position"""
+
+    database = PostgrestStandIn(reverse_returned_rows=True).mount(monkeypatch)
+
+    parent_jobs = [ParentJob() for _ in range(3)]
+    for tile_id, parent_job in zip(['31TCH', '31TDH', '31TEH'], parent_jobs):
+        parent_job.tile_id = tile_id
+    RestDatabase.bulk_post(parent_jobs)
+
+    rows = {row['id']: row for row in database.tables['parent_jobs']}
+    assert len(set(parent_job.unique_id for parent_job in parent_jobs)) == 3
+    assert [rows[parent_job.get_id()]['tile_id'] for parent_job in parent_jobs] == ['31TCH', '31TDH', '31TEH']
+
+
+def test_foreign_key_bulk_post(monkeypatch):
+    """Test that the parent and child IDs attributed by the database are set in the child jobs"""
+
+    database = PostgrestStandIn(reverse_returned_rows=True).mount(monkeypatch)
+    monkeypatch.setattr(RestDatabase, 'BULK_POST_SIZE', 2)
+    # Insert child jobs whose IDs differ from their parent IDs
+    database.insert('other_jobs', [{'fk_parent_job_id': None}] * 10)
+
+    jobs = [OtherJob(name) for name in 'abc']
+    assert ForeignKey.bulk_post(jobs, post_foreign=True) == jobs
+
+    parent_rows = {row['id']: row for row in database.tables['parent_jobs']}
+    child_rows = {row['id']: row for row in database.tables['other_jobs']}
+    for job in jobs:
+        assert job.fk_parent_job_id == job.parent_job.get_id()
+        assert parent_rows[job.parent_job.get_id()]['unique_id'] == job.parent_job.unique_id
+        assert parent_rows[job.parent_job.get_id()]['name'] == job.name
+        assert child_rows[job.get_id()]['fk_parent_job_id'] == job.fk_parent_job_id
+
+
+def test_foreign_key_bulk_post_rollback(monkeypatch):
+    """Test that the parent jobs are deleted when their child jobs can't be inserted"""
+
+    database = PostgrestStandIn(failing_posts={('other_jobs', 0)}).mount(monkeypatch)
+
+    jobs = [OtherJob(name) for name in 'abc']
+    assert ForeignKey.bulk_post(jobs, post_foreign=True) is None
+
+    assert database.tables['parent_jobs'] == []
+    assert [(method, table) for method, table, _ in database.requests] == [
+        ('POST', 'parent_jobs'), ('POST', 'other_jobs'), ('DELETE', 'parent_jobs')]
+    assert all(job.parent_job.get_id() is None for job in jobs)
+
+
+def test_bulk_delete(monkeypatch):
+    """Test that the entries are deleted by chunks"""
+
+    database = PostgrestStandIn().mount(monkeypatch)
+    monkeypatch.setattr(RestDatabase, 'BULK_DELETE_SIZE', 2)
+
+    entries = [Entry(name) for name in 'abcde']
+    RestDatabase.bulk_post(entries)
+    assert RestDatabase.bulk_delete(entries[:3] + [Entry('not inserted')]) is True
+
+    assert [row['name'] for row in database.tables['entries']] == ['d', 'e']
+    assert [ids for method, _, ids in database.requests if method == 'DELETE'] == [[1, 2], [3]]
+    assert [entry.get_id() for entry in entries] == [None, None, None, 4, 5]
@@ -0,0 +1,31 @@
+import os
+
+from ...python.util.rest_util import RestUtil
+
+
+def test_shared_session_is_reused():
+    """Test that all the RestUtil instances of a process share the same pooled session"""
+
+    session = RestUtil().session
+    assert RestUtil().session is session
+    assert RestUtil.shared_session() is session
+
+    adapter = session.get_adapter('http://localhost')
+    assert adapter._pool_maxsize == RestUtil.POOL_SIZE
+    assert adapter.max_retries.total == RestUtil.MAX_RETRIES
+
+
+def test_shared_session_after_fork(monkeypatch):
+    """Test that a new session is created when the process ID changes"""
+
+    session = RestUtil.shared_session()
+    monkeypatch.setattr(os, 'getpid', lambda: -1)
+    assert RestUtil.shared_session() is not session
+
+
+def test_explicit_session():
+    """Test that an explicit session is used as is"""
+
+    session = RestUtil.new_session(pool_size=2, max_retries=0)
+    assert RestUtil(session).session is session
+    assert session.get_adapter('https://localhost')._pool_maxsize == 2
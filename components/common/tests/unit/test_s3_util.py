@@ -0,0 +1,56 @@
+import os
+
+from ...python.util.s3_util import S3Util
+from ..s3_stand_in import FakeS3Resource
+
+
+def test_download_prefixed_objects_all_pages(tmp_path):
+    """Test that the objects of all the listing pages are downloaded, with a single bucket check"""
+
+    objects = {f'products/P1/file{i}.tif': b'x' * i for i in range(5)}
+    objects['products/P1/'] = b''
+    s3_resource = FakeS3Resource(objects)
+
+    S3Util.download_prefixed_objects(s3_resource, 'bucket', 'products/P1', str(tmp_path))
+
+    s3_client = s3_resource.meta.client
+    assert s3_client.head_bucket_calls == 1
+    assert sorted(s3_client.downloads) == sorted(key for key in objects if key[-1] != '/')
+    for i in range(5):
+        assert (tmp_path / 'P1' / f'file{i}.tif').read_bytes() == b'x' * i
+
+
+def test_download_prefixed_objects_skip_existing(tmp_path):
+    """Test that local files with the object size are not downloaded again"""
+
+    objects = {'products/P1/a.tif': b'aaa', 'products/P1/b.tif': b'bbb'}
+    s3_resource = FakeS3Resource(objects)
+    os.makedirs(tmp_path / 'P1')
+    (tmp_path / 'P1' / 'a.tif').write_bytes(b'AAA')
+    (tmp_path / 'P1' / 'b.tif').write_bytes(b'B')
+
+    S3Util.download_prefixed_objects(
+        s3_resource, 'bucket', 'products/P1', str(tmp_path), skip_existing=True)
+
+    assert s3_resource.meta.client.downloads == ['products/P1/b.tif']
+    assert (tmp_path / 'P1' / 'a.tif').read_bytes() == b'AAA'
+    assert (tmp_path / 'P1' / 'b.tif').read_bytes() == b'bbb'
+
+
+def test_upload_directory(tmp_path):
+    """Test that all the files of a directory are uploaded, skipping identical existing ones"""
+
+    local_directory = tmp_path / 'P1'
+    os.makedirs(local_directory / 'sub')
+    (local_directory / 'a.tif').write_bytes(b'aaa')
+    (local_directory / 'sub' / 'b.xml').write_bytes(b'bb')
+    s3_resource = FakeS3Resource({'results/P1/a.tif': b'AAA'})
+
+    S3Util.upload_directory(
+        s3_resource, 'bucket', str(local_directory), 'results', skip_existing=True)
+
+    objects = s3_resource.meta.client.objects
+    assert objects == {'results/P1/a.tif': b'AAA', 'results/P1/sub/b.xml': b'bb'}
+
+    S3Util.upload_directory(s3_resource, 'bucket', str(local_directory), 'results')
+    assert objects['results/P1/a.tif'] == b'aaa'
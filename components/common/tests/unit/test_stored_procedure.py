@@ -0,0 +1,147 @@
+from datetime import datetime
+
+from ...python.database.model.job.fsc_rlie_job import FscRlieJob
+from ...python.database.model.job.parent_job import ParentJob
+from ...python.database.rest.stored_procedure import StoredProcedure
+
+
+def test_job_status_history_by_parent_job(monkeypatch):
+    """Test that the status history is requested by chunks and grouped by parent job"""
+
+    requested = []
+
+    def job_status_history(parent_job_ids, logger_func, set_timeout=True):
+        requested.append(parent_job_ids)
+        status_changes = []
+        for parent_job_id in parent_job_ids:
+            for change_id in range(parent_job_id % 3):
+                status_change = StoredProcedure.JobStatusChange()
+                status_change.parent_job_id = parent_job_id
+                status_change.change_id = change_id
+                status_changes.append(status_change)
+        return status_changes
+
+    monkeypatch.setattr(StoredProcedure, 'job_status_history', staticmethod(job_status_history))
+
+    history = StoredProcedure.job_status_history_by_parent_job(
+        [1, 2, 3, 4, 2], logger_func=None, chunk_size=3)
+
+    assert requested == [[1, 2, 3], [4]]
+    assert sorted(history) == [1, 2, 3, 4]
+    assert [len(history[parent_job_id]) for parent_job_id in [1, 2, 3, 4]] == [1, 2, 0, 1]
+    assert [status_change.change_id for status_change in history[2]] == [0, 1]
+    assert StoredProcedure.job_status_history_by_parent_job([], logger_func=None) == {}
+    assert len(requested) == 2
+
+
+def test_get_last_jobs_with_usable_l2a(monkeypatch):
+    """Test that the jobs found are dispatched to their reference"""
+
+    calls = []
+
+    def call(response_type_instance, procedure_name, set_timeout, logger_func=None, **kwargs):
+        calls.append(procedure_name)
+        results = []
+        if procedure_name == 'get_last_jobs_with_usable_l2a':
+            # reference 2 has no previous job, references 1 and 3 share the same one
+            for ref_index, job_id in [(3, 10), (1, 10), (4, 11)]:
+                result = StoredProcedure.LastJobWithUsableL2a()
+                result.ref_index, result.job_id = ref_index, job_id
+                results.append(result)
+        elif procedure_name == 'fsc_rlie_jobs_with_ids':
+            for job_id in kwargs['job_ids']:
+                result = FscRlieJob()
+                result.id, result.fk_parent_job_id = job_id, job_id + 100
+                results.append(result)
+        elif procedure_name == 'parent_jobs_with_ids':
+            for parent_job_id in kwargs['parent_job_ids']:
+                result = ParentJob()
+                result.id = parent_job_id
+                results.append(result)
+        return results
+
+    monkeypatch.setattr(StoredProcedure, 'call', staticmethod(call))
+
+    jobs = StoredProcedure.get_last_jobs_with_usable_l2a(
+        ['32TLR'] * 4, [None] * 4, [None] * 4, ['l1c'] * 4,
+        allow_codated_jobs=False, backward_triggered_jobs=[False] * 4,
+        fsc_rlie_job_object=FscRlieJob(), logger_func=None)
+
+    assert calls == ['get_last_jobs_with_usable_l2a', 'fsc_rlie_jobs_with_ids', 'parent_jobs_with_ids']
+    assert [job.id if job else None for job in jobs] == [10, None, 10, 11]
+    assert jobs[3].parent_job.id == 111
+    assert StoredProcedure.get_last_jobs_with_usable_l2a(
+        [], [], [], [], False, [], FscRlieJob(), None) == []
+
+
+def test_fsc_rlie_jobs_with_tile_dates(monkeypatch):
+    """Test that the existing jobs of all the references are requested at once"""
+
+    calls = []
+
+    def call(response_type_instance, procedure_name, set_timeout, logger_func=None, **kwargs):
+        calls.append((procedure_name, kwargs))
+        if procedure_name == 'fsc_rlie_jobs_with_tile_dates':
+            result = FscRlieJob()
+            result.id, result.fk_parent_job_id = 10, 110
+            return [result]
+        result = ParentJob()
+        result.id, result.tile_id = 110, '32TLR'
+        return [result]
+
+    monkeypatch.setattr(StoredProcedure, 'call', staticmethod(call))
+
+    jobs = [
+        FscRlieJob(tile_id='32TLR', measurement_date=datetime(2021, 4, 13, 10, 13, 47)),
+        FscRlieJob(tile_id='32TLR', measurement_date=datetime(2021, 4, 13, 10, 13, 47)),
+        FscRlieJob(tile_id='31TCH', measurement_date=datetime(2021, 4, 14, 10, 13, 47)),
+    ]
+    existing_jobs = FscRlieJob.get_existing_input_products(jobs, logger_func=None)
+
+    assert [procedure_name for procedure_name, _ in calls] == [
+        'fsc_rlie_jobs_with_tile_dates', 'parent_jobs_with_ids']
+    assert calls[0][1]['tile_ids_ref'] == ['32TLR', '31TCH']
+    assert calls[0][1]['measurement_times'] == ['2021-04-13T10:13:47', '2021-04-14T10:13:47']
+    assert [job.id for job in existing_jobs] == [10]
+    assert existing_jobs[0].parent_job.id == 110
+    assert FscRlieJob.get_existing_input_products([], logger_func=None) == []
+
+
+def test_fsc_rlie_backward_candidates_with_tile_ids(monkeypatch):
+    """Test that the candidates found are dispatched to their reference, by ascending measurement date"""
+
+    calls = []
+
+    def call(response_type_instance, procedure_name, set_timeout, logger_func=None, **kwargs):
+        calls.append(procedure_name)
+        results = []
+        if procedure_name == 'fsc_rlie_backward_candidates_with_tile_ids':
+            # reference 2 has no candidate, references 1 and 3 share job 10
+            for ref_index, job_id in [(3, 10), (1, 12), (1, 10), (3, 11)]:
+                result = StoredProcedure.BackwardCandidateJob()
+                result.ref_index, result.job_id = ref_index, job_id
+                results.append(result)
+        elif procedure_name == 'fsc_rlie_jobs_with_ids':
+            for job_id in kwargs['job_ids']:
+                result = FscRlieJob()
+                result.id, result.fk_parent_job_id = job_id, job_id + 100
+                result.measurement_date = job_id
+                results.append(result)
+        elif procedure_name == 'parent_jobs_with_ids':
+            for parent_job_id in kwargs['parent_job_ids']:
+                result = ParentJob()
+                result.id = parent_job_id
+                results.append(result)
+        return results
+
+    monkeypatch.setattr(StoredProcedure, 'call', staticmethod(call))
+
+    candidates = StoredProcedure.fsc_rlie_backward_candidates_with_tile_ids(
+        ['32TLR'] * 3, [None] * 3, [None] * 3, results_limit=1000, candidates_limit=7,
+        fsc_rlie_job_object=FscRlieJob(), logger_func=None)
+
+    assert calls == ['fsc_rlie_backward_candidates_with_tile_ids', 'fsc_rlie_jobs_with_ids', 'parent_jobs_with_ids']
+    assert [[job.id for job in jobs] for jobs in candidates] == [[10, 12], [], [10, 11]]
+    assert candidates[2][1].parent_job.id == 111
+    assert StoredProcedure.fsc_rlie_backward_candidates_with_tile_ids(
+        [], [], [], 1000, 7, FscRlieJob(), None) == []
@@ -858,6 +858,11 @@ create function cosims.parent_jobs_with_ids (parent_job_ids bigint[])
 begin return query select * from cosims.parent_jobs pj where pj.id = any(parent_job_ids);
 end $$ language plpgsql stable;
 
+create function cosims.fsc_rlie_jobs_with_ids (job_ids bigint[])
+  returns setof cosims.fsc_rlie_jobs as $$
+begin return query select * from cosims.fsc_rlie_jobs frj where frj.id = any(job_ids);
+end $$ language plpgsql stable;
+
 --
 -- Get IDs
 
@@ -1172,6 +1177,23 @@ end
   $$ language plpgsql immutable;
 
 
+-- Batch version of fsc_rlie_jobs_with_tile_date: the references (tile id, measurement
+--  time) are given as arrays of the same length, and the function returns the FSC/RLIE
+--  jobs matching any of them
+create function cosims.fsc_rlie_jobs_with_tile_dates (
+  tile_ids_ref text[],
+  measurement_times timestamp[]
+)
+  returns setof cosims.fsc_rlie_jobs as $$
+  select frj.*
+  from cosims.fsc_rlie_jobs frj
+  join cosims.parent_jobs pjt -- from the parent_job table:
+  on frj.fk_parent_job_id=pjt.id -- join the FSC/RLIE table with tile_id selection
+  join unnest(tile_ids_ref, measurement_times) as ref(tile_id, measurement_time) -- one row per reference
+  on (pjt.tile_id=ref.tile_id and frj.measurement_date=ref.measurement_time);
+$$ language SQL stable;
+
+
 -- Get FSC/RLIE job with most recent measurement time, inferior to the high time bound,
 --  and with the specified tile id, only select jobs which didn't fail to produce a L2A yet
 create function cosims.get_last_job_with_usable_l2a (
@@ -1204,6 +1226,45 @@ create function cosims.get_last_job_with_usable_l2a (
 $$ language SQL stable;
 
 
+-- Batch version of get_last_job_with_usable_l2a: the references (tile id, time bounds,
+--  L1C ID, backward triggered job) are given as arrays of the same length, and the
+--  function returns, for each reference index (starting at 1), the ID of the FSC/RLIE job
+--  with most recent measurement time which didn't fail to produce a L2A yet
+create function cosims.get_last_jobs_with_usable_l2a (
+  tile_ids_ref text[],
+  high_measurement_time_bounds timestamp[],
+  high_esa_time_bounds timestamp[],
+  l1c_ids_ref text[],
+  allow_codated_jobs boolean,
+  backward_triggered_jobs boolean[]
+)
+  returns table (ref_index bigint, job_id bigint) as $$
+  select ref.idx, last_job.id
+  from unnest(tile_ids_ref, high_measurement_time_bounds, high_esa_time_bounds, l1c_ids_ref, backward_triggered_jobs)
+    with ordinality as ref(tile_id, measurement_bound, esa_bound, l1c_id, backward_triggered, idx) -- one row per reference
+  cross join lateral (
+    select frj.id
+    from cosims.fsc_rlie_jobs frj
+    join cosims.parent_jobs pjt -- from the parent_job table:
+    on frj.fk_parent_job_id=pjt.id -- join the FSC/RLIE table with tile_id selection
+    where (
+      pjt.tile_id=ref.tile_id -- same selection as get_last_job_with_usable_l2a
+      and frj.measurement_date<=ref.measurement_bound
+      and frj.l1c_esa_creation_date<ref.esa_bound
+      and frj.l1c_id!=ref.l1c_id
+      and (
+        frj.l2a_status='generated'
+        or (frj.l2a_status='pending' and pjt.last_status_id not in (13,14,16))
+        or (ref.backward_triggered is true and frj.l2a_status='pending' and pjt.last_status_id!=16)
+      )
+      and (frj.l1c_reference_job is true or allow_codated_jobs is true)
+      )
+    order by frj.measurement_date desc, frj.l1c_esa_creation_date desc, pjt.last_status_change_id desc
+    limit 1 -- keep only the first result for each reference
+  ) last_job;
+$$ language SQL stable;
+
+
 -- Get FSC/RLIE closest jobs, with measurement date more recent than the
 -- low time bound, and focusing on the specified tile. Return at most the
 -- specified number of results (results_limit)
@@ -1229,6 +1290,50 @@ create function cosims.fsc_rlie_jobs_following_measurement_with_tile_id (
 $$ language SQL stable;
 
 
+-- Batch version of fsc_rlie_jobs_following_measurement_with_tile_id restricted to the
+--  candidates of a MAJA backward: the references (tile id, time bounds) are given as
+--  arrays of the same length, and the function returns, for each reference index
+--  (starting at 1), the IDs of the degraded jobs (quality flag 0) which generated a L2A
+--  and were not reprocessed yet, among the 'results_limit' closest following jobs.
+--  At most 'candidates_limit' jobs, with lowest measurement dates, are returned per reference.
+create function cosims.fsc_rlie_backward_candidates_with_tile_ids (
+  tile_ids_ref text[],
+  low_measurement_time_bounds timestamp[],
+  low_l1c_esa_creation_time_bounds timestamp[],
+  results_limit smallint,
+  candidates_limit smallint
+)
+  returns table (ref_index bigint, job_id bigint) as $$
+  select ref.idx, candidate.id
+  from unnest(tile_ids_ref, low_measurement_time_bounds, low_l1c_esa_creation_time_bounds)
+    with ordinality as ref(tile_id, measurement_bound, esa_bound, idx) -- one row per reference
+  cross join lateral (
+    select following_job.id
+    from (
+      select frj.*
+      from cosims.fsc_rlie_jobs frj
+      join cosims.parent_jobs pjt -- from the parent_job table:
+      on frj.fk_parent_job_id=pjt.id -- join the FSC/RLIE table with tile_id selection
+      where (
+        frj.measurement_date>=ref.measurement_bound -- same selection as fsc_rlie_jobs_following_measurement_with_tile_id
+        and frj.l1c_esa_creation_date>ref.esa_bound
+        and pjt.tile_id=ref.tile_id
+        and frj.l1c_reference_job is true
+        )
+      order by frj.measurement_date asc
+      limit results_limit
+    ) following_job
+    where (
+      following_job.l2a_status='generated' -- which generated a L2A
+      and following_job.fsc_path like '%\_0' -- with a degraded quality
+      and following_job.backward_reprocessing_run is not true -- and which did not get reprocessed yet
+      )
+    order by following_job.measurement_date asc
+    limit candidates_limit -- keep only the candidates with lowest measurement dates
+  ) candidate;
+$$ language SQL stable;
+
+
 -- Get last FSC/RLIE job processed with MAJA "init" mode on the specified tile
 create function cosims.fsc_rlie_job_last_init_with_tile_id_no_backward (
   tile_id_ref text,
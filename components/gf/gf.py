@@ -1,7 +1,31 @@
 #!/usr/bin/python3
 
-import os, sys, argparse, datetime, xmltodict, yaml
+import os, sys, argparse, datetime, yaml
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Default number of concurrent gf1 processes, each one holds full tile arrays
+GF1_WORKERS = 2
+
+def gf1WorkerCount(parameters,productCount):
+    # gf1_workers entry of the parameters file, bounded by the number of products
+    workers = parameters.get('gf1_workers')
+    if workers is None:
+        workers = min(GF1_WORKERS,os.cpu_count())
+    return max(1,min(int(workers),productCount))
+
+def produceGf1s(gapFill,gf1Args,gf1Workers):
+    # Daily GFSC1 products are independent, build them in a process pool if
+    # more than one worker, else sequentially stopping at the first failure
+    if gf1Workers > 1:
+        with ProcessPoolExecutor(max_workers=gf1Workers) as executor:
+            return list(executor.map(gapFill,*zip(*gf1Args)))
+    results = []
+    for args in gf1Args:
+        results.append(gapFill(*args))
+        if results[-1] != 0:
+            break
+    return results
 
 def main():
     def deliver(sysargv,parameters,result):
@@ -123,18 +147,10 @@ def main():
         try:
             productType = gfio.getProductType(productTitle)
             productDir = gfio.getDirPath(productTitle)
-            xmlFile = gfio.getFilePath(productTitle,'MTD.xml')
-            productXml = xmltodict.parse(open(xmlFile,'r').read())
-            productStartDate = productXml['gmd:MD_Metadata']['gmd:identificationInfo']['gmd:MD_DataIdentification']['gmd:extent']['gmd:EX_Extent']['gmd:temporalElement']['gmd:EX_TemporalExtent']['gmd:extent']['gml:TimePeriod']['gml:beginPosition']
-            try:
-                productStartDate = datetime.datetime.strptime(productStartDate,"%Y-%m-%dT%H:%M:%S.%f")
-            except:
-                productStartDate = datetime.datetime.strptime(productStartDate,"%Y-%m-%dT%H:%M:%S")
-            productEndDate = productXml['gmd:MD_Metadata']['gmd:identificationInfo']['gmd:MD_DataIdentification']['gmd:extent']['gmd:EX_Extent']['gmd:temporalElement']['gmd:EX_TemporalExtent']['gmd:extent']['gml:TimePeriod']['gml:endPosition']
-            try:
-                productEndDate = datetime.datetime.strptime(productEndDate,"%Y-%m-%dT%H:%M:%S.%f")
-            except:
-                productEndDate = datetime.datetime.strptime(productEndDate,"%Y-%m-%dT%H:%M:%S")
+            productMetadata = gfio.getMetadata(productTitle)
+            productXml = productMetadata['xml']
+            productStartDate = productMetadata['start_date']
+            productEndDate = productMetadata['end_date']
             if productType in ['FSC','WDS','SWS']:
                 productTimeStamp = datetime.datetime.strptime(productTitle.split('_')[1].split('-')[0],"%Y%m%dT%H%M%S")
                 productInputTitles.append([productTitle])
@@ -176,21 +192,24 @@ def main():
     finalProductTimeStamp = productTimeStamps[productOrder[0]]
     finalProductTimeStamp = datetime.datetime(finalProductTimeStamp.year,finalProductTimeStamp.month,finalProductTimeStamp.day,23,59,59)
 
-    #produce GF1s first
+    #produce GF1s first, daily products are independent so they are built concurrently
+    gf1Args = []
     for p in productOrder:
         if productTypes[p] != 'GFSC1':
             continue
-        args = []
+        fsc = []
+        wdsSws = []
         for r,productInputTitle in enumerate(productInputTitles[p]):
             if productInputTypes[p][r] in ['WDS','SWS']:
-                args += ["-w",productInputTitle]
+                wdsSws.append(productInputTitle)
             if productInputTypes[p][r] == 'FSC':
-                args += ["-f",productInputTitle]
-        args += ["-o",sysargv['output_dir']]
-        args += ["-p",productTitles[p]]
-        args += ["-t",sysargv['tmp_dir']]
-        sys.argv[1:] = args
-        result = gf1.main()
+                fsc.append(productInputTitle)
+        gf1Args.append((fsc,wdsSws,sysargv['output_dir'],productTitles[p],sysargv['tmp_dir']))
+    gf1Workers = gf1WorkerCount(parameters,len(gf1Args))
+    if gf1Workers > 1:
+        gfio.log('Producing ',len(gf1Args),' GFSC1 products with ',gf1Workers,' workers')
+    results = produceGf1s(gf1.gapFill,gf1Args,gf1Workers)
+    for result in results:
         if result != 0:
             return deliver(sysargv,parameters,result)
 
@@ -1,10 +1,12 @@
-import os, uuid, datetime, shutil, argparse, gfio, xmltodict, json
+import os, uuid, datetime, shutil, argparse, gfio, gfmerge, xmltodict, json
 import numpy as np
 import validate_cloud_optimized_geotiff
 
 def detectGaps(data, gapvalues):
     gfio.log("Detecting gaps")
-    gap = np.zeros(data.shape,dtype=np.bool)
+    if data.dtype == np.uint8:
+        return gfmerge.gapTable(gapvalues)[data]
+    gap = np.zeros(data.shape,dtype=np.bool_)
     for value in gapvalues:
         gap = gap + (data == value)
     return gap
@@ -17,6 +19,16 @@ def main():
     parser.add_argument('-p','--product-title',help='Output product title')
     parser.add_argument('-t','--tmp-dir',help='Temporary storage directory')
     sysargv = vars(parser.parse_args())
+    return gapFill(sysargv['fsc'],sysargv['wds_sws'],sysargv['output_dir'],sysargv['product_title'],sysargv['tmp_dir'])
+
+def gapFill(fsc,wdsSws,outputDir,productTitle,tmpDir=None):
+    sysargv = {
+        'fsc': fsc,
+        'wds_sws': wdsSws,
+        'output_dir': outputDir,
+        'product_title': productTitle,
+        'tmp_dir': tmpDir
+    }
     if sysargv['fsc'] is None:
         sysargv['fsc'] = []
     if sysargv['wds_sws'] is None:
@@ -183,18 +195,10 @@ def main():
             productType = gfio.getProductType(productTitle)
             productDir = gfio.getDirPath(productTitle)
             productTimeStamp = datetime.datetime.strptime(productTitle.split('_')[1].split('-')[0],"%Y%m%dT%H%M%S")
-            xmlFile = gfio.getFilePath(productTitle,'MTD.xml')
-            productXml = xmltodict.parse(open(xmlFile,'r').read())
-            productStartDate = productXml['gmd:MD_Metadata']['gmd:identificationInfo']['gmd:MD_DataIdentification']['gmd:extent']['gmd:EX_Extent']['gmd:temporalElement']['gmd:EX_TemporalExtent']['gmd:extent']['gml:TimePeriod']['gml:beginPosition']
-            try:
-                productStartDate = datetime.datetime.strptime(productStartDate,"%Y-%m-%dT%H:%M:%S.%f")
-            except:
-                productStartDate = datetime.datetime.strptime(productStartDate,"%Y-%m-%dT%H:%M:%S")
-            productEndDate = productXml['gmd:MD_Metadata']['gmd:identificationInfo']['gmd:MD_DataIdentification']['gmd:extent']['gmd:EX_Extent']['gmd:temporalElement']['gmd:EX_TemporalExtent']['gmd:extent']['gml:TimePeriod']['gml:endPosition']
-            try:
-                productEndDate = datetime.datetime.strptime(productEndDate,"%Y-%m-%dT%H:%M:%S.%f")
-            except:
-                productEndDate = datetime.datetime.strptime(productEndDate,"%Y-%m-%dT%H:%M:%S")
+            productMetadata = gfio.getMetadata(productTitle)
+            productXml = productMetadata['xml']
+            productStartDate = productMetadata['start_date']
+            productEndDate = productMetadata['end_date']
             productDirs.append(productDir)
             productTypes.append(productType)
             productTitles.append(productTitle)
@@ -241,49 +245,75 @@ def main():
             gfio.log("Not the same product. Reprocessing.")
             shutil.rmtree(productDir)
 
+    # Products are composited newest to oldest: a pixel is only taken from an
+    # older product while it is still a gap in the composite, so once no gap
+    # pixel remains the older rasters of the same kind are not even read.
+    # Input rasters are read in strips of gfio.STRIP_ROWS output rows to
+    # bound the memory used by the full resolution layers.
+    fscGapTable = gfmerge.gapTable(fscGapvalues)
+    wscGapTable = gfmerge.gapTable(wscGapvalues)
     gf = NODATA*np.ones(shape=gfShape,dtype=np.uint8)
     qc_gf = NODATA*np.ones(shape=gfShape,dtype=np.uint8)
     qf_gf = np.zeros(shape=gfShape,dtype=np.uint8)
     ad_gf = np.zeros(shape=gfShape,dtype=np.uint32)
+    gap_gf = np.ones(shape=gfShape,dtype=np.bool_)
     success_gf = False
     wsc = NODATA*np.ones(shape=gfShape,dtype=np.uint8)
     qc_wsc = NODATA*np.ones(shape=gfShape,dtype=np.uint8)
     ad_wsc = np.zeros(shape=gfShape,dtype=np.uint32)
+    gap_wsc = np.ones(shape=gfShape,dtype=np.bool_)
     success_wsc = False
     for p in productOrder:
         try:
             if productTypes[p] == 'FSC':
-                gfSub, geoTransform, projectionRef = gfio.readRaster(gfio.getFilePath(productTitles[p],'FSCOG.tif'))
-                qcSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QCOG.tif'))[0]
-                qfSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QCFLAGS.tif'))[0]
-                gfSub = gfio.upscale(gfSub, scale, NODATA, fscMin, fscMax, fscClasses)
-                qcSub = gfio.upscale(qcSub, scale, NODATA, qcMin, qcMax, qcClasses)
-                qfSub = gfio.upscale(qfSub, scale, NODATA, qfMin, qfMax, qfClasses)
-                adSub = int(productStartDates[p].timestamp())*np.ones(shape=gfShape,dtype=np.uint32)
-                if success_gf:
-                    gap = detectGaps(gf,fscGapvalues)*~detectGaps(gfSub,fscGapvalues)
-                else:
-                    gap = np.ones(shape=gfShape,dtype=np.bool)
-                np.copyto(gf,gfSub,where=gap)
-                np.copyto(qc_gf,qcSub,where=gap)
-                np.copyto(qf_gf,qfSub,where=gap)
-                np.copyto(ad_gf,adSub,where=gap)
+                if success_gf and not gap_gf.any():
+                    gfio.log("No gap left in FSC composite, skipping ", productTitles[p])
+                    continue
+                gfFile, qcFile, qfFile = [gfio.openRaster(gfio.getFilePath(productTitles[p],fileId)) for fileId in ['FSCOG.tif','QCOG.tif','QCFLAGS.tif']]
+                geoTransform = gfFile.GetGeoTransform()
+                projectionRef = gfFile.GetProjectionRef()
+                adSub = np.uint32(int(productStartDates[p].timestamp()))
+                for row, rowCount in gfio.rasterStrips(gfShape[0]):
+                    strip = slice(row,row+rowCount)
+                    if success_gf and not gap_gf[strip].any():
+                        continue
+                    gfSub = gfio.readRasterWindow(gfFile,row*scale,rowCount*scale)
+                    gfSub = gfio.upscale(gfSub, scale, NODATA, fscMin, fscMax, fscClasses)
+                    gap, gap_gf[strip] = gfmerge.compositeGaps(gap_gf[strip],gfSub,fscGapTable,success_gf)
+                    np.copyto(gf[strip],gfSub,where=gap)
+                    qcSub = gfio.readRasterWindow(qcFile,row*scale,rowCount*scale)
+                    qcSub = gfio.upscale(qcSub, scale, NODATA, qcMin, qcMax, qcClasses)
+                    np.copyto(qc_gf[strip],qcSub,where=gap)
+                    qfSub = gfio.readRasterWindow(qfFile,row*scale,rowCount*scale)
+                    qfSub = gfio.upscale(qfSub, scale, NODATA, qfMin, qfMax, qfClasses)
+                    np.copyto(qf_gf[strip],qfSub,where=gap)
+                    np.copyto(ad_gf[strip],adSub,where=gap)
+                gfFile, qcFile, qfFile = None, None, None
                 success_gf = True
             if productTypes[p] in ['WDS','SWS']:
+                if success_wsc and not gap_wsc.any():
+                    gfio.log("No gap left in wet snow composite, skipping ", productTitles[p])
+                    continue
                 if productTypes[p] == 'WDS':
                     fileId = 'SSC'
                 if productTypes[p] == 'SWS':
                     fileId = 'WSM'
-                wscSub, geoTransform, projectionRef = gfio.readRaster(gfio.getFilePath(productTitles[p],fileId+'.tif'))
-                qcSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QC'+fileId+'.tif'))[0]
-                adSub = int(productStartDates[p].timestamp())*np.ones(shape=gfShape,dtype=np.uint32)
-                if success_wsc:
-                    gap = detectGaps(wsc,wscGapvalues)*~detectGaps(wscSub,wscGapvalues)
-                else:
-                    gap = np.ones(shape=gfShape,dtype=np.bool)
-                np.copyto(wsc,wscSub,where=gap)
-                np.copyto(qc_wsc,qcSub,where=gap)
-                np.copyto(ad_wsc,adSub,where=gap)
+                wscFile = gfio.openRaster(gfio.getFilePath(productTitles[p],fileId+'.tif'))
+                qcFile = gfio.openRaster(gfio.getFilePath(productTitles[p],'QC'+fileId+'.tif'))
+                geoTransform = wscFile.GetGeoTransform()
+                projectionRef = wscFile.GetProjectionRef()
+                adSub = np.uint32(int(productStartDates[p].timestamp()))
+                for row, rowCount in gfio.rasterStrips(gfShape[0]):
+                    strip = slice(row,row+rowCount)
+                    if success_wsc and not gap_wsc[strip].any():
+                        continue
+                    wscSub = gfio.readRasterWindow(wscFile,row,rowCount)
+                    gap, gap_wsc[strip] = gfmerge.compositeGaps(gap_wsc[strip],wscSub,wscGapTable,success_wsc)
+                    np.copyto(wsc[strip],wscSub,where=gap)
+                    qcSub = gfio.readRasterWindow(qcFile,row,rowCount)
+                    np.copyto(qc_wsc[strip],qcSub,where=gap)
+                    np.copyto(ad_wsc[strip],adSub,where=gap)
+                wscFile, qcFile = None, None
                 success_wsc = True
         except Exception as e:
             print("Problem in processing ", productTitles[p])
@@ -293,9 +323,9 @@ def main():
     fuwFile = gfio.getFilePath('FUW___'+gfio.getTile(productTitles[0]))
     fuw = gfio.readRaster(fuwFile)[0]
 
-    if np.sum(detectGaps(gf,fscGapvalues)) != 0 and np.sum(wsc==WETSNOW) != 0:
+    if np.sum(gap_gf) != 0 and np.sum(wsc==WETSNOW) != 0:
         # snow status derived
-        gap = detectGaps(gf,fscGapvalues)*(wsc==WETSNOW)
+        gap = gap_gf*(wsc==WETSNOW)
         gapCount = np.sum(gap)
         if gapCount != 0:
             gfio.log('SSD gap filling started. Number of gap pixels to be filled:',gapCount)
@@ -469,8 +499,7 @@ def main():
     productXml['gmd:MD_Metadata']['gmd:series']['gmd:DS_OtherAggregate']['gmd:seriesMetadata'] = []
     for p in np.argsort(productTimeStamps).tolist():
         productInputTitle = productTitles[p]
-        xmlFile = gfio.getFilePath(productInputTitle,'MTD.xml')
-        productInputXml = xmltodict.parse(open(xmlFile,'r').read())
+        productInputXml = productXmls[p]
         productInputXml['gmd:MD_Metadata']['gmd:identificationInfo']['gmd:MD_DataIdentification']['gmd:extent']['gmd:EX_Extent']['gmd:temporalElement']['gmd:EX_TemporalExtent']['gmd:extent']['gml:TimePeriod']['@gml:id'] = productInputTitle
         productXml['gmd:MD_Metadata']['gmd:series']['gmd:DS_OtherAggregate']['gmd:seriesMetadata'].append(productInputXml)
     productXml = xmltodict.unparse(productXml, pretty=True)
@@ -1,4 +1,4 @@
-import os, uuid, datetime, shutil, json, argparse, gfio, xmltodict
+import os, uuid, datetime, shutil, json, argparse, gfio, gfmerge, xmltodict
 import numpy as np
 import validate_cloud_optimized_geotiff
 
@@ -189,18 +189,10 @@ def main():
                 productTimeStamp = datetime.datetime.strptime(productTitle.split('_')[1].split('-')[0],"%Y%m%dT%H%M%S")
             else:
                 productTimeStamp = datetime.datetime.strptime(productTitle.split('_')[1].split('-')[0],"%Y%m%d")
-            xmlFile = gfio.getFilePath(productTitle,'MTD.xml')
-            productXml = xmltodict.parse(open(xmlFile,'r').read())
-            productStartDate = productXml['gmd:MD_Metadata']['gmd:identificationInfo']['gmd:MD_DataIdentification']['gmd:extent']['gmd:EX_Extent']['gmd:temporalElement']['gmd:EX_TemporalExtent']['gmd:extent']['gml:TimePeriod']['gml:beginPosition']
-            try:
-                productStartDate = datetime.datetime.strptime(productStartDate,"%Y-%m-%dT%H:%M:%S.%f")
-            except:
-                productStartDate = datetime.datetime.strptime(productStartDate,"%Y-%m-%dT%H:%M:%S")
-            productEndDate = productXml['gmd:MD_Metadata']['gmd:identificationInfo']['gmd:MD_DataIdentification']['gmd:extent']['gmd:EX_Extent']['gmd:temporalElement']['gmd:EX_TemporalExtent']['gmd:extent']['gml:TimePeriod']['gml:endPosition']
-            try:
-                productEndDate = datetime.datetime.strptime(productEndDate,"%Y-%m-%dT%H:%M:%S.%f")
-            except:
-                productEndDate = datetime.datetime.strptime(productEndDate,"%Y-%m-%dT%H:%M:%S")
+            productMetadata = gfio.getMetadata(productTitle)
+            productXml = productMetadata['xml']
+            productStartDate = productMetadata['start_date']
+            productEndDate = productMetadata['end_date']
             productDirs.append(productDir)
             productTypes.append(productType)
             productTitles.append(productTitle)
@@ -234,16 +226,8 @@ def main():
         if productTypes[p] == 'FSC':
             if productTimeStamps[p] > productTimeStamp-datetime.timedelta(days=int(sysargv['day_delta'])):
                 productInputTitles = [productTitles[p]]
-                productInputTimeStamp = productXmls[p]['gmd:MD_Metadata']['gmd:identificationInfo']['gmd:MD_DataIdentification']['gmd:extent']['gmd:EX_Extent']['gmd:temporalElement']['gmd:EX_TemporalExtent']['gmd:extent']['gml:TimePeriod']['gml:beginPosition']
-                try:
-                    productInputTimeStamp = datetime.datetime.strptime(productInputTimeStamp,"%Y-%m-%dT%H:%M:%S.%f")
-                except:
-                    productInputTimeStamp = datetime.datetime.strptime(productInputTimeStamp,"%Y-%m-%dT%H:%M:%S")
-                productInputEndTimeStamp = productXmls[p]['gmd:MD_Metadata']['gmd:identificationInfo']['gmd:MD_DataIdentification']['gmd:extent']['gmd:EX_Extent']['gmd:temporalElement']['gmd:EX_TemporalExtent']['gmd:extent']['gml:TimePeriod']['gml:endPosition']
-                try:
-                    productInputEndTimeStamp = datetime.datetime.strptime(productInputEndTimeStamp,"%Y-%m-%dT%H:%M:%S.%f")
-                except:
-                    productInputEndTimeStamp = datetime.datetime.strptime(productInputEndTimeStamp,"%Y-%m-%dT%H:%M:%S")
+                productInputTimeStamp = productStartDates[p]
+                productInputEndTimeStamp = productEndDates[p]
                 productInputTimeStamps = [productInputTimeStamp]
                 productInputEndTimeStamps = [productInputEndTimeStamp]
                 productUniqueInputXml = [productXmls[p]]
@@ -256,16 +240,7 @@ def main():
             productInputEndTimeStamps = []
             productUniqueInputXml = []
             for productInputXml in productInputXmls:
-                productInputTimeStamp = productInputXml['gmd:MD_Metadata']['gmd:identificationInfo']['gmd:MD_DataIdentification']['gmd:extent']['gmd:EX_Extent']['gmd:temporalElement']['gmd:EX_TemporalExtent']['gmd:extent']['gml:TimePeriod']['gml:beginPosition']
-                try:
-                    productInputTimeStamp = datetime.datetime.strptime(productInputTimeStamp,"%Y-%m-%dT%H:%M:%S.%f")
-                except:
-                    productInputTimeStamp = datetime.datetime.strptime(productInputTimeStamp,"%Y-%m-%dT%H:%M:%S")
-                productInputEndTimeStamp = productInputXml['gmd:MD_Metadata']['gmd:identificationInfo']['gmd:MD_DataIdentification']['gmd:extent']['gmd:EX_Extent']['gmd:temporalElement']['gmd:EX_TemporalExtent']['gmd:extent']['gml:TimePeriod']['gml:endPosition']
-                try:
-                    productInputEndTimeStamp = datetime.datetime.strptime(productInputEndTimeStamp,"%Y-%m-%dT%H:%M:%S.%f")
-                except:
-                    productInputEndTimeStamp = datetime.datetime.strptime(productInputEndTimeStamp,"%Y-%m-%dT%H:%M:%S")
+                productInputTimeStamp, productInputEndTimeStamp = gfio.getTimePeriod(productInputXml)
                 if productInputTimeStamp > productTimeStamp-datetime.timedelta(days=int(sysargv['day_delta'])):
                     productInputTitles.append(productInputXml['gmd:MD_Metadata']['gmd:fileIdentifier']['gco:CharacterString'])
                     productInputTimeStamps.append(productInputTimeStamp)
@@ -287,36 +262,42 @@ def main():
         qf = np.zeros(shape=gfShape,dtype=np.uint8)
         ad = np.zeros(shape=gfShape,dtype=np.uint32)
         success = False
-        for p in productOrder:
+        # Input rasters are read in strips of gfio.STRIP_ROWS output rows to
+        # bound the memory used by the full resolution layers.
+        # Incremental mode: the previous GFSC is merged last, pixel by pixel
+        # (see gfmerge). Input days already included in the previous GFSC are
+        # not given again (see RunGfscWorker.find_obsolete_input_products).
+        windowStart = (productTimeStamp-datetime.timedelta(days=int(sysargv['day_delta']))).timestamp()
+        for p in gfmerge.compositeOrder(productOrder,productTypes):
             try:
                 productStartDate = productStartDates[p]
                 productEndDate = productEndDates[p]
                 if productTypes[p] == 'FSC':
-                    gfSub, geoTransform, projectionRef = gfio.readRaster(gfio.getFilePath(productTitles[p],'FSCOG.tif'))
-                    qcSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QCOG.tif'))[0]
-                    qfSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QCFLAGS.tif'))[0]
-                    gfSub = gfio.upscale(gfSub, scale, NODATA, fscMin, fscMax, fscClasses)
-                    qcSub = gfio.upscale(qcSub, scale, NODATA, qcMin, qcMax, qcClasses)
-                    qfSub = gfio.upscale(qfSub, scale, NODATA, qfMin, qfMax, qfClasses)
-                    adSub = int(productStartDate.timestamp())*np.ones(shape=gfShape,dtype=np.uint32)
-                if productTypes[p] == 'GFSC':
-                    gfSub, geoTransform, projectionRef = gfio.readRaster(gfio.getFilePath(productTitles[p],'GF.tif'))
-                    qcSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QC.tif'))[0]
-                    qfSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QCFLAGS.tif'))[0]
-                    adSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'AT.tif'))[0]
-                if productTypes[p] == 'GFSC1':
-                    gfSub, geoTransform, projectionRef = gfio.readRaster(gfio.getFilePath(productTitles[p],'GF.tif'))
-                    qcSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QC.tif'))[0]
-                    qfSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QCFLAGS.tif'))[0]
-                    adSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'AT.tif'))[0]
-                if success:
-                    gap = detectGaps(gf,fscGapvalues)*~detectGaps(gfSub,[NODATA])*(adSub>(productTimeStamp-datetime.timedelta(days=int(sysargv['day_delta']))).timestamp())
-                else:
-                    gap = adSub>=(productTimeStamp-datetime.timedelta(days=int(sysargv['day_delta']))).timestamp()
-                np.copyto(gf,gfSub,where=gap)
-                np.copyto(qc,qcSub,where=gap)
-                np.copyto(qf,qfSub,where=gap)
-                np.copyto(ad,adSub,where=gap)
+                    productFiles = [gfio.openRaster(gfio.getFilePath(productTitles[p],fileId)) for fileId in ['FSCOG.tif','QCOG.tif','QCFLAGS.tif']]
+                    productScale = scale
+                if productTypes[p] in ['GFSC','GFSC1']:
+                    productFiles = [gfio.openRaster(gfio.getFilePath(productTitles[p],fileId)) for fileId in ['GF.tif','QC.tif','QCFLAGS.tif','AT.tif']]
+                    productScale = 1
+                geoTransform = productFiles[0].GetGeoTransform()
+                projectionRef = productFiles[0].GetProjectionRef()
+                for row, rowCount in gfio.rasterStrips(gfShape[0]):
+                    strip = slice(row,row+rowCount)
+                    gfGap = None
+                    if success:
+                        gfGap = detectGaps(gf[strip],fscGapvalues)
+                        if productTypes[p] != 'GFSC' and not gfGap.any():
+                            continue
+                    subs = [gfio.readRasterWindow(productFile,row*productScale,rowCount*productScale) for productFile in productFiles]
+                    if productTypes[p] == 'FSC':
+                        gfSub = gfio.upscale(subs[0], scale, NODATA, fscMin, fscMax, fscClasses)
+                        qcSub = gfio.upscale(subs[1], scale, NODATA, qcMin, qcMax, qcClasses)
+                        qfSub = gfio.upscale(subs[2], scale, NODATA, qfMin, qfMax, qfClasses)
+                        adSub = int(productStartDate.timestamp())*np.ones(shape=gfSub.shape,dtype=np.uint32)
+                    else:
+                        gfSub, qcSub, qfSub, adSub = subs
+                    subs = None
+                    gfmerge.mergeProduct([gf[strip],qc[strip],qf[strip],ad[strip]],[gfSub,qcSub,qfSub,adSub],windowStart,fscGapvalues,NODATA,first=not success,previousGfsc=productTypes[p] == 'GFSC',gfGap=gfGap)
+                productFiles = None
                 success = True
             except Exception as e:
                 gfio.log("Problem in processing ", productTitles[p])
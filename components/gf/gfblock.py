@@ -0,0 +1,81 @@
+import numpy as np
+
+# Block reduction engine used to upscale 20 m rasters to the 60 m GF grid.
+#
+# The reductions work on a strided view of the input raster instead of
+# gathering pixels through fancy-indexed row/col cubes, so no full size copy
+# of the input is allocated. Each output pixel is computed from the samples
+# historically used by the upscaling: the pixels on the diagonal of its
+# scale x scale block, each one weighted scale times.
+
+def blockSamples(data,scale):
+    # (rows, cols, scale) read-only view on the samples of every output block
+    newShape = tuple(map(int,(data.shape[0]/scale,data.shape[1]/scale)))
+    blocks = data[:newShape[0]*scale,:newShape[1]*scale].reshape(newShape[0],scale,newShape[1],scale)
+    return np.diagonal(blocks,axis1=1,axis2=3)
+
+def dtypeBits(dtype):
+    return int(str(np.dtype(dtype)).replace('uint','').replace('int',''))
+
+def blockMean(data,scale):
+    samples = blockSamples(data,scale)
+    newData = np.sum(samples,axis=2,dtype=np.float64)/scale
+    return newData.astype(data.dtype)
+
+def blockValidMean(data,scale,noData,valueMin,valueMax):
+    samples = blockSamples(data,scale)
+    valueMask = (samples >= valueMin)*(samples <= valueMax)
+    valueCount = np.count_nonzero(valueMask,axis=2)
+    valueSum = np.sum(samples,axis=2,where=valueMask,dtype=np.float64)
+    newData = np.full(valueCount.shape,noData,dtype=np.float64)
+    np.divide(valueSum,valueCount,out=newData,where=valueCount != 0)
+    return np.rint(newData).astype(data.dtype)
+
+def blockMajorityClass(data,scale,noData,classes,valueMin=None,valueMax=None):
+    samples = blockSamples(data,scale)
+    newData = noData*np.ones(shape=samples.shape[:2],dtype=data.dtype)
+    classCount = np.zeros(shape=samples.shape[:2],dtype=np.int32)
+    dataClass = samples
+    if valueMax is not None:
+        # values in range are counted as a single valueMax class
+        valueMask = (samples >= valueMin)*(samples <= valueMax)
+        dataClass = np.where(valueMask,valueMax,samples)
+        count = np.count_nonzero(dataClass == valueMax,axis=2)
+        count = count >= scale*0.5
+        np.place(newData,count,valueMax)
+        np.place(classCount,count,scale)
+    for classValue in classes:
+        classMask = dataClass == classValue
+        if not np.any(classMask):
+            continue
+        count = np.count_nonzero(classMask,axis=2)
+        np.place(newData,count > classCount,classValue)
+        np.copyto(classCount,count,where=count > classCount)
+    return newData
+
+def blockBitMajority(data,scale):
+    samples = blockSamples(data,scale)
+    threshold = (float(np.prod(data.shape))/np.prod(samples.shape[:2]))/2.
+    newData = np.zeros(shape=samples.shape[:2],dtype=data.dtype)
+    for b in range(dtypeBits(data.dtype)):
+        count = scale*np.count_nonzero(np.bitwise_and(np.right_shift(samples,b),1),axis=2)
+        mask = count >= threshold
+        newData = np.bitwise_or(newData,np.left_shift(mask.astype(data.dtype),b))
+    return newData
+
+def upscale(data,scale,noData=None,valueMin=None,valueMax=None,classes=[]):
+    if scale == 1:
+        return data
+    if noData is None and valueMin is None and valueMax is None and classes == []:
+        return blockMean(data,scale)
+    if valueMax is None and classes == []:
+        return blockBitMajority(data,scale)
+    if classes == []:
+        return blockValidMean(data,scale,noData,valueMin,valueMax)
+    newDataClass = blockMajorityClass(data,scale,noData,classes,valueMin,valueMax)
+    if valueMax is None:
+        return newDataClass
+    newData = blockValidMean(data,scale,noData,valueMin,valueMax)
+    newValueMask = (newData >= valueMin)*(newData <= valueMax)
+    np.copyto(newData,newDataClass,where=~newValueMask)
+    return newData
@@ -1,9 +1,12 @@
-import gdal, os, alphashape, datetime, argparse, yaml
-from shapely.geometry import Polygon, LineString, Point
+import gdal, os, datetime, argparse, yaml, xmltodict, gfblock
+from shapely.geometry import Polygon, LineString, Point, MultiPoint
 import numpy as np
 import mahotas as mh
 from osgeo import osr
 
+# Rows per strip for window reading, aligned with the 1024x1024 COG tiling
+STRIP_ROWS = 1024
+
 def log(*message):
         message = map(str,message)
         message = ''.join(message)
@@ -61,6 +64,36 @@ def getFilePath(title,id=None):
     filePath = os.path.join(getDirPath(title),getFileName(title,id))
     return filePath
 
+def parseMetadataDate(date):
+    try:
+        return datetime.datetime.strptime(date,"%Y-%m-%dT%H:%M:%S.%f")
+    except:
+        return datetime.datetime.strptime(date,"%Y-%m-%dT%H:%M:%S")
+
+def getTimePeriod(productXml):
+    timePeriod = productXml['gmd:MD_Metadata']['gmd:identificationInfo']['gmd:MD_DataIdentification']['gmd:extent']['gmd:EX_Extent']['gmd:temporalElement']['gmd:EX_TemporalExtent']['gmd:extent']['gml:TimePeriod']
+    return parseMetadataDate(timePeriod['gml:beginPosition']), parseMetadataDate(timePeriod['gml:endPosition'])
+
+# Parsed MTD.xml of the input products, by product title. gf, gf1 and gf2 run
+# in the same process so each input metadata file is only parsed once. The
+# cached dicts are embedded as is in the seriesMetadata of the products made
+# from them. Products written during the run must not be looked up before
+# they are complete.
+metadataCache = {}
+
+def getMetadata(title):
+    if title not in metadataCache:
+        xmlFile = getFilePath(title,'MTD.xml')
+        productXml = xmltodict.parse(open(xmlFile,'r').read())
+        startDate, endDate = getTimePeriod(productXml)
+        metadataCache[title] = {
+            'identifier': productXml['gmd:MD_Metadata']['gmd:fileIdentifier']['gco:CharacterString'],
+            'start_date': startDate,
+            'end_date': endDate,
+            'xml': productXml
+        }
+    return metadataCache[title]
+
 def readRaster(fname):
     log("Reading ",fname)
     try:
@@ -75,6 +108,22 @@ def readRaster(fname):
         log("Problem in reading ", fname)
         return None
 
+def openRaster(fname):
+    log("Opening ",fname)
+    gtif = gdal.Open(fname)
+    if gtif is None:
+        raise IOError("Problem in reading "+fname)
+    return gtif
+
+def readRasterWindow(gtif,row,rowCount):
+    data = gtif.GetRasterBand(1)
+    return np.array(data.ReadAsArray(0,row,data.XSize,rowCount))
+
+def rasterStrips(rowCount,stripRows=STRIP_ROWS):
+    # (row, rowCount) of the strips covering rowCount rows
+    for row in range(0,rowCount,stripRows):
+        yield row, min(stripRows,rowCount-row)
+
 def writeRaster(fname,rasterData, geoTransform, projectionRef, colorMap = None):
     log("Writing into file")
     if rasterData.dtype == np.uint8:
@@ -131,80 +180,8 @@ def writeThumbnail(fname,rasterData,colorMap=None):
 def upscale(data,scale,noData=None,valueMin=None,valueMax=None, classes = []):
     if scale == 1:
         return data
-    if valueMin is None:
-        valueMax is None
     log("Upscaling raster")
-    newShape = tuple(map(int,(data.shape[0]/scale,data.shape[1]/scale)))
-    rind = np.indices(newShape)[0]*scale
-    cind = np.indices(newShape)[1]*scale
-
-    rowi = rind
-    coli = cind
-    for j in range(1,scale):
-        rowi = np.dstack((rowi,rind))
-        coli = np.dstack((coli,cind))
-    row = rowi
-    col = coli
-
-    for i in range(1,scale):
-        rowi = rind+i
-        coli = cind+i
-        for j in range(1,scale):
-            rowi = np.dstack((rowi,rind+i))
-            coli = np.dstack((coli,cind+i))
-        row = np.dstack((row,rowi))
-        col = np.dstack((col,coli))
-    if noData is None and valueMin is None and valueMax is None and classes == []:
-        dataValue = np.copy(data).astype(np.float64)
-        newData = np.mean(dataValue[row,col],axis=2)
-        newData = newData.astype(data.dtype)
-        return newData
-    else:
-        dataClass = np.copy(data)
-        if valueMax is not None:
-            dataValue = np.copy(data).astype(np.float64)
-            valueMask = (dataValue >= valueMin)*(dataValue <= valueMax)
-            np.place(dataValue,~valueMask,np.nan)
-            newDataValue = np.nanmean(dataValue[row,col],axis=2)
-            np.place(newDataValue,np.isnan(newDataValue),noData)
-            newDataValue = np.rint(newDataValue).astype(data.dtype)
-            np.place(dataClass,valueMask,valueMax)
-
-        if classes != []:
-            newDataClass = noData*np.ones(shape=newShape,dtype=data.dtype)
-            classCount = np.zeros(shape=newShape,dtype=np.int32)
-            classValues = classes
-            if valueMax is not None:
-                count = np.sum(dataClass[row,col]==valueMax,axis=2)
-                count = count >= scale*scale*0.5
-                np.place(newDataClass,count,valueMax)
-                np.place(classCount,count,scale*scale)
-            for classValue in classValues:
-                if np.sum(dataClass==classValue) == 0:
-                    continue
-                count = np.sum(dataClass[row,col]==classValue,axis=2)
-                np.place(newDataClass,count > classCount,classValue)
-                np.copyto(classCount, count, where= count > classCount)
-
-        if valueMax is not None and classes != []:
-            newValueMask = (newDataValue >= valueMin)*(newDataValue <= valueMax)
-            np.copyto(newDataValue,newDataClass,where=~newValueMask)
-            newData = newDataValue
-
-        if valueMax is not None and classes == []:
-            newData = newDataValue
-
-        if valueMax is None and classes != []:
-            newData = newDataClass
-
-        if valueMax is None and classes == []:  #bitwise
-            newData = np.zeros(shape=newShape,dtype=data.dtype)
-            for b in range(int(str(data.dtype).replace('uint','').replace('int',''))):
-                mask = np.bitwise_and(np.right_shift(data,b),1)
-                count = np.sum(mask[row,col],axis=2)
-                mask = count >= (float(np.prod(data.shape))/np.prod(newShape))/2.
-                newData = np.bitwise_or(newData,np.left_shift(mask.astype(data.dtype),b))
-    return newData
+    return gfblock.upscale(data,scale,noData,valueMin,valueMax,classes)
 
 def setBit(data,bit,value,where=None):
     if where is None:
@@ -224,67 +201,53 @@ def getBit(data,bit):
     mask = np.bitwise_and(np.right_shift(data,bit),1)
     return mask.astype(np.bool)
 
+def getEdgePoints(mask):
+    # (col,row) of the leftmost and rightmost True pixels of every row
+    rows = np.flatnonzero(mask.any(axis=1))
+    rowMask = mask[rows]
+    left = rowMask.argmax(axis=1)
+    right = mask.shape[1]-1-rowMask[:,::-1].argmax(axis=1)
+    points = np.empty((2*rows.shape[0],2),dtype=np.int64)
+    points[0::2,0] = left
+    points[1::2,0] = right
+    points[0::2,1] = rows
+    points[1::2,1] = rows
+    return points
+
 def getAlphashape(raster,noData, geoTransform, projectionRef):
     log("Calculating alphashape")
-    productPoints = []
-    productIndices = np.indices(raster.shape).transpose(1,2,0)
-    if np.sum(raster!=noData) != 0:
-        cLeft, cRight = 0,raster.shape[1]
-        for c, col in enumerate(raster.transpose(1,0)):
-            colMask = col != noData
-            if np.sum(colMask) != 0:
-                cLeft = c
-                break
-        for c, col in enumerate(raster.transpose(1,0)[::-1]):
-            colMask = col != noData
-            if np.sum(colMask) != 0:
-                cRight = colMask.shape[0]-c
-                break
-        for r,row in enumerate(raster):
-            rowMask = row[cLeft:cRight] != noData
-            if np.sum(rowMask) == 0:
-                continue
-            for c,leftPoint in enumerate(rowMask):
-                if leftPoint:
-                    productPoints.append(productIndices[r,c+cLeft][::-1])
-                    break
-            for c,rightPoint in enumerate(rowMask[::-1]):
-                if rightPoint:
-                    productPoints.append(productIndices[r,cRight-1-c][::-1])
-                    break
-    
+    productPoints = getEdgePoints(raster != noData)
+
     # Exception for nonpolygon boundaries
     if len(productPoints) == 0:
         # Probably not possible
         log('Warning: No point can be deduced to calculate alphashape. Raster is probably all nodata. Using maximum extent.')
-        productPoints = [productIndices[0][0],productIndices[0][1],productIndices[1][0],productIndices[1][1]]
+        productPoints = np.array([[0,0],[0,1],[1,0],[1,1]])
     else:
-        productAlphashape = alphashape.alphashape(productPoints, 0.)
+        productAlphashape = MultiPoint(productPoints.tolist()).convex_hull
         if type(productAlphashape) is LineString or type(productAlphashape) is Point:
             log('Warning: Deduced points to calculate alphashape forms a %s, not form a polygon. Using a slightly larger rectangle.' % type(productAlphashape).__name__)
             # xmin ymin xmax ymax
-            productPoints = [min(list(zip(*productPoints))[0]),min(list(zip(*productPoints))[1]),max(list(zip(*productPoints))[0]),max(list(zip(*productPoints))[1])]
+            productPoints = [productPoints[:,0].min(),productPoints[:,1].min(),productPoints[:,0].max(),productPoints[:,1].max()]
             # set offset if on the border
             productPoints[0] = 1 if productPoints[0] == 0 else productPoints[0]
             productPoints[1] = 1 if productPoints[1] == 0 else productPoints[1]
-            productPoints[2] = productIndices[-1][-1][0]-1 if productPoints[2] == productIndices[-1][-1][0] else productPoints[2]
-            productPoints[3] = productIndices[-1][-1][1]-1 if productPoints[3] == productIndices[-1][-1][1] else productPoints[3]
+            productPoints[2] = raster.shape[0]-2 if productPoints[2] == raster.shape[0]-1 else productPoints[2]
+            productPoints[3] = raster.shape[1]-2 if productPoints[3] == raster.shape[1]-1 else productPoints[3]
             # make it 1 pixel larger
             productPoints = [(productPoints[0]-1,productPoints[1]-1),(productPoints[0]-1,productPoints[3]+1),(productPoints[2]+1,productPoints[1]-1),(productPoints[2]+1,productPoints[3]+1)]
-            productAlphashape = alphashape.alphashape(productPoints, 0.)
-        productPoints = productAlphashape.exterior.coords[:]
-        
+            productAlphashape = MultiPoint(productPoints).convex_hull
+        productPoints = np.array(productAlphashape.exterior.coords[:])
+
     source = osr.SpatialReference()
     source.ImportFromWkt(projectionRef)
     target = osr.SpatialReference()
     target.ImportFromEPSG(4326)
     transform = osr.CoordinateTransformation(source,target)
-    for p,productPoint in enumerate(productPoints):
-        productPoint = [productPoint[0]+0.5,productPoint[1]+0.5]
-        productPoint = (geoTransform[0] + productPoint[0]*geoTransform[1],geoTransform[3] + productPoint[1]*geoTransform[5])
-        productPoint = transform.TransformPoint(productPoint[0],productPoint[1])
-        productPoints[p] = [productPoint[1],productPoint[0]]
-    productPoints = Polygon(productPoints)
+    productPoints = productPoints+0.5
+    productPoints = np.stack((geoTransform[0] + productPoints[:,0]*geoTransform[1],geoTransform[3] + productPoints[:,1]*geoTransform[5]),axis=1)
+    productPoints = transform.TransformPoints(productPoints.tolist())
+    productPoints = Polygon([[productPoint[1],productPoint[0]] for productPoint in productPoints])
     return str(productPoints)
 
 def getGeoBounds(raster,geoTransform,projectionRef):
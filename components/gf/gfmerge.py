@@ -0,0 +1,50 @@
+import numpy as np
+
+# Pixel-wise compositing of the gf1 and gf2 input products, on strips of the
+# GF grid.
+#
+# gf1 composites its FSC and WDS/SWS inputs newest to oldest: a pixel is only
+# taken from an older product while it is still a gap in the composite.
+#
+# In gf2, the new GFSC1/FSC inputs are composited newest first, then the
+# previous GFSC is merged last. Its pixels fill the remaining gaps and replace
+# the observations of the new inputs older than their own AT, and pixels whose
+# AT fell out of the aggregation timespan expire.
+
+def gapTable(gapvalues):
+    # 256-entry lookup table of gap membership for uint8 rasters
+    table = np.zeros(256,dtype=np.uint8)
+    table[gapvalues] = 1
+    return table.view(np.bool_)
+
+def detectGaps(data,gapvalues):
+    return np.isin(data,gapvalues)
+
+def compositeGaps(stillGap,dataSub,table,success):
+    # gf1: pixels to take from dataSub and the updated still-gap mask
+    if not success:
+        return np.ones(stillGap.shape,dtype=np.bool_), table[dataSub]
+    gapSub = table[dataSub]
+    gap = stillGap*~gapSub
+    return gap, stillGap*gapSub
+
+def compositeOrder(productOrder,productTypes):
+    # gf2: new GFSC1/FSC inputs in productOrder (newest first), then the previous GFSC
+    return [p for p in productOrder if productTypes[p] != 'GFSC'] + [p for p in productOrder if productTypes[p] == 'GFSC']
+
+def mergeProduct(layers,subs,windowStart,gapvalues,noData,first=False,previousGfsc=False,gfGap=None):
+    # gf2: copies the GF, QC, QCFLAGS and AT layers of an input product into the
+    # composite layers, in place. The first product gives every pixel in the
+    # aggregation timespan, the next ones fill the composite gaps.
+    gf, ad = layers[0], layers[3]
+    gfSub, adSub = subs[0], subs[3]
+    if first:
+        gap = adSub>=windowStart
+    else:
+        if gfGap is None:
+            gfGap = detectGaps(gf,gapvalues)
+        gap = gfGap*~detectGaps(gfSub,[noData])*(adSub>windowStart)
+        if previousGfsc:
+            gap += ~detectGaps(gfSub,gapvalues)*(adSub>ad)*(adSub>windowStart)
+    for layer, sub in zip(layers,subs):
+        np.copyto(layer,sub,where=gap)
@@ -0,0 +1,67 @@
+import gf
+
+
+class RecordingExecutor(object):
+    """In-process stand-in of ProcessPoolExecutor recording its pool size."""
+    instances = []
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        RecordingExecutor.instances.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
+
+
+def gf1Args(count):
+    return [(['FSC_%d' % i], [], 'output', 'GFSC1_%d' % i, 'tmp') for i in range(count)]
+
+
+def recordingGapFill(calls, failing=()):
+    def gapFill(fsc, wdsSws, outputDir, productTitle, tmpDir=None):
+        calls.append(productTitle)
+        return 1 if productTitle in failing else 0
+    return gapFill
+
+
+def test_gf1_worker_count(monkeypatch):
+    monkeypatch.setattr(gf.os, 'cpu_count', lambda: 64)
+    # Small bounded default instead of the number of CPUs
+    assert gf.gf1WorkerCount({}, 10) == gf.GF1_WORKERS
+    assert gf.gf1WorkerCount({'gf1_workers': 6}, 10) == 6
+    assert gf.gf1WorkerCount({'gf1_workers': 6}, 3) == 3
+    assert gf.gf1WorkerCount({'gf1_workers': 0}, 3) == 1
+    monkeypatch.setattr(gf.os, 'cpu_count', lambda: 1)
+    assert gf.gf1WorkerCount({}, 10) == 1
+
+
+def test_gf1_products_in_process_pool(monkeypatch):
+    monkeypatch.setattr(gf, 'ProcessPoolExecutor', RecordingExecutor)
+    monkeypatch.setattr(RecordingExecutor, 'instances', [])
+    calls = []
+
+    results = gf.produceGf1s(recordingGapFill(calls), gf1Args(5), gf.gf1WorkerCount({'gf1_workers': 3}, 5))
+
+    assert [executor.max_workers for executor in RecordingExecutor.instances] == [3]
+    assert results == [0] * 5
+    assert calls == ['GFSC1_%d' % i for i in range(5)]
+
+
+def test_gf1_products_sequential_with_one_worker(monkeypatch):
+    monkeypatch.setattr(gf, 'ProcessPoolExecutor', RecordingExecutor)
+    monkeypatch.setattr(RecordingExecutor, 'instances', [])
+    calls = []
+
+    results = gf.produceGf1s(
+        recordingGapFill(calls, failing=['GFSC1_2']), gf1Args(5), gf.gf1WorkerCount({'gf1_workers': 1}, 5))
+
+    # No process pool, and the products after the first failure are not built
+    assert RecordingExecutor.instances == []
+    assert results == [0, 0, 1]
+    assert calls == ['GFSC1_0', 'GFSC1_1', 'GFSC1_2']
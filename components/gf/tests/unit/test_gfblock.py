@@ -0,0 +1,172 @@
+import warnings
+
+import numpy as np
+
+import gfblock
+
+
+def legacy_upscale(data,scale,noData=None,valueMin=None,valueMax=None, classes = []):
+    """Fancy-index upscaling as implemented in gfio before the block engine."""
+    if scale == 1:
+        return data
+    newShape = tuple(map(int,(data.shape[0]/scale,data.shape[1]/scale)))
+    rind = np.indices(newShape)[0]*scale
+    cind = np.indices(newShape)[1]*scale
+
+    rowi = rind
+    coli = cind
+    for j in range(1,scale):
+        rowi = np.dstack((rowi,rind))
+        coli = np.dstack((coli,cind))
+    row = rowi
+    col = coli
+
+    for i in range(1,scale):
+        rowi = rind+i
+        coli = cind+i
+        for j in range(1,scale):
+            rowi = np.dstack((rowi,rind+i))
+            coli = np.dstack((coli,cind+i))
+        row = np.dstack((row,rowi))
+        col = np.dstack((col,coli))
+    if noData is None and valueMin is None and valueMax is None and classes == []:
+        dataValue = np.copy(data).astype(np.float64)
+        newData = np.mean(dataValue[row,col],axis=2)
+        newData = newData.astype(data.dtype)
+        return newData
+    else:
+        dataClass = np.copy(data)
+        if valueMax is not None:
+            dataValue = np.copy(data).astype(np.float64)
+            valueMask = (dataValue >= valueMin)*(dataValue <= valueMax)
+            np.place(dataValue,~valueMask,np.nan)
+            with warnings.catch_warnings():
+                # all-nan blocks are expected
+                warnings.simplefilter('ignore', category=RuntimeWarning)
+                newDataValue = np.nanmean(dataValue[row,col],axis=2)
+            np.place(newDataValue,np.isnan(newDataValue),noData)
+            newDataValue = np.rint(newDataValue).astype(data.dtype)
+            np.place(dataClass,valueMask,valueMax)
+
+        if classes != []:
+            newDataClass = noData*np.ones(shape=newShape,dtype=data.dtype)
+            classCount = np.zeros(shape=newShape,dtype=np.int32)
+            classValues = classes
+            if valueMax is not None:
+                count = np.sum(dataClass[row,col]==valueMax,axis=2)
+                count = count >= scale*scale*0.5
+                np.place(newDataClass,count,valueMax)
+                np.place(classCount,count,scale*scale)
+            for classValue in classValues:
+                if np.sum(dataClass==classValue) == 0:
+                    continue
+                count = np.sum(dataClass[row,col]==classValue,axis=2)
+                np.place(newDataClass,count > classCount,classValue)
+                np.copyto(classCount, count, where= count > classCount)
+
+        if valueMax is not None and classes != []:
+            newValueMask = (newDataValue >= valueMin)*(newDataValue <= valueMax)
+            np.copyto(newDataValue,newDataClass,where=~newValueMask)
+            newData = newDataValue
+
+        if valueMax is not None and classes == []:
+            newData = newDataValue
+
+        if valueMax is None and classes != []:
+            newData = newDataClass
+
+        if valueMax is None and classes == []:  #bitwise
+            newData = np.zeros(shape=newShape,dtype=data.dtype)
+            for b in range(int(str(data.dtype).replace('uint','').replace('int',''))):
+                mask = np.bitwise_and(np.right_shift(data,b),1)
+                count = np.sum(mask[row,col],axis=2)
+                mask = count >= (float(np.prod(data.shape))/np.prod(newShape))/2.
+                newData = np.bitwise_or(newData,np.left_shift(mask.astype(data.dtype),b))
+    return newData
+
+
+NODATA = 255
+CLOUD = 205
+SHAPES = [(90, 90), (91, 97), (64, 200)]
+SCALES = [2, 3, 4]
+
+
+def synthetic_fsc(shape, seed):
+    """FSC-like raster: snow values, clouds and nodata in clustered patches."""
+    rng = np.random.RandomState(seed)
+    data = rng.randint(0, 101, size=shape).astype(np.uint8)
+    data[rng.rand(*shape) < 0.25] = CLOUD
+    data[rng.rand(*shape) < 0.15] = NODATA
+    data[:shape[0] // 4, :shape[1] // 3] = NODATA
+    return data
+
+
+def synthetic_qc(shape, seed):
+    rng = np.random.RandomState(seed)
+    data = rng.randint(0, 4, size=shape).astype(np.uint8)
+    data[rng.rand(*shape) < 0.3] = CLOUD
+    data[rng.rand(*shape) < 0.2] = NODATA
+    return data
+
+
+def synthetic_flags(shape, seed, dtype=np.uint8):
+    rng = np.random.RandomState(seed)
+    return rng.randint(0, np.iinfo(dtype).max, size=shape, dtype=dtype)
+
+
+def assert_same(reference, result):
+    assert result.dtype == reference.dtype
+    assert result.shape == reference.shape
+    assert np.array_equal(result, reference)
+
+
+def test_upscale_fsc_matches_legacy():
+    """Mean-over-valid combined with majority class, as used for FSC."""
+    for seed, shape in enumerate(SHAPES):
+        for scale in SCALES:
+            data = synthetic_fsc(shape, seed)
+            assert_same(legacy_upscale(data, scale, NODATA, 0, 100, [CLOUD, NODATA]),
+                        gfblock.upscale(data, scale, NODATA, 0, 100, [CLOUD, NODATA]))
+
+
+def test_upscale_qc_matches_legacy():
+    for seed, shape in enumerate(SHAPES):
+        for scale in SCALES:
+            data = synthetic_qc(shape, seed)
+            assert_same(legacy_upscale(data, scale, NODATA, 0, 3, [CLOUD, NODATA]),
+                        gfblock.upscale(data, scale, NODATA, 0, 3, [CLOUD, NODATA]))
+
+
+def test_upscale_qcflags_matches_legacy():
+    """Per-bit majority, as used for QCFLAGS."""
+    for seed, shape in enumerate(SHAPES):
+        for scale in SCALES:
+            for dtype in [np.uint8, np.uint16]:
+                data = synthetic_flags(shape, seed, dtype)
+                assert_same(legacy_upscale(data, scale, NODATA, None, None, []),
+                            gfblock.upscale(data, scale, NODATA, None, None, []))
+
+
+def test_upscale_other_modes_match_legacy():
+    for seed, shape in enumerate(SHAPES):
+        for scale in SCALES:
+            data = synthetic_fsc(shape, seed)
+            assert_same(legacy_upscale(data, scale),
+                        gfblock.upscale(data, scale))
+            assert_same(legacy_upscale(data, scale, NODATA, 0, 100),
+                        gfblock.upscale(data, scale, NODATA, 0, 100))
+            assert_same(legacy_upscale(data, scale, NODATA, None, None, [CLOUD, NODATA]),
+                        gfblock.upscale(data, scale, NODATA, None, None, [CLOUD, NODATA]))
+
+
+def test_upscale_uniform_blocks():
+    """Fully cloudy, fully nodata and fully valid rasters."""
+    for value in [0, 37, 100, CLOUD, NODATA]:
+        data = value*np.ones((30, 30), dtype=np.uint8)
+        assert_same(legacy_upscale(data, 3, NODATA, 0, 100, [CLOUD, NODATA]),
+                    gfblock.upscale(data, 3, NODATA, 0, 100, [CLOUD, NODATA]))
+
+
+def test_upscale_scale_one_is_identity():
+    data = synthetic_fsc((12, 12), 0)
+    assert gfblock.upscale(data, 1, NODATA, 0, 100, [CLOUD, NODATA]) is data
@@ -0,0 +1,197 @@
+import numpy as np
+
+import gfmerge
+
+
+NODATA = 255
+CLOUD = 205
+GAPVALUES = [CLOUD, NODATA]
+DAY = 86400
+# 2021-01-10, with a 7 days aggregation timespan
+PRODUCT_TIME = 1610236800
+WINDOW_START = PRODUCT_TIME - 7*DAY
+SHAPE = (12, 16)
+# AT of the previous GFSC pixels, some of them before the aggregation timespan
+PREVIOUS_TIMES = [PRODUCT_TIME - d*DAY + 3600 for d in range(1, 11)]
+
+
+def legacyComposite(products, productOrder):
+    """Whole product ranking by date, as implemented in gf2 before the pixel-wise merge of the previous GFSC."""
+    gf = NODATA*np.ones(SHAPE, dtype=np.uint8)
+    qc = NODATA*np.ones(SHAPE, dtype=np.uint8)
+    qf = np.zeros(SHAPE, dtype=np.uint8)
+    ad = np.zeros(SHAPE, dtype=np.uint32)
+    for i, p in enumerate(productOrder):
+        gfSub, qcSub, qfSub, adSub = products[p]
+        if i:
+            gfGap = np.isin(gf, GAPVALUES)
+            if not gfGap.any():
+                continue
+            gap = gfGap*(gfSub != NODATA)*(adSub > WINDOW_START)
+        else:
+            gap = adSub >= WINDOW_START
+        for layer, sub in zip([gf, qc, qf, ad], [gfSub, qcSub, qfSub, adSub]):
+            np.copyto(layer, sub, where=gap)
+    return [gf, qc, qf, ad]
+
+
+def composite(products, productOrder, productTypes):
+    layers = [NODATA*np.ones(SHAPE, dtype=np.uint8), NODATA*np.ones(SHAPE, dtype=np.uint8),
+        np.zeros(SHAPE, dtype=np.uint8), np.zeros(SHAPE, dtype=np.uint32)]
+    for i, p in enumerate(gfmerge.compositeOrder(productOrder, productTypes)):
+        gfmerge.mergeProduct(layers, products[p], WINDOW_START, GAPVALUES, NODATA,
+            first=i == 0, previousGfsc=productTypes[p] == 'GFSC')
+    return layers
+
+
+def syntheticProduct(rng, acquisitionTimes):
+    """GF, QC, QCFLAGS and AT layers with valid, cloud and nodata pixels, AT drawn from acquisitionTimes."""
+    gf = rng.randint(0, 101, size=SHAPE).astype(np.uint8)
+    gf[rng.rand(*SHAPE) < 0.3] = CLOUD
+    gf[rng.rand(*SHAPE) < 0.3] = NODATA
+    qc = rng.randint(0, 4, size=SHAPE).astype(np.uint8)
+    qc[gf == CLOUD] = CLOUD
+    qc[gf == NODATA] = NODATA
+    qf = rng.randint(0, 256, size=SHAPE).astype(np.uint8)
+    ad = rng.choice(np.array(acquisitionTimes, dtype=np.uint32), size=SHAPE)
+    # Nodata pixels with and without AT
+    ad[(gf == NODATA) & (rng.rand(*SHAPE) < 0.5)] = 0
+    return [gf, qc, qf, ad]
+
+
+def test_merge_matches_legacy():
+    """New GFSC1 layers more recent than the previous GFSC: same pixels as the legacy merge"""
+    for seed in range(5):
+        rng = np.random.RandomState(seed)
+        products = [
+            syntheticProduct(rng, PREVIOUS_TIMES),
+            syntheticProduct(rng, [PRODUCT_TIME]),
+            syntheticProduct(rng, [PRODUCT_TIME + 3600]),
+        ]
+        productTypes = ['GFSC', 'GFSC1', 'GFSC1']
+        productOrder = [2, 1, 0]
+
+        merged = composite(products, productOrder, productTypes)
+        legacy = legacyComposite(products, productOrder)
+
+        for layer, legacyLayer in zip(merged, legacy):
+            assert layer.dtype == legacyLayer.dtype
+            np.testing.assert_array_equal(layer, legacyLayer)
+        # Previous GFSC pixels kept in the gaps, expired ones dropped
+        assert np.any(merged[3] == PREVIOUS_TIMES[2])
+        assert not np.any((merged[3] > 0) & (merged[3] < WINDOW_START))
+
+
+def test_merge_late_product():
+    """Late GFSC1 for an older day: ranked before the previous GFSC, whose more recent observations still win"""
+    for seed in range(5):
+        rng = np.random.RandomState(seed)
+        previousGfsc = syntheticProduct(rng, PREVIOUS_TIMES)
+        late = syntheticProduct(rng, [PRODUCT_TIME - 4*DAY])
+        products = [previousGfsc, late]
+        productTypes = ['GFSC', 'GFSC1']
+        # The previous GFSC is dated after the late product
+        productOrder = [0, 1]
+
+        merged = composite(products, productOrder, productTypes)
+        lateFirst = legacyComposite(products, [1, 0])
+
+        previousNewer = np.isin(previousGfsc[0], GAPVALUES, invert=True) & \
+            (previousGfsc[3] > late[3]) & (previousGfsc[3] > WINDOW_START)
+        assert previousNewer.any() and (~previousNewer & (merged[0] != NODATA)).any()
+        for layer, lateFirstLayer, previousLayer in zip(merged, lateFirst, previousGfsc):
+            np.testing.assert_array_equal(layer[previousNewer], previousLayer[previousNewer])
+            np.testing.assert_array_equal(layer[~previousNewer], lateFirstLayer[~previousNewer])
+        # Older observations of the previous GFSC replaced by the late product
+        assert np.any((merged[3] == PRODUCT_TIME - 4*DAY) & (previousGfsc[3] > WINDOW_START) & \
+            np.isin(previousGfsc[0], GAPVALUES, invert=True))
+
+
+WETSNOW = 110
+NO_WET_SNOW = [115, 120, 125, 200, 210, 220, 230, 240]
+FSC_GAPVALUES = [CLOUD, NODATA]
+WSC_GAPVALUES = NO_WET_SNOW + [CLOUD, NODATA]
+STRIP_ROWS = 5
+
+
+def legacySequentialComposite(products, gapvalues):
+    """Composite of gf1 before the gap lookup table: the gaps of the full composite are detected again for every product."""
+    composite = [NODATA*np.ones(SHAPE, dtype=np.uint8), NODATA*np.ones(SHAPE, dtype=np.uint8),
+        np.zeros(SHAPE, dtype=np.uint32)]
+    for i, (dataSub, qcSub, adSub) in enumerate(products):
+        if i:
+            gap = np.isin(composite[0], gapvalues)*~np.isin(dataSub, gapvalues)
+        else:
+            gap = np.ones(SHAPE, dtype=bool)
+        for layer, sub in zip(composite, [dataSub, qcSub, adSub*np.ones(SHAPE, dtype=np.uint32)]):
+            np.copyto(layer, sub, where=gap)
+    return composite
+
+
+def gf1Composite(products, gapvalues):
+    """Strip loop of gf1.main, with the still-gap mask and the gap lookup table."""
+    table = gfmerge.gapTable(gapvalues)
+    composite = [NODATA*np.ones(SHAPE, dtype=np.uint8), NODATA*np.ones(SHAPE, dtype=np.uint8),
+        np.zeros(SHAPE, dtype=np.uint32)]
+    stillGap = np.ones(SHAPE, dtype=np.bool_)
+    success = False
+    readStrips = 0
+    for dataSub, qcSub, adSub in products:
+        if success and not stillGap.any():
+            continue
+        for row in range(0, SHAPE[0], STRIP_ROWS):
+            strip = slice(row, row + STRIP_ROWS)
+            if success and not stillGap[strip].any():
+                continue
+            readStrips += 1
+            gap, stillGap[strip] = gfmerge.compositeGaps(stillGap[strip], dataSub[strip], table, success)
+            np.copyto(composite[0][strip], dataSub[strip], where=gap)
+            np.copyto(composite[1][strip], qcSub[strip], where=gap)
+            np.copyto(composite[2][strip], np.uint32(adSub), where=gap)
+        success = True
+    return composite, stillGap, readStrips
+
+
+def syntheticObservation(rng, values, gapvalues, gapRatio, date):
+    """Observation layer and its QC layer, with gap values on gapRatio of the pixels and a fully observed strip."""
+    data = rng.choice(np.array(values, dtype=np.uint8), size=SHAPE)
+    gap = rng.rand(*SHAPE) < gapRatio
+    data[gap] = rng.choice(np.array(gapvalues, dtype=np.uint8), size=np.count_nonzero(gap))
+    data[:STRIP_ROWS] = values[0]
+    qc = rng.randint(0, 4, size=SHAPE).astype(np.uint8)
+    qc[np.isin(data, gapvalues)] = NODATA
+    return [data, qc, date]
+
+
+def test_gf1_composite_matches_legacy():
+    """Overlapping FSC and WDS/SWS observations with gaps, newest first"""
+    for seed in range(5):
+        rng = np.random.RandomState(seed)
+        fscProducts = [syntheticObservation(rng, list(range(0, 101)), FSC_GAPVALUES, ratio, PRODUCT_TIME - d*DAY)
+            for d, ratio in enumerate([0.6, 0.5, 0.4, 0.3])]
+        wscProducts = [syntheticObservation(rng, [WETSNOW, 125, 200], WSC_GAPVALUES, ratio, PRODUCT_TIME - d*DAY)
+            for d, ratio in enumerate([0.7, 0.5, 0.5])]
+
+        for products, gapvalues in [(fscProducts, FSC_GAPVALUES), (wscProducts, WSC_GAPVALUES)]:
+            legacy = legacySequentialComposite(products, gapvalues)
+            composite, stillGap, readStrips = gf1Composite(products, gapvalues)
+            for layer, legacyLayer in zip(composite, legacy):
+                assert layer.dtype == legacyLayer.dtype
+                np.testing.assert_array_equal(layer, legacyLayer)
+            # Gaps left for the SSD step, and the strips without gaps read only once
+            np.testing.assert_array_equal(stillGap, np.isin(legacy[0], gapvalues))
+            assert stillGap.any() and not stillGap[:STRIP_ROWS].any()
+            assert readStrips < len(products)*len(range(0, SHAPE[0], STRIP_ROWS))
+
+
+def test_gf1_composite_without_gap_left():
+    """Older products are not read once the composite has no gap left"""
+    rng = np.random.RandomState(0)
+    products = [syntheticObservation(rng, list(range(0, 101)), FSC_GAPVALUES, ratio, PRODUCT_TIME - d*DAY)
+        for d, ratio in enumerate([0.5, 0., 0.5])]
+    legacy = legacySequentialComposite(products, FSC_GAPVALUES)
+    composite, stillGap, readStrips = gf1Composite(products, FSC_GAPVALUES)
+    for layer, legacyLayer in zip(composite, legacy):
+        np.testing.assert_array_equal(layer, legacyLayer)
+    assert not stillGap.any()
+    assert readStrips == 2*len(range(0, SHAPE[0], STRIP_ROWS)) - 1
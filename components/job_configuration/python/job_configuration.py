@@ -108,6 +108,17 @@ class JobConfiguration(LoopedJob):
             # Add configured jobs to the list of jobs to be updated
             jobs = configured_jobs + jobs
 
+            # Retrieve the jobs dependencies with batched requests, if the job
+            # type supports it (None otherwise)
+            previous_temporal_jobs = job_type.find_previous_temporal_jobs(jobs, self.logger)
+            backward_candidate_jobs = None
+            if previous_temporal_jobs is not None:
+                backward_candidate_jobs = job_type.find_backward_candidate_jobs(
+                    jobs, previous_temporal_jobs, self.logger)
+
+            # Tiles on which the dependencies retrieved above may be outdated
+            outdated_tiles = set()
+
             for job in jobs:
 
                 # Determine in which status should be applied to the job : 
@@ -115,7 +126,18 @@ class JobConfiguration(LoopedJob):
                 #       (an other job should complete its processing for instance)
                 #  - 'JobStatus.ready', if the job can be processed.
                 # and perform additional configuration steps if needed.
-                job, status_to_set, message = job.configure_single_job(self.logger)
+                if previous_temporal_jobs is None or job.tile_id in outdated_tiles:
+                    job, status_to_set, message = job.configure_single_job(self.logger)
+                else:
+                    job, status_to_set, message = job.configure_single_job(
+                        self.logger, previous_temporal_jobs=previous_temporal_jobs,
+                        backward_candidate_jobs=backward_candidate_jobs)
+
+                    # Jobs which don't wait for a dependency may insert or update
+                    # other jobs of the same tile (e.g. backward reprocessing), the
+                    # next jobs of this tile request their dependencies themselves.
+                    if status_to_set != JobStatus.configured:
+                        outdated_tiles.add(job.tile_id)
 
 
                 if job not in configured_jobs or status_to_set == JobStatus.ready:
@@ -6,10 +6,13 @@ _summary_
 import logging
 import yaml
 
+from ...common.python.database.model.job.child_job import ChildJob
 from ...common.python.database.model.job.job_status import JobStatus
 from ...common.python.database.model.job.job_types import JobTypes
 from ...common.python.database.model.job.looped_job import LoopedJob
 from ...common.python.database.model.job.system_parameters import SystemPrameters
+from ...common.python.database.rest.foreign_key import ForeignKey
+from ...common.python.database.rest.rest_database import RestDatabase
 from ...common.python.util.log_util import temp_logger
 from ...common.python.util.request_util import RequestUtil
 from ...common.python.util.resource_util import ResourceUtil
@@ -109,50 +112,75 @@ class JobCreation(LoopedJob):
 
             self.logger.info(f'Create {len(jobs)} {job_type.JOB_NAME} jobs')
 
-            # TODO batch insert jobs (all at once) in the database.
+            # Set up jobs before insertion in database
             for job in jobs:
-
-                # Set up job before insertion in database
                 job.job_pre_insertion_setup(reprocessed_job=False)
 
                 # Set the log level used for this next job execution.
                 job.next_log_level = JobCreation.__JOB_LOG_LEVEL
 
-                # Insert the job and its parent into the database
-                job_response = job.post(post_foreign=True, logger_func=self.logger.debug)
-
-                # Set the job status to initialized
-                status_response = job.post_new_status_change(JobStatus.initialized)
+            # Batch insert the jobs, their parents and their initial status,
+            # chunk by chunk, so that the last inserted job stays up to date.
+            for start in range(0, len(jobs), RestDatabase.BULK_POST_SIZE):
+                chunk = jobs[start:start + RestDatabase.BULK_POST_SIZE]
 
                 # If DataBase is not reachable -> break the loop to avoid missing jobs
-                if job_response is None or status_response is None:
+                if not self.insert_jobs(chunk, JobStatus.initialized):
                     return
 
                 # Update last inserted job stored value if database could be reached
-                job_type.LAST_INSERTED_JOB = job
+                job_type.LAST_INSERTED_JOB = chunk[-1]
 
+            if not reprocessed_jobs:
+                continue
 
+            # Set up reprocessed jobs before insertion in database
             for reprocessed_job in reprocessed_jobs:
-
-                # Set up job before insertion in database
                 reprocessed_job.job_pre_insertion_setup(reprocessed_job=True)
 
                 # Set the log level used for this next job execution.
                 reprocessed_job.next_log_level = JobCreation.__JOB_LOG_LEVEL
 
-                # Insert the job and its parent into the database
-                job_response = reprocessed_job.post(post_foreign=True,
-                                                    logger_func=self.logger.debug)
-
-                # Set the job status to cancelled to not process the job
-                status_response = reprocessed_job.post_new_status_change(
+            # Set the jobs status to cancelled to not process them.
+            # If DataBase is not reachable -> break the loop to avoid missing jobs
+            if not self.insert_jobs(
+                    reprocessed_jobs,
                     JobStatus.cancelled,
-                    error_message="Unprocessed job as it's part of a reprocessing campaign."
-                    )
+                    error_message="Unprocessed job as it's part of a reprocessing campaign."):
+                return
 
-                # If DataBase is not reachable -> break the loop to avoid missing jobs
-                if job_response is None or status_response is None:
-                    return
+    def insert_jobs(self, jobs, job_status, error_message=None):
+        '''
+        Bulk insert jobs, their parents and their initial status into the database.
+        If the status insertion fails, the jobs are deleted so that they are
+        created again at the next loop.
+
+        :return: False if the database could not be reached, True otherwise.
+        '''
+
+        # Insert the jobs and their parents into the database
+        if ForeignKey.bulk_post(jobs, post_foreign=True, logger_func=self.logger.debug) is None:
+            return False
+
+        try:
+            status_response = ChildJob.bulk_post_new_status_change(
+                jobs, job_status, error_message=error_message)
+        except Exception:
+            self.delete_jobs(jobs)
+            raise
+
+        if status_response is None:
+            self.delete_jobs(jobs)
+            return False
+        return True
+
+    def delete_jobs(self, jobs):
+        '''Delete jobs without status, with their parents.'''
+
+        # The child jobs and their status changes are deleted with their parents
+        parent_jobs = [job.get_foreign_object(ChildJob.FOREIGN_PARENT_JOB) for job in jobs]
+        if RestDatabase.bulk_delete(parent_jobs, logger_func=self.logger.debug) is None:
+            self.logger.error(f'Could not delete {len(jobs)} jobs inserted without status')
 
 
 # Static call: read the configuration file
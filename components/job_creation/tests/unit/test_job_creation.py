@@ -0,0 +1,67 @@
+from ....common.python.database.model.job.job_status import JobStatus
+from ....common.python.database.model.job.job_types import JobTypes
+from ....common.python.database.model.job.other_job import OtherJob
+from ....common.python.database.rest.rest_database import RestDatabase
+from ....common.python.util.log_util import temp_logger
+from ....common.tests.postgrest_stand_in import PostgrestStandIn
+from ...python.job_creation import JobCreation
+
+
+class StandInJob(OtherJob):
+    '''Job type whose jobs to create are set by the test.'''
+
+    JOB_NAME = 'stand_in'
+    LAST_INSERTED_JOB = None
+    jobs_to_create = ([], [])
+
+    def job_pre_insertion_setup(self, reprocessed_job=False):
+        pass
+
+    @staticmethod
+    def get_jobs_to_create(internal_database_parallel_request, logger):
+        return StandInJob.jobs_to_create
+
+
+def run_job_creation(monkeypatch, jobs, reprocessed_jobs):
+    monkeypatch.setattr(RestDatabase, 'BULK_POST_SIZE', 2)
+    monkeypatch.setattr(JobTypes, 'get_job_type_list', staticmethod(lambda logger: [StandInJob]))
+    monkeypatch.setattr(StandInJob, 'LAST_INSERTED_JOB', None)
+    monkeypatch.setattr(StandInJob, 'jobs_to_create', (jobs, reprocessed_jobs))
+
+    job_creation = JobCreation()
+    job_creation.logger = temp_logger
+    job_creation.looped_start()
+
+
+def test_jobs_are_inserted_by_chunks(monkeypatch):
+    """Test that the jobs and their status are inserted by chunks"""
+
+    database = PostgrestStandIn(reverse_returned_rows=True).mount(monkeypatch)
+    jobs = [StandInJob(name) for name in 'abcde']
+    reprocessed_jobs = [StandInJob(name) for name in 'fg']
+    run_job_creation(monkeypatch, jobs, reprocessed_jobs)
+
+    assert StandInJob.LAST_INSERTED_JOB is jobs[-1]
+    assert [len(rows) for rows in database.posts('parent_jobs')] == [2, 2, 1, 2]
+    assert len(database.tables['other_jobs']) == 7
+    parent_names = {row['id']: row['name'] for row in database.tables['parent_jobs']}
+    statuses = {parent_names[row['fk_parent_job_id']]: row['job_status'] for row in database.tables['job_status_changes']}
+    assert statuses == {
+        'a': JobStatus.initialized.value, 'b': JobStatus.initialized.value, 'c': JobStatus.initialized.value,
+        'd': JobStatus.initialized.value, 'e': JobStatus.initialized.value,
+        'f': JobStatus.cancelled.value, 'g': JobStatus.cancelled.value}
+
+
+def test_failed_chunk(monkeypatch):
+    """Test that the jobs of a chunk whose status can't be inserted are deleted and that the loop stops"""
+
+    database = PostgrestStandIn(failing_posts={('job_status_changes', 1)}).mount(monkeypatch)
+    jobs = [StandInJob(name) for name in 'abcde']
+    run_job_creation(monkeypatch, jobs, [StandInJob('f')])
+
+    # Only the first chunk is kept, the next jobs are created again at the next loop
+    assert StandInJob.LAST_INSERTED_JOB is jobs[1]
+    assert sorted(row['name'] for row in database.tables['parent_jobs']) == ['a', 'b']
+    assert len(database.tables['other_jobs']) == 2
+    assert len(database.tables['job_status_changes']) == 2
+    assert len(database.posts('parent_jobs')) == 2
@@ -14,12 +14,14 @@ _summary_
 import json
 import logging
 import socket
+import time
 
 import amqp
 from kombu import Connection, Exchange, Queue
 import yaml
 
 from ...common.python.database.model.job.job_status import JobStatus
+from ...common.python.database.model.job.child_job import ChildJob
 from ...common.python.database.model.job.job_types import JobTypes
 from ...common.python.database.model.job.looped_job import LoopedJob
 from ...common.python.database.model.job.system_parameters import SystemPrameters
@@ -53,6 +55,23 @@ class JobPublication(LoopedJob):
     # Initial log level. Can be modified later by the operator for e.g. debugging jobs.
     __LOG_LEVEL = None
 
+    # Number of jobs published together, i.e. whose status changes are
+    # inserted with a single database request.
+    __BATCH_SIZE = None
+
+    # Time in seconds during which the RabbitMQ endpoint read from the
+    # database is reused.
+    __SYSTEM_PARAMETERS_TTL = None
+
+    # Cached RabbitMQ endpoint and the time at which it was read
+    __rabbitmq_endpoint = None
+    __rabbitmq_endpoint_time = None
+
+    # RabbitMQ connection and producer shared by all the messages sent during
+    # a loop iteration, see get_rabbitmq_producer
+    __rabbitmq_connection = None
+    __rabbitmq_producer = None
+
     # Retrieve endpoints credentials from environment variables
     rabbitmq_communication_id = SysUtil.read_env_var(
         "CSI_PRODUCT_PUBLICATION_ENDPOINT_ID")
@@ -92,6 +111,10 @@ class JobPublication(LoopedJob):
                 contents['sleep'])
             JobPublication.__LOG_LEVEL = (
                 logging.getLevelName(contents['log_level']))
+            JobPublication.__BATCH_SIZE = (
+                contents['publication_batch_size'])
+            JobPublication.__SYSTEM_PARAMETERS_TTL = (
+                contents['system_parameters_ttl'])
 
         # Overload loop's sleep value with 'system_parameters' table value
         #  if database is instanciated.
@@ -122,79 +145,116 @@ class JobPublication(LoopedJob):
         if not self.logger:
             raise Exception('Logger must be initialized.')
 
-        for job_type in JobTypes.get_job_type_list(self.logger):
-            self.logger.info(f'Publication service loop for {job_type.JOB_NAME} jobs')
+        try:
+            for job_type in JobTypes.get_job_type_list(self.logger):
+                self.logger.info(f'Publication service loop for {job_type.JOB_NAME} jobs')
 
-            # Find all jobs with status processed
-            jobs = job_type.get_jobs_with_last_status(job_type, JobStatus.processed, logger_func=self.logger.debug)
+                # Find all jobs with status processed
+                jobs = job_type.get_jobs_with_last_status(job_type, JobStatus.processed, logger_func=self.logger.debug)
 
-            # Exit if nothing was found
-            if not jobs:
-                self.logger.info(f'No new {job_type.JOB_NAME} jobs to publish')
-                continue
+                # Exit if nothing was found
+                if not jobs:
+                    self.logger.info(f'No new {job_type.JOB_NAME} jobs to publish')
+                    continue
 
-            self.logger.info(f'Publish {len(jobs)} {job_type.JOB_NAME} jobs')
-            for job in jobs:
-                
-                self.logger.info(f"    Publishing job with ID {job.id}")
-                # Assert job has at least one product to publish before we try to publish it
-                if job.generated_a_product():
-                    # Update job status to notify that it has been handled by publication service
-                    self.logger.debug(f'    Status of job with ID {job.id} set at "start_publication"')
-                    job.post_new_status_change(JobStatus.start_publication)
+                self.logger.info(f'Publish {len(jobs)} {job_type.JOB_NAME} jobs')
+                for start in range(0, len(jobs), JobPublication.__BATCH_SIZE):
+                    self.publish_jobs(job_type, jobs[start:start + JobPublication.__BATCH_SIZE])
 
-                    # Json info to be sent to notify a product publication
-                    publication_json_template = self.set_json_template()
-                    self.logger.debug(f"    The json template has been set.")
-                    # Get filled JSON(s) to be sent to notify product(s) publication
-                    publication_json_list = job.get_products_publication_jsons(publication_json_template)
-                    self.logger.debug(f"    Its publication json list is :\n{[json.dumps(publication_json) for publication_json in publication_json_list]}")
+            # Handle jobs with publication issues
+            self.get_jobs_acknowledgement()
 
-                    if not isinstance(publication_json_list, list):
-                        publication_json_list = [publication_json_list]
+        finally:
+            self.close_rabbitmq_connection()
 
-                    # Do not send JSON if an error occurred
-                    # If JSON setting failed for both product, raise an error
-                    if len(publication_json_list) == 0:
-                        error_subtype = "Publication JSON setting Error"
-                        error_message = f"Publication service couldn't set JSON "\
-                            f"content for any {' or '.join(job_type.OUTPUT_PRODUCTS_LIST)} products."
 
-                        job.post_new_status_change(
-                            JobStatus.internal_error,
-                            error_subtype=error_subtype,
-                            error_message=error_message
-                        )
-                        raise CsiInternalError(
-                            error_subtype,
-                            error_message
-                        )
+    def publish_jobs(self, job_type, jobs):
+        '''
+        Publish the products of a batch of jobs and update their status. The
+        "published" and "done" status changes are inserted with one database
+        request for the whole batch.
 
-                    # For each job, publish one JSON per type of product the job generated
-                    for dict_notifying_publication in publication_json_list:
+        :param job_type: type of the jobs.
+        :param jobs: jobs with status processed.
+        '''
 
-                        # Find the product name
-                        product = dict_notifying_publication["resto"]["properties"]["productType"]
+        # Get the filled JSON(s) of the jobs with at least one product to publish
+        jobs_to_publish = []
+        for job in jobs:
+            if not job.generated_a_product():
+                continue
 
-                        # Convert product dictionary into json
-                        json_notifying_publication = json.dumps(dict_notifying_publication)
+            # Json info to be sent to notify a product publication
+            publication_json_template = self.set_json_template()
+            # Get filled JSON(s) to be sent to notify product(s) publication
+            publication_json_list = job.get_products_publication_jsons(publication_json_template)
+            self.logger.debug(f"    Publication json list of job with ID {job.id} is :\n{[json.dumps(publication_json) for publication_json in publication_json_list]}")
+
+            if not isinstance(publication_json_list, list):
+                publication_json_list = [publication_json_list]
+
+            # Do not send JSON if an error occurred
+            # If JSON setting failed for both product, raise an error
+            if len(publication_json_list) == 0:
+                error_subtype = "Publication JSON setting Error"
+                error_message = f"Publication service couldn't set JSON "\
+                    f"content for any {' or '.join(job_type.OUTPUT_PRODUCTS_LIST)} products."
+
+                job.post_new_status_change(
+                    JobStatus.internal_error,
+                    error_subtype=error_subtype,
+                    error_message=error_message
+                )
+                raise CsiInternalError(
+                    error_subtype,
+                    error_message
+                )
+
+            jobs_to_publish.append((job, publication_json_list))
+
+        published_jobs = []
+        try:
+            # If an error occurs, the jobs following the one which failed keep
+            # their "processed" status and are published at the next loop
+            for job, publication_json_list in jobs_to_publish:
+                self.logger.info(f"    Publishing job with ID {job.id}")
+
+                # Update job status to notify that it has been handled by publication service,
+                # just before sending its products so that an interrupted service leaves
+                # at most one job in this status
+                self.logger.debug(f'    Status of job with ID {job.id} set at "start_publication"')
+                job.post_new_status_change(JobStatus.start_publication, logger_func=self.logger.debug)
+
+                # For each job, publish one JSON per type of product the job generated
+                for dict_notifying_publication in publication_json_list:
 
-                        # Send both json to rabbitMQ if RabbitMQ address has been set
-                        self.send_json_to_rabbitmq(job, json_notifying_publication, product)
+                    # Find the product name
+                    product = dict_notifying_publication["resto"]["properties"]["productType"]
 
-                        # Set products JSON publication time
-                        job.set_product_publication_date(product, dict_notifying_publication)
+                    # Convert product dictionary into json
+                    json_notifying_publication = json.dumps(dict_notifying_publication)
 
-                    # Update job content and status as at least one product has been sent
-                    job.patch(patch_foreign=True, logger_func=self.logger.debug)
-                    job.post_new_status_change(JobStatus.published)
+                    # Send both json to rabbitMQ if RabbitMQ address has been set
+                    self.send_json_to_rabbitmq(job, json_notifying_publication, product)
 
-                # Update job status in any case, even if no product has been published
-                job.post_new_status_change(JobStatus.done)
+                    # Set products JSON publication time
+                    job.set_product_publication_date(product, dict_notifying_publication)
 
+                # Update job content as at least one product has been sent
+                job.patch(patch_foreign=True, logger_func=self.logger.debug)
+                published_jobs.append(job)
 
-        # Handle jobs with publication issues
-        self.get_jobs_acknowledgement()
+        finally:
+            # Update status of the jobs whose products have been sent
+            if published_jobs:
+                ChildJob.bulk_post_new_status_change(
+                    published_jobs, JobStatus.published, logger_func=self.logger.debug)
+
+            # Update job status in any case, even if no product has been published
+            done_jobs = published_jobs + [job for job in jobs if not job.generated_a_product()]
+            if done_jobs:
+                ChildJob.bulk_post_new_status_change(
+                    done_jobs, JobStatus.done, logger_func=self.logger.debug)
 
 
     def set_json_template(self):
@@ -229,6 +289,76 @@ class JobPublication(LoopedJob):
         return json_dict
 
 
+    @staticmethod
+    def get_rabbitmq_endpoint():
+        '''
+        Return the full RabbitMQ endpoint URL, or None if it is not set in the
+        'system_parameters' database table. The value read from the database
+        is reused during system_parameters_ttl seconds.
+        '''
+
+        now = time.monotonic()
+        if (JobPublication.__rabbitmq_endpoint_time is None) or (
+                now - JobPublication.__rabbitmq_endpoint_time > JobPublication.__SYSTEM_PARAMETERS_TTL):
+
+            rabbitmq_communication_endpoint = SystemPrameters().get(
+                temp_logger.debug).rabbitmq_communication_endpoint
+
+            if rabbitmq_communication_endpoint == "not_defined":
+                rabbitmq_communication_endpoint = None
+            else:
+                rabbitmq_communication_endpoint = rabbitmq_communication_endpoint.format(
+                    JobPublication.rabbitmq_communication_id,
+                    JobPublication.rabbitmq_communication_password,
+                    JobPublication.rabbitmq_communication_virtual_host
+                )
+                # Handle special characters in full endpoint url
+                rabbitmq_communication_endpoint = rabbitmq_communication_endpoint.replace('@#', '%40%23')
+                rabbitmq_communication_endpoint = rabbitmq_communication_endpoint.replace(']', '%5D')
+
+            JobPublication.__rabbitmq_endpoint = rabbitmq_communication_endpoint
+            JobPublication.__rabbitmq_endpoint_time = now
+
+        return JobPublication.__rabbitmq_endpoint
+
+
+    def get_rabbitmq_connection(self, rabbitmq_communication_endpoint):
+        '''
+        Return the RabbitMQ connection shared by all the messages of the
+        current loop iteration, created at the first call. Publisher confirms
+        are enabled: each publication waits for the broker acknowledgement.
+        '''
+
+        if self.__rabbitmq_connection is None:
+            self.__rabbitmq_connection = Connection(
+                rabbitmq_communication_endpoint,
+                transport_options={'confirm_publish': True}
+            )
+        return self.__rabbitmq_connection
+
+
+    def get_rabbitmq_producer(self, rabbitmq_communication_endpoint):
+        '''Return the producer of the current loop iteration, created at the first call.'''
+
+        if self.__rabbitmq_producer is None:
+            self.__rabbitmq_producer = self.get_rabbitmq_connection(
+                rabbitmq_communication_endpoint).Producer(serializer='json')
+        return self.__rabbitmq_producer
+
+
+    def close_rabbitmq_connection(self):
+        '''Close the RabbitMQ connection of the current loop iteration, if any.'''
+
+        connection = self.__rabbitmq_connection
+        self.__rabbitmq_connection = None
+        self.__rabbitmq_producer = None
+        if connection is not None:
+            try:
+                connection.release()
+            except Exception as error:
+                self.logger.warning(f"Couldn't close the RabbitMQ connection: {error}")
+
+
     def send_json_to_rabbitmq(self, job, json_notifying_publication, product):
         '''
         _summary_
@@ -243,29 +373,17 @@ class JobPublication(LoopedJob):
         :raises e: _description_
         '''
         # Retrieve address to which JSON data should sent to, from database
-        rabbitmq_communication_endpoint = SystemPrameters().get(
-            temp_logger.debug).rabbitmq_communication_endpoint
-
-        if rabbitmq_communication_endpoint != "not_defined":
-            rabbitmq_communication_endpoint = rabbitmq_communication_endpoint.format(
-                JobPublication.rabbitmq_communication_id,
-                JobPublication.rabbitmq_communication_password,
-                JobPublication.rabbitmq_communication_virtual_host
-            )
-            # Handle special characters in full endpoint url
-            rabbitmq_communication_endpoint = rabbitmq_communication_endpoint.replace('@#', '%40%23')
-            rabbitmq_communication_endpoint = rabbitmq_communication_endpoint.replace(']', '%5D')
-            try : 
-                with Connection(
-                    rabbitmq_communication_endpoint
-                ) as conn:
-                    producer = conn.Producer(serializer='json')
-                    producer.publish(
-                        json_notifying_publication,
-                        exchange=JobPublication.product_exchange, 
-                        routing_key='json',
-                        declare=[JobPublication.json_queue]
-                    )
+        rabbitmq_communication_endpoint = JobPublication.get_rabbitmq_endpoint()
+
+        if rabbitmq_communication_endpoint is not None:
+            try :
+                producer = self.get_rabbitmq_producer(rabbitmq_communication_endpoint)
+                producer.publish(
+                    json_notifying_publication,
+                    exchange=JobPublication.product_exchange,
+                    routing_key='json',
+                    declare=[JobPublication.json_queue]
+                )
 
             except amqp.exceptions.AccessRefused as error:
                 # An error occured while sending request to the endpoint
@@ -452,32 +570,25 @@ class JobPublication(LoopedJob):
         '''
 
         # Retrieve address from which JSON data should be listened from
-        rabbitmq_communication_endpoint = SystemPrameters().get(
-            temp_logger.debug).rabbitmq_communication_endpoint
+        rabbitmq_communication_endpoint = JobPublication.get_rabbitmq_endpoint()
 
-        if rabbitmq_communication_endpoint != "not_defined":
+        if rabbitmq_communication_endpoint is not None:
             self.logger.info("Reading RabbitMQ acknowledgement queue...")
-            rabbitmq_communication_endpoint = rabbitmq_communication_endpoint.format(
-                JobPublication.rabbitmq_communication_id,
-                JobPublication.rabbitmq_communication_password,
-                JobPublication.rabbitmq_communication_virtual_host
-            )
-            # Handle special characters in full endpoint url
-            rabbitmq_communication_endpoint = rabbitmq_communication_endpoint.replace('@#', '%40%23')
-            rabbitmq_communication_endpoint = rabbitmq_communication_endpoint.replace(']', '%5D')
             try :
-                with Connection(
-                    rabbitmq_communication_endpoint
-                ) as conn:
-                    with conn.Consumer(
-                        JobPublication.json_acknowledgement_queue,
-                        callbacks=[self.acknowledgement_callback],
-                        accept=['json']
-                    ) as _:
-                        # Process messages and handle events on all channels,
-                        # automatically raise a timeout after 1 sec
-                        while True:
-                            conn.drain_events(timeout=1)
+                # Reuse the connection of the current loop iteration. Receive
+                # one message at a time, as the callback republishes it on the
+                # same connection before acknowledging it.
+                conn = self.get_rabbitmq_connection(rabbitmq_communication_endpoint)
+                with conn.Consumer(
+                    JobPublication.json_acknowledgement_queue,
+                    callbacks=[self.acknowledgement_callback],
+                    accept=['json'],
+                    prefetch_count=1
+                ) as _:
+                    # Process messages and handle events on all channels,
+                    # automatically raise a timeout after 1 sec
+                    while True:
+                        conn.drain_events(timeout=1)
 
             except socket.timeout:
                 pass
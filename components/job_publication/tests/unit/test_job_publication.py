@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+# check if environment variable is set, exit in error if it's not
+for name in [
+        "CSI_PRODUCT_PUBLICATION_ENDPOINT_ID",
+        "CSI_PRODUCT_PUBLICATION_ENDPOINT_VIRTUAL_HOST",
+        "CSI_PRODUCT_PUBLICATION_ENDPOINT_PASSWORD"]:
+    os.environ.setdefault(name, "test")
+
+from ....common.python.database.model.job.child_job import ChildJob
+from ....common.python.database.model.job.job_status import JobStatus
+from ....common.python.util.log_util import temp_logger
+from ...python.job_publication import JobPublication
+
+
+class FakeJob(object):
+    '''Processed job recording its status changes instead of inserting them in the database.'''
+
+    OUTPUT_PRODUCTS_LIST = ["FSC"]
+
+    def __init__(self, job_id, with_product=True):
+        self.id = job_id
+        self.with_product = with_product
+        self.statuses = [JobStatus.processed]
+        self.patched = False
+
+    def generated_a_product(self):
+        return self.with_product
+
+    def get_products_publication_jsons(self, publication_json_template):
+        publication_json_template["resto"]["properties"]["productType"] = "FSC"
+        publication_json_template["resto"]["properties"]["productIdentifier"] = f"product_{self.id}"
+        return [publication_json_template]
+
+    def set_product_publication_date(self, product, publication_json):
+        pass
+
+    def patch(self, patch_foreign, logger_func=None):
+        self.patched = True
+
+    def post_new_status_change(self, job_status, error_subtype=None, error_message=None, logger_func=None):
+        self.statuses.append(job_status)
+
+
+class FakeProducer(object):
+    '''Producer failing to publish the products of the given job.'''
+
+    def __init__(self, failing_job_id=None):
+        self.failing_job_id = failing_job_id
+        self.messages = []
+
+    def publish(self, json_notifying_publication, **kwargs):
+        if f'"product_{self.failing_job_id}"' in json_notifying_publication:
+            raise ConnectionError("connection reset")
+        self.messages.append(json_notifying_publication)
+
+
+@pytest.fixture
+def publication(monkeypatch):
+    '''Job publication service sending the products to a fake producer.'''
+
+    def bulk_post_new_status_change(jobs, job_status, error_subtype=None, error_message=None, logger_func=None):
+        for job in jobs:
+            job.statuses.append(job_status)
+        return jobs
+    monkeypatch.setattr(ChildJob, "bulk_post_new_status_change", staticmethod(bulk_post_new_status_change))
+    monkeypatch.setattr(JobPublication, "get_rabbitmq_endpoint", staticmethod(lambda: "memory://"))
+
+    publication = JobPublication()
+    publication.logger = temp_logger
+    publication.producer = FakeProducer()
+    monkeypatch.setattr(publication, "get_rabbitmq_producer", lambda endpoint: publication.producer)
+    return publication
+
+
+def test_publish_jobs(publication):
+    """Test that all the jobs of a batch are published then done"""
+
+    jobs = [FakeJob(1), FakeJob(2, with_product=False), FakeJob(3)]
+    publication.publish_jobs(FakeJob, jobs)
+
+    assert len(publication.producer.messages) == 2
+    assert jobs[0].statuses == [JobStatus.processed, JobStatus.start_publication, JobStatus.published, JobStatus.done]
+    assert jobs[1].statuses == [JobStatus.processed, JobStatus.done]
+    assert jobs[2].statuses == [JobStatus.processed, JobStatus.start_publication, JobStatus.published, JobStatus.done]
+    assert jobs[0].patched and jobs[2].patched
+
+
+def test_publish_jobs_partial_failure(publication):
+    """Test the status of the jobs of a batch when one of them couldn't be published"""
+
+    publication.producer = FakeProducer(failing_job_id=2)
+    jobs = [FakeJob(1), FakeJob(2), FakeJob(3, with_product=False), FakeJob(4)]
+    with pytest.raises(ConnectionError):
+        publication.publish_jobs(FakeJob, jobs)
+
+    # The jobs sent before the failure are published and done
+    assert jobs[0].statuses == [JobStatus.processed, JobStatus.start_publication, JobStatus.published, JobStatus.done]
+    # The failing job is set back to processed, to be published at the next loop
+    assert jobs[1].statuses == [
+        JobStatus.processed, JobStatus.start_publication,
+        JobStatus.external_error, JobStatus.error_checked, JobStatus.processed]
+    assert not jobs[1].patched
+    # The jobs without products are done
+    assert jobs[2].statuses == [JobStatus.processed, JobStatus.done]
+    # The following jobs are left processed, to be published at the next loop
+    assert jobs[3].statuses == [JobStatus.processed]
+    assert not jobs[3].patched
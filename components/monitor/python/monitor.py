@@ -4,6 +4,7 @@ Module providing the monitoring of the jobs executions.
 import os
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 import yaml
@@ -90,12 +91,39 @@ def notify_database_of_error(logger: Logger, job, summary: dict = None, error: s
     time.sleep(2)
     job.post_new_status_change(JobStatus.ready)
 
-def monitor_job(logger: Logger, job, job_type, job_status_history):
-    '''Check if the system state for the job is OK'''
+def get_nomad_job_summary(nomad_client, job):
+    '''
+    Return the Nomad job summary, or the URLNotFoundNomadException raised
+    while requesting it, so that it can be handled by monitor_job.
+    '''
+    try:
+        return nomad_client.job.get_summary(job.parent_job.nomad_id)
+    except nomad.api.exceptions.URLNotFoundNomadException as error:
+        return error
+
+def get_nomad_job_summaries(jobs, parallel_requests):
+    '''Request the Nomad job summaries of all the jobs simultaneously, return {job.id: summary}'''
+
+    nomad_client = nomad.Nomad()
+    with ThreadPoolExecutor(max_workers=max(1, parallel_requests)) as executor:
+        summaries = executor.map(lambda job: get_nomad_job_summary(nomad_client, job), jobs)
+        return {job.id: summary for job, summary in zip(jobs, summaries)}
+
+def monitor_job(logger: Logger, job, job_type, job_status_history, nomad_job_summary=None, parallel_requests=1):
+    '''
+    Check if the system state for the job is OK
+
+    :param nomad_job_summary: Nomad job summary if it was already requested
+    (see get_nomad_job_summaries), else it is requested here.
+    :param parallel_requests: number of simultaneous requests to the Nomad API.
+    '''
 
     nomad_client = nomad.Nomad()
     try:
-        nomad_job_summary = nomad_client.job.get_summary(job.parent_job.nomad_id)
+        if nomad_job_summary is None:
+            nomad_job_summary = nomad_client.job.get_summary(job.parent_job.nomad_id)
+        elif isinstance(nomad_job_summary, Exception):
+            raise nomad_job_summary
 
         logger.debug(f"The nomad job summary returned for job '{job.id}' is : {nomad_job_summary}")
 
@@ -158,8 +186,11 @@ def monitor_job(logger: Logger, job, job_type, job_status_history):
                 # Log Nomad info on allocation
                 # (cf https://www.nomadproject.io/api/allocations.html#read-allocation)
                 allocations = nomad_client.job.get_allocations(job.parent_job.nomad_id)
-                for allocation in allocations:
-                    allocation_response = nomad_client.allocation.get_allocation(allocation["ID"])
+                with ThreadPoolExecutor(max_workers=max(1, parallel_requests)) as executor:
+                    allocation_responses = list(executor.map(
+                        lambda allocation: nomad_client.allocation.get_allocation(allocation["ID"]),
+                        allocations))
+                for allocation_response in allocation_responses:
 
                     # Ensure that the allocation_response has appropriate keys
                     if (
@@ -294,6 +325,9 @@ class Monitor(LoopedJob):
     # Initial log level. Can be modified later by the operator for e.g. debugging jobs.
     __LOG_LEVEL = None
 
+    # Number of simultaneous requests to the Nomad API.
+    __NOMAD_PARALLEL_REQUESTS = 1
+
     @staticmethod
     def read_config_file():
         '''Read the configuration file.'''
@@ -303,6 +337,8 @@ class Monitor(LoopedJob):
                 contents['sleep'])
             Monitor.__LOG_LEVEL = (
                 logging.getLevelName(contents['log_level']))
+            Monitor.__NOMAD_PARALLEL_REQUESTS = (
+                contents['nomad_parallel_requests'])
 
     @staticmethod
     def start(*args, **kwargs):
@@ -358,15 +394,26 @@ class Monitor(LoopedJob):
                 self.logger.info(f'There is no {job_type.JOB_NAME} job that is marked as working')
                 continue
 
-            # Get the jobs status history
+            # Get the jobs status history, with batched requests
+            parent_jobs_status_history = StoredProcedure.job_status_history_by_parent_job(
+                [job.fk_parent_job_id for job in jobs],
+                logger_func=logger.debug
+            )
             for job in jobs:
-                jobs_status_history[job.id] = StoredProcedure.job_status_history(
-                    [job.fk_parent_job_id],
-                    logger_func=logger.debug
-                )
+                jobs_status_history[job.id] = parent_jobs_status_history[job.fk_parent_job_id]
+
+            # Get the Nomad job summaries simultaneously
+            nomad_job_summaries = get_nomad_job_summaries(
+                jobs, Monitor.__NOMAD_PARALLEL_REQUESTS)
 
             for job in jobs:
-                monitor_job(logger, job, job_type, jobs_status_history[job.id])
+                monitor_job(
+                    logger,
+                    job,
+                    job_type,
+                    jobs_status_history[job.id],
+                    nomad_job_summary=nomad_job_summaries[job.id],
+                    parallel_requests=Monitor.__NOMAD_PARALLEL_REQUESTS)
 
         self.logger.info('job monitoring finished.')
 
@@ -249,6 +249,8 @@ def execute_write_tasks(write_objects, lines):
 ############################################################################
     
 def execute_commands(cmd_dict, maxtime_seconds=None, scan_dt=1, verbose=1):
+    """launches the commands of cmd_dict simultaneously and waits for all of them to return.
+    cmd_dict[key] must contain a 'cmd' key and can contain a 'maxtime_seconds' key overriding the maxtime_seconds parameter for this command"""
     
     exit_src = None
     
@@ -269,7 +271,7 @@ def execute_commands(cmd_dict, maxtime_seconds=None, scan_dt=1, verbose=1):
             if not isinstance(cmd_dict[key][el], list):
                 cmd_dict[key][el] = [cmd_dict[key][el]]
         tasks[key] = SimpleTaskManager(key, cmd_dict[key]['cmd'], stdout_queues[key], stderr_queues[key], return_queue, exit_queues[key], \
-            maxtime_seconds=maxtime_seconds, verbose=verbose)
+            maxtime_seconds=cmd_dict[key].get('maxtime_seconds', maxtime_seconds), verbose=verbose)
         
     execution_dict = {key: {'returncode': None, 'stdout': [], 'stderr': [], 'execution_time': None, 'exceeded_time': None, 'forced_exit': None} for key in cmd_dict}
     stdout_write_tasks = dict()
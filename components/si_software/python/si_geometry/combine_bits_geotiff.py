@@ -28,8 +28,42 @@ def packbits2d(ar):
     return np.squeeze(np.packbits(ar, axis=2, bitorder='little'), axis=2)
     
     
-
-def bit_bandmath(output_file, raster_info_dict, source_list_per_band, no_data_values_per_band=None, compress=True, add_overviews=True, use_default_cosims_config=True):
+    
+class PackedBits:
+    """Bit plane access on a packed uint8 array without unpacking it: A[:,:,k] returns bit k as a 0/1 int array.
+    Planes have the int type of unpackbits so that operations subtracting, negating or scaling them (e.g. A[:,:,1]-A[:,:,2])
+    give the same results as on unpacked bits instead of wrapping around."""
+    
+    def __init__(self, packed):
+        self.packed = packed
+        
+    def __getitem__(self, key):
+        if (not isinstance(key, tuple)) or len(key) != 3:
+            raise IndexError('packed bits must be indexed as A[rows,cols,bits]')
+        if isinstance(key[2], slice):
+            return np.unpackbits(np.expand_dims(self.packed[key[:2]], axis=2), axis=2, bitorder='little')[:,:,key[2]].astype(int)
+        return np.bitwise_and(np.right_shift(self.packed[key[:2]], key[2]), 1).astype(int)
+        
+        
+        
+def to_packed_uint8(ar):
+    ar = np.asarray(ar)
+    if ar.dtype == np.uint8 and ar.flags.writeable:
+        return ar
+    assert np.sum(ar>255) == 0
+    return ar.astype(np.uint8)
+    
+    
+    
+def set_bit(packed, id_bit, values):
+    """Sets bit id_bit of packed uint8 array inplace to 1 where values are non-zero, 0 elsewhere."""
+    np.bitwise_and(packed, np.uint8(255 ^ (1 << id_bit)), out=packed)
+    np.bitwise_or(packed, np.left_shift((np.asarray(values) != 0).astype(np.uint8), id_bit), out=packed)
+    
+    
+    
+def bit_bandmath(output_file, raster_info_dict, source_list_per_band, no_data_values_per_band=None, compress=True, add_overviews=True, use_default_cosims_config=True, \
+    nrows_block=1024):
     """Creates a copy of a monoband uint8 source model file and fills each bits independantly from different uint8 files.
     
     :param output_file: path to output TIF file
@@ -37,16 +71,22 @@ def bit_bandmath(output_file, raster_info_dict, source_list_per_band, no_data_va
     :param source_list_per_band: list of source lists (1 per output file band)
     :param reinitialize_values: reinitialize values to 0, otherwise values from source_model_file are kept
     :param keep_no_data_from_source_file: reapply nodata values from source_model_file at the end of operations
+    :param nrows_block: number of rows processed at once, None to process the whole raster at once. Operations must be pixelwise if set.
     :return: returns nothing
     
     source list example (monoband): [{'filepath': cloud_mask_file, 'bandnumber': 1, 'bit_operations': {0: 'A[:,:,1]', 1: '1-(1-A[:,:,2])*(1-A[:,:,3])',  2: '(1-A[:,:,1])*(1-A[:,:,6])'}}]
     WARNING: bits unpacked in little endian (from smaller to greater)
+    Unpacked sources and output bits are kept packed in uint8 arrays: A[:,:,k] and B[:,:,k] return bit k as a 0/1 int array.
+    An output bit is set to 1 where its operation is non-zero, so B[:,:,k] returns 1 (not the operation value) in the following operations.
     """
     
     nbands = len(source_list_per_band)
+    xsize, ysize = raster_info_dict['size'][0], raster_info_dict['size'][1]
+    if nrows_block is None:
+        nrows_block = ysize
     
     #open source model file, copy it and load data
-    ds_out = gdal.GetDriverByName('GTiff').Create(output_file, raster_info_dict['size'][0], raster_info_dict['size'][1], nbands, gdal.GDT_Byte)
+    ds_out = gdal.GetDriverByName('GTiff').Create(output_file, xsize, ysize, nbands, gdal.GDT_Byte)
     is_gcps = 'gcps' in raster_info_dict
     if 'gcps' in raster_info_dict:
         assert 'geoTransform' not in raster_info_dict
@@ -59,46 +99,45 @@ def bit_bandmath(output_file, raster_info_dict, source_list_per_band, no_data_va
         if no_data_values_per_band is not None:
             if no_data_values_per_band[band_no] is not None:
                 outband.SetNoDataValue(float(no_data_values_per_band[band_no]))
-        output_array = outband.ReadAsArray()
-        output_array[:,:] = 0
-
-        output_bits_unpacked = False
+        
+        #open all input files once
+        source_datasets = []
         for dico in source_list_per_band[band_no]:
-            local_eval_dict = {'np': np, 'logical_array_list_operation': logical_array_list_operation}
-            for i_src, src in enumerate(dico['sources']):
-                local_name = 'A%d'%i_src
-                #get all input arrays
+            source_datasets.append([])
+            for src in dico['sources']:
                 assert os.path.exists(src['filepath']), 'file %s missing'%src['filepath']
                 ds_loc = gdal.Open(src['filepath'])
                 if ds_loc is None:
                     raise RuntimeInputFileError('gdal could not open file %s'%src['filepath'])
-                local_eval_dict[local_name] = ds_loc.GetRasterBand(src['bandnumber']).ReadAsArray()
-                if src['unpack_bits']:
-                    local_eval_dict[local_name] = unpackbits2d(local_eval_dict[local_name])
-                ds_loc = None            
+                source_datasets[-1].append(ds_loc)
+        
+        for row_start in range(0, ysize, nrows_block):
+            nrows = min(nrows_block, ysize-row_start)
+            output_array = np.zeros((nrows, xsize), dtype=np.uint8)
+            for dico, datasets in zip(source_list_per_band[band_no], source_datasets):
+                local_eval_dict = {'np': np, 'logical_array_list_operation': logical_array_list_operation}
+                for i_src, (src, ds_loc) in enumerate(zip(dico['sources'], datasets)):
+                    local_name = 'A%d'%i_src
+                    #get all input arrays
+                    local_eval_dict[local_name] = ds_loc.GetRasterBand(src['bandnumber']).ReadAsArray(0, row_start, xsize, nrows)
+                    if src['unpack_bits']:
+                        local_eval_dict[local_name] = PackedBits(to_packed_uint8(local_eval_dict[local_name]))
+                
+                #fill output_array
+                is_bit_operation_on_output_array = isinstance(dico['operation'], dict)
+                if is_bit_operation_on_output_array:
+                    output_array = to_packed_uint8(output_array)
+                    local_eval_dict['B'] = PackedBits(output_array)
+                    for id_bit, operation in dico['operation'].items():
+                        set_bit(output_array, id_bit, eval(operation, {}, local_eval_dict))
+                else:
+                    local_eval_dict['B'] = output_array
+                    output_array = np.broadcast_to(eval(dico['operation'], {}, local_eval_dict), (nrows, xsize))
             
-            #fill output_array
-            is_bit_operation_on_output_array = isinstance(dico['operation'], dict)
-            if is_bit_operation_on_output_array:
-                if not output_bits_unpacked:
-                    output_array = unpackbits2d(output_array)
-                    output_bits_unpacked = True
-                local_eval_dict['B'] = output_array
-                for id_bit, operation in dico['operation'].items():
-                    output_array[:,:,id_bit] = eval(operation, {}, local_eval_dict)
-            else:
-                if output_bits_unpacked:
-                    output_array = packbits2d(output_array)
-                    output_bits_unpacked = False
-                local_eval_dict['B'] = output_array
-                output_array = eval(dico['operation'], {}, local_eval_dict)
-
-        if output_bits_unpacked:
-            output_array = packbits2d(output_array)
-
-        #write array
-        outband.WriteArray(output_array)
+            #write array
+            outband.WriteArray(output_array, 0, row_start)
         outband.FlushCache()
+        source_datasets = None
         
     if not is_gcps:
         ds_out.SetProjection(raster_info_dict['coordinateSystem']['wkt'])
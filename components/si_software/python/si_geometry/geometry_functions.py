@@ -192,20 +192,24 @@ def initialize_raster(gdal_info_dict, output_file, nbands=1, dtype='u1', nodata_
 
 
 
-def reproject(source_file_or_ds, gdal_info_dict_dst, target_file, xRes=20., yRes=20., srcNodata=255, dstNodata=255, resampleAlg='near', return_array=False, \
-    remove_target_file=False, gdalwarp_use_shell=None):
-
-    #get coordinate system in proj4 format
-    proj = CRS.from_user_input(gdal_info_dict_dst['coordinateSystem']['wkt']).to_proj4()
-    
+def get_gdalwarp_use_shell(gdalwarp_use_shell=None):
+    """returns gdalwarp_use_shell if filled, else the value of the gdalwarp_use_shell environment variable (default False)"""
     if gdalwarp_use_shell is None:
         if 'gdalwarp_use_shell' in os.environ:
             gdalwarp_use_shell = os.environ['gdalwarp_use_shell'].lower() in ['1', 'true', 't']
         else:
             gdalwarp_use_shell = False
-        
+    return gdalwarp_use_shell
+
+
+
+def reproject(source_file_or_ds, gdal_info_dict_dst, target_file, xRes=20., yRes=20., srcNodata=255, dstNodata=255, resampleAlg='near', return_array=False, \
+    remove_target_file=False, gdalwarp_use_shell=None):
+
+    #get coordinate system in proj4 format
+    proj = CRS.from_user_input(gdal_info_dict_dst['coordinateSystem']['wkt']).to_proj4()
     
-    if not gdalwarp_use_shell:
+    if not get_gdalwarp_use_shell(gdalwarp_use_shell):
         gdal.Warp(target_file, source_file_or_ds, options=gdal.WarpOptions(format='GTiff', \
             outputBounds=tuple(gdal_info_dict_dst['cornerCoordinates']['lowerLeft'] + gdal_info_dict_dst['cornerCoordinates']['upperRight']), \
             xRes=xRes, yRes=yRes, dstSRS=proj, outputType=gdal.GDT_Byte, \
@@ -231,6 +235,37 @@ def reproject(source_file_or_ds, gdal_info_dict_dst, target_file, xRes=20., yRes
         
         
 
+def reproject_to_mem(source_file_or_ds, gdal_info_dict_dst, xRes=20., yRes=20., srcNodata=255, dstNodata=255, resampleAlg='near', \
+    gdalwarp_use_shell=None, temp_dir=None):
+    """same as reproject but warps into a MEM dataset instead of writing and reading back a GeoTIFF file.
+    If gdalwarp_use_shell is set (see reproject), the gdalwarp command is used instead on a GeoTIFF file in a temporary
+    folder of temp_dir, which is then copied into the MEM dataset"""
+    
+    if get_gdalwarp_use_shell(gdalwarp_use_shell):
+        temp_dir_loc = tempfile.mkdtemp(prefix='reproject_', dir=temp_dir)
+        try:
+            target_file = os.path.join(temp_dir_loc, 'reprojected.tif')
+            reproject(source_file_or_ds, gdal_info_dict_dst, target_file, xRes=xRes, yRes=yRes, srcNodata=srcNodata, dstNodata=dstNodata, \
+                resampleAlg=resampleAlg, gdalwarp_use_shell=True)
+            ds = gdal.GetDriverByName('MEM').CreateCopy('', gdal.Open(target_file))
+        finally:
+            shutil.rmtree(temp_dir_loc)
+        return ds
+
+    proj = CRS.from_user_input(gdal_info_dict_dst['coordinateSystem']['wkt']).to_proj4()
+    ds = gdal.Warp('', source_file_or_ds, options=gdal.WarpOptions(format='MEM', \
+        outputBounds=tuple(gdal_info_dict_dst['cornerCoordinates']['lowerLeft'] + gdal_info_dict_dst['cornerCoordinates']['upperRight']), \
+        xRes=xRes, yRes=yRes, dstSRS=proj, outputType=gdal.GDT_Byte, \
+        warpMemoryLimit=4000., \
+        resampleAlg=resampleAlg, \
+        srcNodata=srcNodata, dstNodata=dstNodata))
+    if ds is None:
+        raise Exception('gdal.Warp to MEM failed for %s'%source_file_or_ds)
+    return ds
+        
+        
+        
+
 def get_minimum_container_info(dico_container, dico_containee):
     dico_out = dict()
     return dico_out
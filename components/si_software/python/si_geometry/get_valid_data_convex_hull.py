@@ -9,7 +9,7 @@
 from si_geometry.geometry_functions import *
 import rasterio
 from shapely.ops import cascaded_union, polygonize
-from shapely.geometry import Point, MultiLineString
+from shapely.geometry import Point, MultiPoint, MultiLineString
 from scipy.spatial import Delaunay
 
 def alpha_shape(points, alpha):
@@ -95,12 +95,55 @@ def points_from_shapes(list_of_shapes):
     
     
     
-def get_valid_data_convex_hull(input_raster, valid_values=None, invalid_values=None, proj_out=None, temp_dir=None, use_otb=False, ram=None, npoints_per_edge=3, alpha=None):
+def valid_data_edge_corners(input_raster, valid_values=None, invalid_values=None, nrows_block=1024):
+    """returns the corners (col, row) of the leftmost and rightmost valid pixels of each row of input_raster,
+    the raster being read by blocks of nrows_block rows. The convex hull of these corners is the convex hull of the valid pixels.
+    
+    Either valid_values or invalid_values must be specified."""
+    
+    ds = gdal.Open(input_raster, gdal.GA_ReadOnly)
+    band = ds.GetRasterBand(1)
+    corners = []
+    for row_start in range(0, band.YSize, nrows_block):
+        data = band.ReadAsArray(0, row_start, band.XSize, min(nrows_block, band.YSize-row_start))
+        if valid_values is not None:
+            mask = np.isin(data, valid_values)
+        else:
+            mask = np.logical_not(np.isin(data, invalid_values))
+        rows = np.flatnonzero(mask.any(axis=1))
+        if rows.size == 0:
+            continue
+        left = mask[rows].argmax(axis=1)
+        right = band.XSize - mask[rows][:,::-1].argmax(axis=1)
+        rows += row_start
+        corners += [np.stack((left, rows), axis=1), np.stack((left, rows+1), axis=1), np.stack((right, rows), axis=1), np.stack((right, rows+1), axis=1)]
+    geotransform = ds.GetGeoTransform()
+    projection = ds.GetProjection()
+    band = None
+    ds = None
+    del ds
+    if len(corners) == 0:
+        return np.zeros((0, 2)), geotransform, projection
+    return np.concatenate(corners), geotransform, projection
+    
+    
+def get_valid_data_convex_hull_vectorized(input_raster, valid_values=None, invalid_values=None, nrows_block=1024):
+    """computes the convex hull of valid data within input_raster directly from the raster pixels, without polygonizing the raster.
+    returns the convex hull in the raster coordinate system and the raster projection"""
+    
+    corners, geotransform, proj_in = valid_data_edge_corners(input_raster, valid_values=valid_values, invalid_values=invalid_values, nrows_block=nrows_block)
+    xx = geotransform[0] + corners[:,0]*geotransform[1] + corners[:,1]*geotransform[2]
+    yy = geotransform[3] + corners[:,0]*geotransform[4] + corners[:,1]*geotransform[5]
+    return MultiPoint(list(zip(xx, yy))).convex_hull, proj_in
+    
+    
+def get_valid_data_convex_hull(input_raster, valid_values=None, invalid_values=None, proj_out=None, temp_dir=None, use_otb=False, ram=None, npoints_per_edge=3, alpha=None, vectorized=False):
     """extracts convex hull of valid data within input_raster.
     
     :param valid_values: list of values that must be considered valid within raster (optional)
     :param invalid_values: list of values that must be considered invalid within raster (optional)
     :param temp_dir: directory to use for temp file creation
+    :param vectorized: compute the convex hull from the raster pixels with numpy instead of using gdal_polygonize (only when alpha is None)
     
     valid_values and invalid_values parameters cannot both be specified.
     if they are both not specified, the raster nodata value will be taken as an invalid value."""
@@ -126,6 +169,15 @@ def get_valid_data_convex_hull(input_raster, valid_values=None, invalid_values=N
                 invalid_values = [nodata_value]
         invalid_values = list_form(invalid_values)
     
+    if vectorized and alpha is None:
+        polygon_convex_hull, proj_in = get_valid_data_convex_hull_vectorized(input_raster, valid_values=valid_values, invalid_values=invalid_values)
+        if not isinstance(polygon_convex_hull, Polygon):
+            raise CodedException('Input product is full of NANs', exitcode=fsc_rlie_exitcodes.l1c_fullnan)
+        if proj_out is not None:
+            if proj_in != proj_out:
+                polygon_convex_hull = Polygon(project_coords_to_different_coordinate_system(polygon_convex_hull.exterior.coords, proj_in, proj_out, npoints_per_edge=npoints_per_edge))
+        return polygon_convex_hull
+    
     #create temp dir and define file names
     temp_dir_loc = tempfile.mkdtemp(prefix='convex_hull_computing', dir=temp_dir)
     nodata_raster = os.path.join(temp_dir_loc, 'nodata_raster.tif')
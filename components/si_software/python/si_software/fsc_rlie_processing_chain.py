@@ -3,15 +3,15 @@
 
 
 from si_common.common_functions import *
-from si_common.follow_process import SimpleWriteLinesToLoggerDebug
+from si_common.follow_process import SimpleWriteLinesToLoggerDebug, execute_commands
 from si_common.yaml_parser import load_yaml, dump_yaml
 
 from si_geometry.geometry_functions import set_gdal_otb_itk_env_vars
 
 import si_software.si_logger as si_logger
 from si_software.maja_l2a_processing import maja_l2a_processing, update_product_information_from_l2a_file, clean_l2a_keep_metadata
-from si_software.lis_fsc_processing import lis_fsc_processing
-from si_software.ice_rlie_processing import ice_rlie_processing
+from si_software.lis_fsc_processing import lis_fsc_processing, lis_fsc_preprocessing, lis_fsc_postprocessing
+from si_software.ice_rlie_processing import ice_rlie_processing, ice_rlie_preprocessing, ice_rlie_postprocessing
 
 
     
@@ -172,7 +172,11 @@ class Main_FSC_RLIE_Processing_Information:
                 self.__dico['nprocs'] = cpu_count()
             set_gdal_otb_itk_env_vars(nprocs=self.__dico['nprocs'], max_ram=self.__dico['max_ram']) #setting itk otb and gdal env vars
             
-            for el in ['copy_input_files_to_temp_dir', 'delete_temp_dir_on_error', 'delete_temp_dir_on_success']:
+            #run LIS and ICE simultaneously (optional, default false)
+            if 'lis_ice_parallel' not in self.__dico:
+                self.__dico['lis_ice_parallel'] = False
+            
+            for el in ['copy_input_files_to_temp_dir', 'delete_temp_dir_on_error', 'delete_temp_dir_on_success', 'lis_ice_parallel']:
                 assert isinstance(self.__dico[el], bool), 'expecting boolean for input parameter %s'%el
             check_dem_integrity(self.__dico['dem_dir'])
             self.__dico['tile_name'] = check_s2tile_name(self.__dico['dem_dir'].split('_')[-2])
@@ -437,6 +441,34 @@ class Main_FSC_RLIE_Processing_Information:
 
     
     
+##########################################
+def lis_ice_parallel_processing(main_info):
+    """launches LIS and ICE simultaneously, the nprocs threads being split between them.
+    Both executions are post-processed (and their products saved) before any error is raised, LIS errors first."""
+    
+    dico = main_info.input_parameters
+    nprocs_ice = max(1, dico['nprocs']//2)
+    nprocs_lis = max(1, dico['nprocs'] - nprocs_ice)
+    
+    cmd_dict = {'lis': lis_fsc_preprocessing(main_info, nprocs=nprocs_lis), 'ice': ice_rlie_preprocessing(main_info, nprocs=nprocs_ice)}
+    #LIS and ICE launch jobs
+    main_info.update_processing_status(new_value='lis_start')
+    main_info.update_processing_status(new_value='ice_start')
+    execution_dicts = execute_commands(cmd_dict, scan_dt=1, verbose=0)
+    
+    #LIS and ICE postprocessing
+    errors = []
+    for key, postprocessing in [('lis', lis_fsc_postprocessing), ('ice', ice_rlie_postprocessing)]:
+        try:
+            postprocessing(main_info, execution_dicts[key])
+        except Exception as ex:
+            errors.append(ex)
+    if len(errors) > 1:
+        main_info.logger_error('ICE also failed: %s'%str(errors[1]), exc_info=False)
+    if len(errors) > 0:
+        raise errors[0]
+    
+    
 ##########################################
 #MAIN
 def fsc_rlie_processing_chain(dico_in):
@@ -472,6 +504,11 @@ def fsc_rlie_processing_chain(dico_in):
                     l2a_filename_work = l2a_saved_file
                 main_info.update_product_information_from_maja_output(l2a_filename_work)
             
+            ##########################################################################################
+            #LIS and ICE simultaneously: on success, both products are in the product dict and the sequential steps below are skipped
+            if dico['lis_ice_parallel'] and dico['ice']['generate_product'] and ('fsc' not in main_info.product_dict) and ('rlie' not in main_info.product_dict):
+                lis_ice_parallel_processing(main_info)
+            
             ##########################################################################################
             #LIS
             if 'fsc' not in main_info.product_dict:
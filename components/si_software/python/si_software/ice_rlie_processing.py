@@ -132,7 +132,8 @@ def make_ice_script(dico_ice, ice_temp_dir, l2a_file, rlie_metadata_file, produc
         
     
     
-def ice_rlie_processing(main_info):
+def ice_rlie_preprocessing(main_info, nprocs=None):
+    """prepares ICE inputs and returns the ICE command dict to be launched with execute_commands, using nprocs threads (default: nprocs input parameter)"""
     
     main_info.update_processing_status(new_value='ice_preprocessing')
     main_info.logger_info('')
@@ -145,6 +146,8 @@ def ice_rlie_processing(main_info):
     dico = main_info.input_parameters
     if not dico['ice']['generate_product']:
         raise MainArgError('this function should not have been called if ice:generate_product input parameter is set to false')
+    if nprocs is None:
+        nprocs = dico['nprocs']
     product_information = main_info.product_information
     l2a_file = main_info.l2a_file_work_path
 
@@ -155,16 +158,20 @@ def ice_rlie_processing(main_info):
             
             
     ######################
-    #execute ICE
-    cmd_ice = {'cmd': make_ice_script(dico['ice'], ice_temp_dir, l2a_file, main_info.templates['rlie'], product_information, dico['nprocs']), \
-        'stdout_write_objects': [main_info.get_subtask_logger_writer(prefix='ICE stdout')], 'stderr_write_objects': [main_info.get_subtask_logger_writer(prefix='ICE stderr')]}
-    #ICE launch job
-    main_info.update_processing_status(new_value='ice_start')
-    execution_dict = execute_commands({'ice': cmd_ice}, maxtime_seconds=dico['ice']['max_processing_time'], scan_dt=1, verbose=0)['ice']
+    #make ICE command
+    cmd_ice = {'cmd': make_ice_script(dico['ice'], ice_temp_dir, l2a_file, main_info.templates['rlie'], product_information, nprocs), \
+        'stdout_write_objects': [main_info.get_subtask_logger_writer(prefix='ICE stdout')], 'stderr_write_objects': [main_info.get_subtask_logger_writer(prefix='ICE stderr')], \
+        'maxtime_seconds': dico['ice']['max_processing_time']}
+    return cmd_ice
     
     
-    ######################
-    #ICE postprocessing    
+def ice_rlie_postprocessing(main_info, execution_dict):
+    """checks ICE execution and saves the RLIE product"""
+    
+    dico = main_info.input_parameters
+    product_information = main_info.product_information
+    ice_temp_dir = os.path.join(main_info.main_temp_dir, 'ice')
+    
     main_info.update_processing_status(new_value='ice_postprocessing')
     ice_product_dir = '%s/out'%ice_temp_dir
     #check ICE success/failure
@@ -185,6 +192,16 @@ def ice_rlie_processing(main_info):
         main_info.update_processing_status(new_value='ice_failed')
         raise CodedException('ICE returned with error %s after %s seconds => terminating csi_si_software\n%s\n'%(execution_dict['returncode'], \
             execution_dict['execution_time'], '\n'.join(execution_dict['stderr'])), exitcode=fsc_rlie_exitcodes.ice_unknown_error)
+
+
+def ice_rlie_processing(main_info):
+    
+    cmd_ice = ice_rlie_preprocessing(main_info)
+    #ICE launch job
+    main_info.update_processing_status(new_value='ice_start')
+    execution_dict = execute_commands({'ice': cmd_ice}, scan_dt=1, verbose=0)['ice']
+    #ICE postprocessing
+    ice_rlie_postprocessing(main_info, execution_dict)
             
 
     
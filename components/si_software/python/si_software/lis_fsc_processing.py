@@ -11,11 +11,13 @@ from si_utils.rewrite_cog import rewrite_cog
 
 from si_software.add_colortable_to_si_products import add_colortable_to_si_products
 from si_software.add_quicklook import add_quicklook
+from si_software.lis_fsc_qc_layers import compute_lis_fsc_qc_layers
 
    
 
     
-def edit_lis_fsc_qc_layers(lis_input_folder, l2a_path, water_mask_path, tcd_path, output_folder=None):
+def edit_lis_fsc_qc_layers(lis_input_folder, l2a_path, water_mask_path, tcd_path, output_folder=None, nrows_block=1024):
+    """computes expert flags and QC layers in a single pass, reading each source raster once by blocks of nrows_block rows"""
     
     maja_product_tag = os.path.basename(l2a_path)
     lis_product_tag = os.path.basename(lis_input_folder)
@@ -32,52 +34,43 @@ def edit_lis_fsc_qc_layers(lis_input_folder, l2a_path, water_mask_path, tcd_path
     output_cloud_file = '%s/%s_CLD.tif'%(output_folder, lis_product_tag)
     copy_original(maja_cloud_mask_file, output_cloud_file)
     
-    #expert flags
-    source_list = []
-    #bit 0: MAJA sun too low for an accurate slope correction
-    #bit 1: MAJA sun tangent
-    source_list += [{'sources': [{'filepath': geophysical_mask_file, 'bandnumber': 1, 'unpack_bits': True}], \
-        'operation': {0: 'A0[:,:,6]', 1: 'A0[:,:,7]'}}]
-    #bit 2: water mask
-    source_list += [{'sources': [{'filepath': water_mask_path, 'bandnumber': 1, 'unpack_bits': False}], \
-        'operation': {2: 'A0==1'}}]
-    #bit 3: tree cover density > 90%
-    source_list += [{'sources': [{'filepath': tcd_path, 'bandnumber': 1, 'unpack_bits': False}], \
-        'operation': {3: 'np.logical_and(A0<101,A0>90)'}}]
-    #bit 4: snow detected under thin clouds
-    source_list += [{'sources': [{'filepath': maja_cloud_mask_file, 'bandnumber': 1, 'unpack_bits': False}, {'filepath': fsc_toc_file, 'bandnumber': 1, 'unpack_bits': False}], \
-        'operation': {4: '(A0>0)*(A1>0)*(A1<101)'}}]
-    #bit 5: tree cover density undefined or unavailable
-    source_list += [{'sources': [{'filepath': tcd_path, 'bandnumber': 1, 'unpack_bits': False}], \
-        'operation': {5: 'A0>100'}}]
-    output_expert_file = '%s/%s_QCFLAGS.tif'%(output_folder, lis_product_tag)
-    bit_bandmath(output_expert_file, raster_gdal_info, [source_list], compress=False, add_overviews=False, use_default_cosims_config=False)
-    
-    #QC layer top of canopy
-    #[0: highest quality, 1: lower quality, 2: decreasing quality, 3: lowest quality, 205: cloud mask, 255: no data]
-    source_list = []
-    source_list += [{'sources': [{'filepath': output_expert_file, 'bandnumber': 1, 'unpack_bits': True}], \
-        'operation': 'np.minimum(B*0+3,(4-np.maximum(B*0, (100.-30.*A0[:,:,1]-50.*A0[:,:,0]-25.*A0[:,:,4]-25.*A0[:,:,2])/25.))).astype(np.uint8)'}]
-    #values 205 and 255 from FSCTOC snow product
-    source_list += [{'sources': [{'filepath': fsc_toc_file, 'bandnumber': 1, 'unpack_bits': False}], \
-        'operation': 'B*(A0!=205)*(A0!=255) + 205*(A0==205) + 255*(A0==255)'}]
-    output_qc_toc_file = '%s/%s_QCTOC.tif'%(output_folder, lis_product_tag)
-    bit_bandmath(output_qc_toc_file, raster_gdal_info, [source_list], no_data_values_per_band=[np.uint8(255)], compress=False, add_overviews=False, use_default_cosims_config=False)
-    
-    #QC layer on ground
-    #[0: highest quality, 1: lower quality, 2: decreasing quality, 3: lowest quality, 205: cloud mask, 255: no data]
-    source_list = []
-    source_list += [{'sources': [{'filepath': output_expert_file, 'bandnumber': 1, 'unpack_bits': True}, {'filepath': tcd_path, 'bandnumber': 1, 'unpack_bits': False}], \
-        'operation': 'np.minimum(B*0+3,(4-np.maximum(B*0, (100.-30.*A0[:,:,1]-50.*A0[:,:,0]-25.*A0[:,:,4]-25.*A0[:,:,2]-80.*A1)/25.))).astype(np.uint8)'}]
-    #values 205 and 255 from FSCOG snow product
-    source_list += [{'sources': [{'filepath': fsc_og_file, 'bandnumber': 1, 'unpack_bits': False}], \
-        'operation': 'B*(A0!=205)*(A0!=255) + 205*(A0==205) + 255*(A0==255)'}]
-    output_qc_og_file = '%s/%s_QCOG.tif'%(output_folder, lis_product_tag)
-    bit_bandmath(output_qc_og_file, raster_gdal_info, [source_list], no_data_values_per_band=[np.uint8(255)], compress=False, add_overviews=False, use_default_cosims_config=False)
+    #open sources
+    source_files = [geophysical_mask_file, water_mask_path, tcd_path, maja_cloud_mask_file, fsc_toc_file, fsc_og_file]
+    source_bands = []
+    for source_file in source_files:
+        ds_loc = gdal.Open(check_path(source_file))
+        if ds_loc is None:
+            raise RuntimeInputFileError('gdal could not open file %s'%source_file)
+        source_bands.append((ds_loc, ds_loc.GetRasterBand(1)))
+    
+    #create outputs: expert flags, QC layer top of canopy, QC layer on ground
+    xsize, ysize = raster_gdal_info['size']
+    output_files = ['%s/%s_%s.tif'%(output_folder, lis_product_tag, el) for el in ['QCFLAGS', 'QCTOC', 'QCOG']]
+    output_bands = []
+    for output_file, no_data_value in zip(output_files, [None, 255, 255]):
+        ds_out = gdal.GetDriverByName('GTiff').Create(output_file, xsize, ysize, 1, gdal.GDT_Byte)
+        ds_out.SetGeoTransform(tuple(raster_gdal_info['geoTransform']))
+        ds_out.SetProjection(raster_gdal_info['coordinateSystem']['wkt'])
+        outband = ds_out.GetRasterBand(1)
+        outband.DeleteNoDataValue()
+        if no_data_value is not None:
+            outband.SetNoDataValue(float(no_data_value))
+        output_bands.append((ds_out, outband))
+    
+    #fused computation, block by block
+    for row in range(0, ysize, nrows_block):
+        nrows = min(nrows_block, ysize-row)
+        sources = [band.ReadAsArray(0, row, xsize, nrows) for _, band in source_bands]
+        for (_, outband), output_array in zip(output_bands, compute_lis_fsc_qc_layers(*sources)):
+            outband.WriteArray(output_array, 0, row)
+    
+    for _, outband in output_bands:
+        outband.FlushCache()
+    source_bands = None
+    output_bands = None
     
 
 
-
 def fsc_product_final_editing(lis_product_input_dir, lis_product_output_dir, l2a_path, water_mask_path, tcd_path, fsc_metadata_file, product_information, apply_dem_mask_file=None):
     
     product_id = os.path.basename(lis_product_output_dir)
@@ -194,7 +187,8 @@ def make_lis_script(lis_in_dir, lis_out_dir, dem_dir, l2a_file, tcd_file, nprocs
     
     
     
-def lis_fsc_processing(main_info):
+def lis_fsc_preprocessing(main_info, nprocs=None):
+    """prepares LIS inputs and returns the LIS command dict to be launched with execute_commands, using nprocs threads (default: nprocs input parameter)"""
     
     main_info.update_processing_status(new_value='lis_preprocessing')
     main_info.logger_info('')
@@ -205,7 +199,8 @@ def lis_fsc_processing(main_info):
     main_info.logger_info('LIS preprocessing...')
     
     dico = main_info.input_parameters
-    product_information = main_info.product_information
+    if nprocs is None:
+        nprocs = dico['nprocs']
     l2a_file = main_info.l2a_file_work_path
 
     ######################
@@ -215,17 +210,21 @@ def lis_fsc_processing(main_info):
         os.system('mkdir -p %s/%s'%(lis_temp_dir, fol))
 
     ######################
-    #execute LIS
     #make shell script for LIS (LIS requires additional environment variables to be set as well as additions to PATH and PYTHONPATH that we don't want to have in the general csi_si_software context)
-    cmd_lis = {'cmd': make_lis_script('%s/in'%lis_temp_dir, '%s/out'%lis_temp_dir, dico['dem_dir'], l2a_file, dico['lis']['tree_cover_density'], dico['nprocs']), \
-        'stdout_write_objects': [main_info.get_subtask_logger_writer(prefix='LIS stdout')], 'stderr_write_objects': [main_info.get_subtask_logger_writer(prefix='LIS stderr')]}
-    #LIS launch job
-    main_info.update_processing_status(new_value='lis_start')
-    execution_dict = execute_commands({'lis': cmd_lis}, maxtime_seconds=dico['lis']['max_processing_time'], scan_dt=1, verbose=0)['lis']
-
-
-    ######################
-    #LIS postprocessing    
+    cmd_lis = {'cmd': make_lis_script('%s/in'%lis_temp_dir, '%s/out'%lis_temp_dir, dico['dem_dir'], l2a_file, dico['lis']['tree_cover_density'], nprocs), \
+        'stdout_write_objects': [main_info.get_subtask_logger_writer(prefix='LIS stdout')], 'stderr_write_objects': [main_info.get_subtask_logger_writer(prefix='LIS stderr')], \
+        'maxtime_seconds': dico['lis']['max_processing_time']}
+    return cmd_lis
+    
+    
+def lis_fsc_postprocessing(main_info, execution_dict):
+    """checks LIS execution and saves the FSC product"""
+    
+    dico = main_info.input_parameters
+    product_information = main_info.product_information
+    l2a_file = main_info.l2a_file_work_path
+    lis_temp_dir = os.path.join(main_info.main_temp_dir, 'lis')
+    
     main_info.update_processing_status(new_value='lis_postprocessing')
     lis_product_dir = '%s/out/LIS_PRODUCTS'%lis_temp_dir
     lis_successful = False
@@ -253,6 +252,16 @@ def lis_fsc_processing(main_info):
             execution_dict['execution_time'], '\n'.join(execution_dict['stderr'])), exitcode=fsc_rlie_exitcodes.lis_unknown_error)
 
 
+def lis_fsc_processing(main_info):
+    
+    cmd_lis = lis_fsc_preprocessing(main_info)
+    #LIS launch job
+    main_info.update_processing_status(new_value='lis_start')
+    execution_dict = execute_commands({'lis': cmd_lis}, scan_dt=1, verbose=0)['lis']
+    #LIS postprocessing
+    lis_fsc_postprocessing(main_info, execution_dict)
+
+
 def simple_lis_cosims_processing(output_dir, l2a_path, dem_dir, water_mask_path=None, tcd_path=None, product_mode_overide=1, nprocs=1):
     
     os.makedirs(output_dir, exist_ok=True)
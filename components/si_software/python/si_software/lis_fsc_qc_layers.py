@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+
+
+def compute_lis_fsc_qc_layers(geophysical_mask, water_mask, tcd, maja_cloud_mask, fsc_toc, fsc_og):
+    """computes the expert flags, QC top of canopy and QC on ground layers (uint8 arrays) from the source arrays of the same shape
+    
+    expert flags bits:
+        0: MAJA sun too low for an accurate slope correction
+        1: MAJA sun tangent
+        2: water mask
+        3: tree cover density > 90%
+        4: snow detected under thin clouds
+        5: tree cover density undefined or unavailable
+    QC layers: [0: highest quality, 1: lower quality, 2: decreasing quality, 3: lowest quality, 205: cloud mask, 255: no data]
+    """
+    
+    geophysical_mask = geophysical_mask.astype(np.uint8, copy=False)
+    flags = (geophysical_mask >> 6) & 1
+    flags |= ((geophysical_mask >> 7) & 1) << 1
+    flags |= (water_mask == 1).astype(np.uint8) << 2
+    flags |= ((tcd < 101) & (tcd > 90)).astype(np.uint8) << 3
+    flags |= ((maja_cloud_mask > 0) & (fsc_toc > 0) & (fsc_toc < 101)).astype(np.uint8) << 4
+    flags |= (tcd > 100).astype(np.uint8) << 5
+    
+    #quality score 100-30*bit1-50*bit0-25*bit4-25*bit2 (-80*tcd on ground), lowered by 25 per quality level:
+    #qc = min(3, floor(4-max(0,score)/25)) = min(3, 4-ceil(max(0,score)/25)), computed with integers
+    score_lut = np.array([100-30*((el >> 1) & 1)-50*(el & 1)-25*((el >> 4) & 1)-25*((el >> 2) & 1) for el in range(256)], dtype=np.int32)
+    score = score_lut[flags]
+    qc_toc = np.minimum(3, 4-(np.maximum(0, score)+24)//25).astype(np.uint8)
+    score -= 80*tcd.astype(np.int32)
+    qc_og = np.minimum(3, 4-(np.maximum(0, score)+24)//25).astype(np.uint8)
+    
+    #values 205 and 255 from FSC snow products
+    for qc, fsc in [(qc_toc, fsc_toc), (qc_og, fsc_og)]:
+        for value in [205, 255]:
+            qc[fsc == value] = value
+    
+    return flags, qc_toc, qc_og
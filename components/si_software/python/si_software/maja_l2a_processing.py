@@ -135,7 +135,7 @@ def update_product_information_from_l2a_file(product_information, l2a_path, temp
         
     #compute shape around data
     product_information['wekeo_geom'] = get_valid_data_convex_hull(os.path.join(l2a_path, 'MASKS', os.path.basename(l2a_path) + '_EDG_R2.tif'), \
-        valid_values=[0], proj_out='EPSG:4326', temp_dir=temp_dir).wkt
+        valid_values=[0], proj_out='EPSG:4326', temp_dir=temp_dir, vectorized=True).wkt
         
     product_information['tile_name'] = l2a_path.split('/')[-1].split('_')[3][1:]
     assert product_information['product_mode_overide'] in set([0,1]), 'product_mode_overide must be 0 or 1'
@@ -10,6 +10,7 @@ from si_geometry.get_valid_data_convex_hull import get_valid_data_convex_hull
 from si_software.add_colortable_to_si_products import add_colortable_to_si_products
 from si_utils.rewrite_cog import rewrite_cog
 import multiprocessing
+import traceback
 from si_software.add_quicklook import add_quicklook
 from si_utils.rclone import Rclone
 
@@ -40,7 +41,174 @@ def fill_template_args(general_info, psa_tag, min_date, max_date, lonlat_minmax_
 
 
 
-def generate_laea_psa_products(laea_dict, s2_eea39_dict, psa_product_dict, output_dir, temp_dir):
+def compute_laea_s2_intersection_index(laea_dict, s2_eea39_dict, cache_file=None):
+    """Returns a dict {laea_tile_id: [intersecting s2_tile_ids]} (S2 tiles in s2_eea39_dict order).
+    S2 tile perimeters are projected once per LAEA coordinate system and bounding boxes are compared before exact intersections.
+    If cache_file is given, the index is read from it when it was computed on the same tiles, and written to it otherwise."""
+    
+    if cache_file is not None:
+        if os.path.exists(cache_file):
+            with open(cache_file) as ds:
+                cache_content = json.load(ds)
+            if set(cache_content['laea_tile_ids']) == set(laea_dict.keys()) and set(cache_content['s2_tile_ids']) == set(s2_eea39_dict.keys()):
+                print('Reading LAEA/S2 intersection index from %s'%cache_file)
+                return cache_content['index']
+    
+    s2_tile_ids = list(s2_eea39_dict.keys())
+    s2_perimeter_objs = [RasterPerimeter(s2_eea39_dict[s2_tile_id]) for s2_tile_id in s2_tile_ids]
+    projected_s2_perimeters = dict()
+    index = dict()
+    for laea_tile_id, gdal_info_dict_laea in laea_dict.items():
+        laea_tile_raster_perimeter_obj = RasterPerimeter(gdal_info_dict_laea)
+        proj = laea_tile_raster_perimeter_obj.proj
+        if proj not in projected_s2_perimeters:
+            polygons = [el.projected_perimeter(proj) for el in s2_perimeter_objs]
+            projected_s2_perimeters[proj] = (polygons, np.array([polygon.bounds for polygon in polygons]))
+        polygons, bounds = projected_s2_perimeters[proj]
+        xmin, ymin, xmax, ymax = laea_tile_raster_perimeter_obj.perimeter_box.bounds
+        candidates = np.where((bounds[:,0] <= xmax) & (bounds[:,2] >= xmin) & (bounds[:,1] <= ymax) & (bounds[:,3] >= ymin))[0]
+        index[laea_tile_id] = [s2_tile_ids[ii] for ii in candidates if polygons[ii].intersects(laea_tile_raster_perimeter_obj.perimeter_box)]
+        
+    if cache_file is not None:
+        with open(cache_file, mode='w') as ds:
+            json.dump({'laea_tile_ids': sorted(list(laea_dict.keys())), 's2_tile_ids': sorted(s2_tile_ids), 'index': index}, ds, indent=4)
+    return index
+    
+    
+    
+def generate_laea_psa_product(laea_tile_id, gdal_info_dict_laea, s2_tile_ids, psa_product_dict, general_info, template_file, output_dir, temp_dir):
+    
+    start_time_laea_tile = time.time()
+    print('Processing LAEA tile %s'%laea_tile_id)
+    
+    #change template resolution to 20m
+    gdal_info_dict_laea_20m = gdal_info_rescale(gdal_info_dict_laea, xRes=20, yRes=20)
+    
+    #LAEA product folder in temp folder
+    temp_tag = 'PSA_LAEA_%s'%laea_tile_id
+    temp_fol_loc = os.path.join(temp_dir, temp_tag)
+    os.makedirs(temp_fol_loc)
+    temp_file_psa = os.path.join(temp_fol_loc, 'PSA.tif')
+    temp_file_qc = os.path.join(temp_fol_loc, 'QC.tif')
+
+    #projections from each of the S2 tiles intersecting with LAEA tile, warped in memory
+    min_date_loc, max_date_loc = None, None
+    psa_laea_ds, qc_laea_ds = None, None
+    for s2_tile_id in s2_tile_ids:
+        
+        start_time_s2_tile = time.time()
+        s2_psa_product = psa_product_dict[s2_tile_id]
+        print('  -> intersection with S2 tile %s'%s2_tile_id)
+
+        psa_s2_loc = os.path.join(s2_psa_product, os.path.basename(s2_psa_product) + '_PSA.tif')
+        qc_s2_loc = os.path.join(s2_psa_product, os.path.basename(s2_psa_product) + '_QC.tif')
+        assert os.path.exists(psa_s2_loc) and os.path.exists(qc_s2_loc)
+        
+        start_time = time.time()
+        if psa_laea_ds is None: #1st step
+            psa_laea_ds = reproject_to_mem(psa_s2_loc, gdal_info_dict_laea_20m, temp_dir=temp_fol_loc)
+            qc_laea_ds = reproject_to_mem(qc_s2_loc, gdal_info_dict_laea_20m, temp_dir=temp_fol_loc)
+            psa_laea_ar = psa_laea_ds.GetRasterBand(1).ReadAsArray()
+            qc_laea_ar = qc_laea_ds.GetRasterBand(1).ReadAsArray()
+            print('    reprojection1 : %s seconds'%(time.time()-start_time))
+        else:
+            ds_loc = reproject_to_mem(psa_s2_loc, gdal_info_dict_laea_20m, temp_dir=temp_fol_loc)
+            psa_laea_ar_new = ds_loc.GetRasterBand(1).ReadAsArray()
+            ds_loc = reproject_to_mem(qc_s2_loc, gdal_info_dict_laea_20m, temp_dir=temp_fol_loc)
+            qc_laea_ar_new = ds_loc.GetRasterBand(1).ReadAsArray()
+            ds_loc = None
+            print('    reprojection : %s seconds'%(time.time()-start_time))
+            
+            apply_new = np.logical_or(psa_laea_ar == 255, np.logical_and(psa_laea_ar == 0, psa_laea_ar_new == 1))
+            
+            psa_laea_ar[apply_new] = psa_laea_ar_new[apply_new]
+            qc_laea_ar[apply_new] = qc_laea_ar_new[apply_new]
+        
+        #get min,max dates
+        min_date_prod = datetime.strptime(os.path.basename(s2_psa_product).split('_')[1].split('-')[0], '%Y%m%d')
+        max_date_prod = min_date_prod+timedelta(float(os.path.basename(s2_psa_product).split('_')[1].split('-')[1]))
+        if min_date_loc is None:
+            min_date_loc, max_date_loc = min_date_prod, max_date_prod
+        else:
+            min_date_loc = min(min_date_loc, min_date_prod)
+            max_date_loc = max(max_date_loc, max_date_prod)
+            
+        print('    aggregation of s2 tile finished: %s seconds total'%(time.time()-start_time_s2_tile))
+        
+        
+        
+    #write computed bands to PSA LAEA files
+    for ds_mem, data_ar, filename in [(psa_laea_ds, psa_laea_ar, temp_file_psa), (qc_laea_ds, qc_laea_ar, temp_file_qc)]:
+        ds_mem.GetRasterBand(1).WriteArray(data_ar)
+        gdal.GetDriverByName('GTiff').CreateCopy(filename, ds_mem, options=['compress=deflate', 'zlevel=4'])
+    psa_laea_ds, qc_laea_ds = None, None
+        
+    product_tag = 'PSA_%s-%03d_S2_%s_%s'%(min_date_loc.strftime('%Y%m%d'), int(np.ceil((max_date_loc-min_date_loc).total_seconds()/(3600.*24.))), laea_tile_id, general_info['product_version'])
+    template_dict = fill_template_args(general_info, product_tag, min_date_loc, max_date_loc, RasterPerimeter(temp_file_psa).get_lonlat_minmax())
+    #psa LAEA metadata
+    with open(template_file) as ds:
+        psa_metadata_content = ds.read()
+    for key, value in template_dict.items():
+        psa_metadata_content = psa_metadata_content.replace('[%s]'%key, '%s'%value)
+    with open('%s/MTD.xml'%temp_fol_loc, mode='w') as ds:
+        ds.write(psa_metadata_content)
+        
+    #rename files to contain product ID
+    for filename in os.listdir(temp_fol_loc):
+        shutil.move(os.path.join(temp_fol_loc, filename), os.path.join(temp_fol_loc, product_tag + '_' + filename))
+        
+    #add color tables to tif files
+    add_colortable_to_si_products(temp_fol_loc, product_tag=product_tag)
+    
+    #transform geotiff into COG
+    rewrite_cog(temp_fol_loc, dest_path=os.path.join(output_dir, product_tag), verbose=1)
+    
+    #add quicklook
+    add_quicklook(os.path.join(output_dir, product_tag), '_PSA.tif', reproject_to_wgs84=True)
+    
+    #add json output
+    json_dict = {
+        "collection_name": "HR-S&I",
+        "resto": {
+            "type": "Feature",
+            "geometry": {
+                "wkt": get_valid_data_convex_hull(os.path.join(output_dir, product_tag, product_tag + '_PSA.tif'), \
+                    valid_values=[0,1], proj_out='EPSG:4326', temp_dir=temp_dir, vectorized=True).wkt
+            },
+            "properties": {
+                "productIdentifier": product_tag,
+                "title": product_tag,
+                "resourceSize": compute_size_du(os.path.join(output_dir, product_tag)),
+                "organisationName": "EEA",
+                "startDate": min_date_loc.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+                "completionDate": max_date_loc.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+                "productType": "PSA_LAEA",
+                "resolution": 20,
+                "processingBaseline": product_tag.split('_')[-1],
+                "host_base": None,
+                "s3_bucket": None
+            }}}
+    with open(os.path.join(output_dir, product_tag, 'dias_catalog_submit.json'), mode='w') as ds:
+        json.dump(json_dict, ds, ensure_ascii=True, indent=4)
+
+    print('  => LAEA product %s generated after %s minutes'%(product_tag, (time.time()-start_time_laea_tile)/60.))
+    
+    
+    
+def generate_laea_psa_product_worker(laea_tile_id, gdal_info_dict_laea, s2_tile_ids, psa_product_dict, general_info, template_file, output_dir, temp_dir, max_ram):
+    """generate_laea_psa_product in a separate process, returns the error traceback or None if successful"""
+    set_gdal_otb_itk_env_vars(nprocs=1, max_ram=max_ram)
+    try:
+        generate_laea_psa_product(laea_tile_id, gdal_info_dict_laea, s2_tile_ids, psa_product_dict, general_info, template_file, output_dir, temp_dir)
+    except:
+        return traceback.format_exc()
+    return None
+
+
+
+def generate_laea_psa_products(laea_dict, s2_eea39_dict, psa_product_dict, output_dir, temp_dir, nprocs=1, max_ram=4096, intersection_index_file=None):
+    """Generates the PSA products of the LAEA tiles missing in output_dir from the S2 tile PSA products.
+    intersection_index_file caches the S2 tiles intersecting each LAEA tile (see compute_laea_s2_intersection_index), it must not be in output_dir."""
     
     start_time_general = time.time()
     
@@ -62,134 +230,33 @@ def generate_laea_psa_products(laea_dict, s2_eea39_dict, psa_product_dict, outpu
             assert year == year_loc
     
     missing_products = sorted(list(set(s2_eea39_dict.keys()) - set(psa_product_dict.keys())))
-    psa_product_dict_corr = copy.deepcopy(psa_product_dict)
     if len(missing_products) > 0:
         raise Exception('Missing the following S2 tile PSA products:\n%s'%('\n'.join(['- %s'%el for el in missing_products])))
 
     existing_laea_products = [el for el in os.listdir(output_dir) if len(el.split('_'))==5]
     existing_laea_products = set([el.split('_')[-2] for el in existing_laea_products if el.split('_')[0] == 'PSA' and el.split('_')[-2] in set(laea_dict.keys())])
-    psa_laea_product_dict = dict()
-    
-    
-    for laea_tile_id, gdal_info_dict_laea in laea_dict.items():
-        
-        print('Processing LAEA tile %s'%laea_tile_id)
-        
-        if laea_tile_id in existing_laea_products:
-            print('  => already generated, skipping...')
-            continue
-        
-        start_time_laea_tile = time.time()
-        
-        #change template resolution to 20m
-        gdal_info_dict_laea_20m = gdal_info_rescale(gdal_info_dict_laea, xRes=20, yRes=20)
-        
-        #create empty LAEA product (files are created but contain zeros) in temp folder
-        temp_tag = 'PSA_LAEA_%s'%laea_tile_id
-        temp_fol_loc = os.path.join(temp_dir, temp_tag)
-        os.makedirs(temp_fol_loc)
-        temp_file_psa = os.path.join(temp_fol_loc, 'PSA.tif')
-        temp_file_qc = os.path.join(temp_fol_loc, 'QC.tif')
-
-        #projections from each of the S2 tiles intersecting with LAEA tile
-        laea_tile_raster_perimeter_obj = RasterPerimeter(gdal_info_dict_laea_20m)
-        min_date_loc, max_date_loc = None, None
-        for s2_tile_id, gdal_info_dict_s2 in s2_eea39_dict.items():
-            
-            start_time_s2_tile = time.time()
-            
-            if not RasterPerimeter(gdal_info_dict_s2).intersects(laea_tile_raster_perimeter_obj):
-                continue
-            s2_psa_product = psa_product_dict_corr[s2_tile_id]
-            print('  -> intersection with S2 tile %s'%s2_tile_id)
-
-            psa_s2_loc = os.path.join(s2_psa_product, os.path.basename(s2_psa_product) + '_PSA.tif')
-            qc_s2_loc = os.path.join(s2_psa_product, os.path.basename(s2_psa_product) + '_QC.tif')
-            assert os.path.exists(psa_s2_loc) and os.path.exists(qc_s2_loc)
-            
-            start_time = time.time()
-            if min_date_loc is None: #1st step
-                psa_laea_ar = reproject(psa_s2_loc, gdal_info_dict_laea_20m, temp_file_psa, return_array=True)
-                qc_laea_ar = reproject(qc_s2_loc, gdal_info_dict_laea_20m, temp_file_qc, return_array=True)
-                print('    reprojection1 : %s seconds'%(time.time()-start_time))
-            else:
-
-                start_time = time.time()
-                psa_laea_ar_new = reproject(psa_s2_loc, gdal_info_dict_laea_20m, os.path.join(temp_fol_loc, 'psanew.tif'), return_array=True, remove_target_file=True)
-                qc_laea_ar_new = reproject(qc_s2_loc, gdal_info_dict_laea_20m, os.path.join(temp_fol_loc, 'qcnew.tif'), return_array=True, remove_target_file=True)
-                print('    reprojection : %s seconds'%(time.time()-start_time))
-                
-                apply_new = np.logical_or(psa_laea_ar == 255, np.logical_and(psa_laea_ar == 0, psa_laea_ar_new == 1))
-                
-                psa_laea_ar[apply_new] = psa_laea_ar_new[apply_new]
-                qc_laea_ar[apply_new] = qc_laea_ar_new[apply_new]
-            
-            #get min,max dates
-            min_date_prod = datetime.strptime(os.path.basename(s2_psa_product).split('_')[1].split('-')[0], '%Y%m%d')
-            max_date_prod = min_date_prod+timedelta(float(os.path.basename(s2_psa_product).split('_')[1].split('-')[1]))
-            if min_date_loc is None:
-                min_date_loc, max_date_loc = min_date_prod, max_date_prod
-            else:
-                min_date_loc = min(min_date_loc, min_date_prod)
-                max_date_loc = max(max_date_loc, max_date_prod)
-                
-            print('    aggregation of s2 tile finished: %s seconds total'%(time.time()-start_time_s2_tile))
-            
-            
-            
-        #write computed bands to PSA LAEA files
-        write_band(temp_file_psa, psa_laea_ar)
-        write_band(temp_file_qc, qc_laea_ar)
-            
-        product_tag = 'PSA_%s-%03d_S2_%s_%s'%(min_date_loc.strftime('%Y%m%d'), int(np.ceil((max_date_loc-min_date_loc).total_seconds()/(3600.*24.))), laea_tile_id, general_info['product_version'])
-        template_dict = fill_template_args(general_info, product_tag, min_date_loc, max_date_loc, RasterPerimeter(temp_file_psa).get_lonlat_minmax())
-        #psa LAEA metadata
-        with open(template_file) as ds:
-            psa_metadata_content = ds.read()
-        for key, value in template_dict.items():
-            psa_metadata_content = psa_metadata_content.replace('[%s]'%key, '%s'%value)
-        with open('%s/MTD.xml'%temp_fol_loc, mode='w') as ds:
-            ds.write(psa_metadata_content)
-            
-        #rename files to contain product ID
-        for filename in os.listdir(temp_fol_loc):
-            shutil.move(os.path.join(temp_fol_loc, filename), os.path.join(temp_fol_loc, product_tag + '_' + filename))
-            
-        #add color tables to tif files
-        add_colortable_to_si_products(temp_fol_loc, product_tag=product_tag)
-        
-        #transform geotiff into COG
-        rewrite_cog(temp_fol_loc, dest_path=os.path.join(output_dir, product_tag), verbose=1)
-        
-        #add quicklook
-        add_quicklook(os.path.join(output_dir, product_tag), '_PSA.tif', reproject_to_wgs84=True)
-        
-        #add json output
-        json_dict = {
-            "collection_name": "HR-S&I",
-            "resto": {
-                "type": "Feature",
-                "geometry": {
-                    "wkt": get_valid_data_convex_hull(os.path.join(output_dir, product_tag, product_tag + '_PSA.tif'), \
-                        valid_values=[0,1], proj_out='EPSG:4326', use_otb=True, temp_dir=temp_dir).wkt
-                },
-                "properties": {
-                    "productIdentifier": product_tag,
-                    "title": product_tag,
-                    "resourceSize": compute_size_du(os.path.join(output_dir, product_tag)),
-                    "organisationName": "EEA",
-                    "startDate": min_date_loc.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
-                    "completionDate": max_date_loc.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
-                    "productType": "PSA_LAEA",
-                    "resolution": 20,
-                    "processingBaseline": product_tag.split('_')[-1],
-                    "host_base": None,
-                    "s3_bucket": None
-                }}}
-        with open(os.path.join(output_dir, product_tag, 'dias_catalog_submit.json'), mode='w') as ds:
-            json.dump(json_dict, ds, ensure_ascii=True, indent=4)
-
-        print('  => LAEA product %s generated after %s minutes'%(product_tag, (time.time()-start_time_laea_tile)/60.))
+    for laea_tile_id in sorted(list(existing_laea_products)):
+        print('LAEA tile %s already generated, skipping...'%laea_tile_id)
+    laea_tile_ids_process = [laea_tile_id for laea_tile_id in laea_dict.keys() if laea_tile_id not in existing_laea_products]
+    
+    #S2 tiles intersecting each LAEA tile
+    laea_s2_index = compute_laea_s2_intersection_index(laea_dict, s2_eea39_dict, cache_file=intersection_index_file)
+    
+    args_list = [(laea_tile_id, laea_dict[laea_tile_id], laea_s2_index[laea_tile_id], psa_product_dict, general_info, template_file, output_dir, temp_dir) \
+        for laea_tile_id in laea_tile_ids_process]
+    if nprocs <= 1:
+        for args in args_list:
+            generate_laea_psa_product(*args)
+    else:
+        with multiprocessing.get_context('spawn').Pool(processes=nprocs, maxtasksperchild=1) as pool:
+            error_messages = pool.starmap(generate_laea_psa_product_worker, [args + (max(1, max_ram//nprocs),) for args in args_list])
+        failed_tiles = []
+        for laea_tile_id, error_message in zip(laea_tile_ids_process, error_messages):
+            if error_message is not None:
+                print('PSA processing on LAEA tile %s failed:\n%s'%(laea_tile_id, error_message))
+                failed_tiles.append(laea_tile_id)
+        if len(failed_tiles) > 0:
+            raise Exception('PSA processing failed for LAEA tiles: %s'%(', '.join(sorted(failed_tiles))))
     
     print('  => LAEA product generation finished : %s hours total time'%((time.time()-start_time_general)/3600.))
 
@@ -231,6 +298,34 @@ def update_product_information_from_fsc_file(product_information, fsc_filename_f
     return product_information
     
     
+def psa_count_snow_clear(fsc_files, nrows_block=1024):
+    """Counts for each pixel the number of FSCTOC files with snow (0 < FSC <= 100) and clear (FSC <= 100) observations.
+    Files are read by blocks of nrows_block rows and counts are accumulated in uint16 arrays."""
+    
+    assert len(fsc_files) < np.iinfo(np.uint16).max, 'too many FSCTOC files for uint16 counters'
+    ds_in = gdal.Open(fsc_files[0])
+    xsize, ysize = ds_in.RasterXSize, ds_in.RasterYSize
+    ds_in = None
+    count_snow = np.zeros((ysize, xsize), dtype=np.uint16)
+    count_clear = np.zeros((ysize, xsize), dtype=np.uint16)
+    for fsc_file in fsc_files:
+        print('Adding data from file %s'%fsc_file)
+        ds_in = gdal.Open(fsc_file)
+        assert ds_in.RasterCount == 1, 'fsc file %s expected to have a single band'%fsc_file
+        assert (ds_in.RasterXSize, ds_in.RasterYSize) == (xsize, ysize), 'fsc file %s size differs from first fsc file'%fsc_file
+        band = ds_in.GetRasterBand(1)
+        for row_start in range(0, ysize, nrows_block):
+            nrows = min(nrows_block, ysize-row_start)
+            fsc_data = band.ReadAsArray(0, row_start, xsize, nrows)
+            count_clear_block = count_clear[row_start:row_start+nrows,:]
+            np.add(count_clear_block, 1, out=count_clear_block, where=fsc_data <= 100)
+            count_snow_block = count_snow[row_start:row_start+nrows,:]
+            np.add(count_snow_block, 1, out=count_snow_block, where=np.logical_and(fsc_data > 0, fsc_data < 101))
+        band = None
+        ds_in = None
+    return count_snow, count_clear
+    
+    
 def psa_s2tile_processing(output_dir, temp_dir, fsc_files_in, rclone_config_file, persistent_snow_ratio=0.95):
     
     os.makedirs(output_dir, exist_ok=True)
@@ -275,24 +370,10 @@ def psa_s2tile_processing(output_dir, temp_dir, fsc_files_in, rclone_config_file
         #compute PSA
         start_time = time.time()
         
-        #iterate on FSCTOC files counting number of snow,cloud,valid(non-nan) pixels
-        fsc_file_index = 0
-        ds_in = gdal.Open(fsc_files[fsc_file_index])
-        fsc_data = ds_in.GetRasterBand(1).ReadAsArray()
-        ar_shape = np.shape(fsc_data)
-        count_snow = np.zeros(ar_shape, dtype=np.int32)
-        count_clear = np.zeros(ar_shape, dtype=np.int32)
-        while(True):
-            print('Adding data from file %s'%fsc_files[fsc_file_index])
-            count_snow[np.logical_and(fsc_data > 0, fsc_data < 101)] += 1
-            count_clear[fsc_data <= 100] += 1
-            fsc_file_index += 1
-            if fsc_file_index < n_fsc_files:
-                ds_in = gdal.Open(fsc_files[fsc_file_index])
-                assert ds_in.RasterCount == 1, 'fsc file %s expected to have a single band'%fsc_files[fsc_file_index]
-                fsc_data = ds_in.GetRasterBand(1).ReadAsArray()
-            else:
-                break
+        #iterate on FSCTOC files counting number of snow,clear(non-cloud, non-nan) pixels
+        count_snow, count_clear = psa_count_snow_clear(fsc_files)
+        ar_shape = np.shape(count_snow)
+        ds_in = gdal.Open(fsc_files[-1])
                 
         #create PSA
         driver = gdal.GetDriverByName('GTiff')
@@ -347,7 +428,7 @@ def psa_s2tile_processing(output_dir, temp_dir, fsc_files_in, rclone_config_file
                 "type": "Feature",
                 "geometry": {
                     "wkt": get_valid_data_convex_hull(os.path.join(output_dir, product_information['tag'], product_information['tag'] + '_PSA.tif'), \
-                        valid_values=[0,1], proj_out='EPSG:4326', temp_dir=temp_dir_session).wkt
+                        valid_values=[0,1], proj_out='EPSG:4326', temp_dir=temp_dir_session, vectorized=True).wkt
                 },
                 "properties": {
                     "productIdentifier": product_information['tag'],
@@ -469,6 +550,38 @@ def download_fsctoc_files_efficiently(dico_in_tiled, store_dir, rclone_config_fi
     return dico_out
 
 
+def psa_s2tile_processing_worker(tile_id, output_dir, temp_dir, fsc_files_in, rclone_config_file, max_ram):
+    """psa_s2tile_processing in a separate process with its own temp folder, returns the error traceback or None if successful"""
+    set_gdal_otb_itk_env_vars(nprocs=1, max_ram=max_ram)
+    temp_dir_tile = os.path.join(temp_dir, 'psa_%s'%tile_id)
+    try:
+        psa_s2tile_processing(output_dir, temp_dir_tile, fsc_files_in, rclone_config_file)
+    except:
+        return traceback.format_exc()
+    finally:
+        if os.path.exists(temp_dir_tile):
+            shutil.rmtree(temp_dir_tile)
+    return None
+    
+    
+def psa_s2tile_processing_multi(output_dir, temp_dir, fsctoc_product_dict, tile_ids_process, rclone_config_file=None, nprocs=4, max_ram=4096):
+    """Processes S2 tiles in parallel, each tile in a separate process (spawned, one process per tile so that no GDAL state is shared)
+    with its own temp folder"""
+    
+    tile_ids_process = sorted(list(tile_ids_process))
+    failed_tiles = dict()
+    with multiprocessing.get_context('spawn').Pool(processes=nprocs, maxtasksperchild=1) as pool:
+        error_messages = pool.starmap(psa_s2tile_processing_worker, [(tile_id, output_dir, temp_dir, fsctoc_product_dict[tile_id], rclone_config_file, \
+            max(1, max_ram//nprocs)) for tile_id in tile_ids_process])
+    for tile_id, error_message in zip(tile_ids_process, error_messages):
+        if error_message is not None:
+            print('PSA processing on S2 tile %s failed:\n%s'%(tile_id, error_message))
+            failed_tiles[tile_id] = error_message
+    if len(failed_tiles) > 0:
+        raise Exception('PSA processing failed for S2 tiles: %s'%(', '.join(sorted(list(failed_tiles.keys())))))
+
+
+
 def psa_processing_chain(output_dir, temp_dir, aoi_eea39_dir, start_date, end_date, input_fsc_dir, rclone_config_file=None, nprocs=4, max_ram=4096):
     
     #nprocs, memory used
@@ -553,9 +666,8 @@ def psa_processing_chain(output_dir, temp_dir, aoi_eea39_dir, start_date, end_da
             for tile_id in tqdm.tqdm(tile_ids_process):
                 psa_s2tile_processing(output_dir, temp_dir, fsctoc_product_dict[tile_id], rclone_config_file)
         else:
-            raise NotImplementedError('For some reason, gdal generates TiffWriteRawTile errors when running multiple tasks in parallel, so, for now, only launch on 1 proc.')
-            pool = multiprocessing.Pool(processes=nprocs)
-            _ = pool.starmap(psa_s2tile_processing, [(output_dir, temp_dir, fsctoc_product_dict[tile_id], rclone_config_file) for tile_id in tile_ids_process])
+            psa_s2tile_processing_multi(output_dir, temp_dir_session, fsctoc_product_dict, tile_ids_process, rclone_config_file=rclone_config_file, \
+                nprocs=nprocs, max_ram=max_ram)
         
 
     #identify existing PSA S2
@@ -574,7 +686,8 @@ def psa_processing_chain(output_dir, temp_dir, aoi_eea39_dir, start_date, end_da
     #PSA LAEA
     if not set(laea_dict.keys()).issubset(set(existing_tiles_psa_laea_dict.keys())):
         #launch PSA LAEA processing
-        generate_laea_psa_products(laea_dict, s2_eea39_dict, existing_tiles_psa_dict, output_dir, temp_dir)
+        generate_laea_psa_products(laea_dict, s2_eea39_dict, existing_tiles_psa_dict, output_dir, temp_dir, nprocs=nprocs, max_ram=max_ram, \
+            intersection_index_file=os.path.join(temp_dir, 'laea_s2_intersection_index.json'))
         
 
 
@@ -8,38 +8,32 @@ try:
 except:
     import gdal
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pdb import set_trace
+from si_utils.validate_cloud_optimized_geotiff import validate, ValidateCloudOptimizedGeoTIFFException
 
 
-def rewrite_cog(src_path, dest_path=None, verbose=1):
-    
-    if os.path.isdir(src_path):
-        for root_src, dirs, files in os.walk(src_path, topdown=True):
-            root_target = os.path.abspath(root_src).replace(os.path.abspath(src_path), os.path.abspath(dest_path))
-            os.makedirs(root_target, exist_ok=True)
-            for name in files:
-                src_file = os.path.join(root_src, name)
-                target_file = os.path.join(root_target, name)
-                if os.path.exists(target_file):
-                    continue
-                if src_file.lower().split('.')[-1] in ['tiff', 'tif']:
-                    if verbose > 0:
-                        if dest_path is None:
-                            print('rewrite_cog: %s (inplace)'%src_file)
-                        else:
-                            print('rewrite_cog: %s -> %s'%(src_file, target_file))
-                    rewrite_cog(src_file, dest_path=target_file, verbose=0)
-                elif dest_path is not None:
-                    if verbose > 0:
-                        print('copy: %s -> %s'%(src_file, target_file))
-                    shutil.copy(src_file, target_file)
-            for name in dirs:
-                target_dir = os.path.join(root_target, name)
-                if not os.path.exists(target_dir):
-                    os.makedirs(target_dir)
-        return
-    
-    src_ds = gdal.Open(src_path)
+partial_suffix = '.rewrite_cog_partial'
+overview_levels = [2,4,8,16,32]
+
+
+def is_compressed_cog(src_path):
+    """Returns True if src_path is already a compressed cloud optimized geotiff with internal overviews and 1024x1024 blocks"""
+    try:
+        warnings, errors, _ = validate(src_path)
+    except ValidateCloudOptimizedGeoTIFFException:
+        return False
+    if len(errors) > 0 or len(warnings) > 0:
+        return False
+    ds = gdal.Open(src_path)
+    is_compressed = ds.GetMetadataItem('COMPRESSION', 'IMAGE_STRUCTURE') is not None
+    block_size = ds.GetRasterBand(1).GetBlockSize()
+    ds = None
+    return is_compressed and block_size == [1024, 1024]
+
+
+def write_cog_with_mem_copy(src_ds, output_file):
+    """COG writing for GDAL versions without COG driver or OVERVIEW_COUNT option (< 3.6): band is copied in a MEM dataset to build overviews"""
     geo_transform = src_ds.GetGeoTransform()
     proj_src = src_ds.GetProjection()
     band_src = src_ds.GetRasterBand(1)
@@ -52,6 +46,7 @@ def rewrite_cog(src_path, dest_path=None, verbose=1):
     dst_ds.SetGeoTransform(geo_transform)
     dst_ds.SetProjection(proj_src)
     dst_ds.GetRasterBand(1).WriteArray(rasterData)
+    del rasterData
     if nodata_val is not None:
         dst_ds.GetRasterBand(1).SetNoDataValue(nodata_val)
     band = dst_ds.GetRasterBand(1)
@@ -60,27 +55,109 @@ def rewrite_cog(src_path, dest_path=None, verbose=1):
         band.SetRasterColorInterpretation(gdal.GCI_PaletteIndex)
     gdal.SetConfigOption('COMPRESS_OVERVIEW', 'DEFLATE')
     gdal.SetConfigOption('GDAL_TIFF_OVR_BLOCKSIZE', '1024')
-    dst_ds.BuildOverviews("NEAREST", [2,4,8,16,32])
+    dst_ds.BuildOverviews("NEAREST", overview_levels)
     band = None
     options = ['COMPRESS=DEFLATE', 'PREDICTOR=1', 'ZLEVEL=4', 'TILED=YES', 'BLOCKXSIZE=1024', 'BLOCKYSIZE=1024', "COPY_SRC_OVERVIEWS=YES"]
+    gdal.GetDriverByName('GTiff').CreateCopy(output_file, dst_ds, options=options)
+    dst_ds = None
+
+
+def write_cog(src_ds, output_file):
+    """Streams src_ds to a COG file through GDAL's COG driver (no full in-memory copy of the band).
+    
+    The products keep the overview levels of the MEM copy path (2, 4, 8, 16 and 32). The COG driver only builds a fixed number of overviews
+    with the OVERVIEW_COUNT option (GDAL >= 3.6): without it, it stops at the first overview smaller than a block, so older GDAL versions
+    keep the MEM copy path.
+    """
+    cog_driver = gdal.GetDriverByName('COG')
+    if cog_driver is None or 'OVERVIEW_COUNT' not in (cog_driver.GetMetadataItem(gdal.DMD_CREATIONOPTIONLIST) or ''):
+        write_cog_with_mem_copy(src_ds, output_file)
+        return
+    options = ['COMPRESS=DEFLATE', 'PREDICTOR=NO', 'LEVEL=4', 'BLOCKSIZE=1024', 'RESAMPLING=NEAREST', 'OVERVIEWS=IGNORE_EXISTING',
+        'OVERVIEW_COUNT=%d'%len(overview_levels)]
+    ds_out = cog_driver.CreateCopy(output_file, src_ds, options=options)
+    if ds_out is None:
+        raise Exception('COG conversion of %s failed: %s'%(src_ds.GetDescription(), gdal.GetLastErrorMsg()))
+    ds_out = None
+
+
+def rewrite_cog_file(src_path, dest_path=None, verbose=1, skip_valid_cog=True):
+    
+    if skip_valid_cog and is_compressed_cog(src_path):
+        if dest_path is not None:
+            if verbose > 0:
+                print('copy (already COG): %s -> %s'%(src_path, dest_path))
+            shutil.copy(src_path, dest_path + partial_suffix)
+            os.replace(dest_path + partial_suffix, dest_path)
+        elif verbose > 0:
+            print('rewrite_cog: %s already COG, skipped'%src_path)
+        return
+    
+    src_ds = gdal.Open(src_path)
     temp_dir = None
     try:
         temp_dir = tempfile.mkdtemp()
         temp_file = os.path.join(temp_dir, 'temp.tif')
-        gdal.GetDriverByName('GTiff').CreateCopy(temp_file, dst_ds, options=options)
+        write_cog(src_ds, temp_file)
+        src_ds = None
         if dest_path is not None:
             if verbose > 0:
                 print('rewrite_cog: %s -> %s'%(src_path, dest_path))
-            shutil.move(temp_file, dest_path)
         else:
             if verbose > 0:
                 print('rewrite_cog: %s (inplace)'%(src_path))
-            shutil.move(temp_file, src_path)
+            dest_path = src_path
+        #move next to the target first so that an interrupted move never leaves a truncated target file
+        shutil.move(temp_file, dest_path + partial_suffix)
+        os.replace(dest_path + partial_suffix, dest_path)
     finally:
         if temp_dir is not None:
             if os.path.exists(temp_dir):
                 shutil.rmtree(temp_dir)
-    del band_src, src_ds
+    del src_ds
+
+
+def rewrite_cog(src_path, dest_path=None, verbose=1, nprocs=4, skip_valid_cog=True):
+    """Rewrites a TIFF file, or all TIFF files within a directory, as cloud optimized geotiffs.
+    
+    In directory mode, files are converted concurrently by nprocs workers, files already present in dest_path are not processed again
+    (an interrupted conversion can be resumed) and files that already are compressed COGs are copied as is if skip_valid_cog is True.
+    """
+    
+    if not os.path.isdir(src_path):
+        rewrite_cog_file(src_path, dest_path=dest_path, verbose=verbose, skip_valid_cog=skip_valid_cog)
+        return
+    
+    tif_files = []
+    for root_src, dirs, files in os.walk(src_path, topdown=True):
+        root_target = os.path.abspath(root_src).replace(os.path.abspath(src_path), os.path.abspath(dest_path))
+        os.makedirs(root_target, exist_ok=True)
+        for name in files:
+            src_file = os.path.join(root_src, name)
+            target_file = os.path.join(root_target, name)
+            if name.endswith(partial_suffix):
+                continue
+            if os.path.exists(target_file):
+                continue
+            if src_file.lower().split('.')[-1] in ['tiff', 'tif']:
+                if verbose > 0:
+                    print('rewrite_cog: %s -> %s'%(src_file, target_file))
+                tif_files.append((src_file, target_file))
+            elif dest_path is not None:
+                if verbose > 0:
+                    print('copy: %s -> %s'%(src_file, target_file))
+                shutil.copy(src_file, target_file)
+        for name in dirs:
+            target_dir = os.path.join(root_target, name)
+            if not os.path.exists(target_dir):
+                os.makedirs(target_dir)
+    
+    if len(tif_files) == 0:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(nprocs, len(tif_files)))) as executor:
+        futures = [executor.submit(rewrite_cog_file, src_file, dest_path=target_file, verbose=0, skip_valid_cog=skip_valid_cog) for src_file, target_file in tif_files]
+        for future in futures:
+            future.result()
 
 
 if __name__ == '__main__':
@@ -93,11 +170,13 @@ if __name__ == '__main__':
     group.add_argument("--inplace", action='store_true', default=False, help='In place compression in input_folder. This is not recommended since it does not provide ' + \
         'a means to save disk space during processing : it creates all new data in a temporary output_folder and then deletes the input_folder and moves the temporary ' + \
         'output_folder in place of the input_folder. It is therefore only a convenience option. If this option is used and output_folder specified, an error is raised.')
+    parser.add_argument("--nprocs", type=int, default=4, help="number of files converted concurrently in directory mode, default is 4")
+    parser.add_argument("--force", action='store_true', default=False, help='rewrite files that already are compressed COGs')
     parser.add_argument("--verbose", type=int, default=1, help="verbose level, default is 1")
     args = parser.parse_args()
     
     if (args.output is None) and (not args.inplace):
         raise Exception('Output is not specified. To transform inplace, use the --inplace option.')
-    rewrite_cog(args.input, dest_path=args.output)
+    rewrite_cog(args.input, dest_path=args.output, verbose=args.verbose, nprocs=args.nprocs, skip_valid_cog=not args.force)
     
     
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The si_software modules import each other from the python directory (si_utils, si_geometry, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python'))
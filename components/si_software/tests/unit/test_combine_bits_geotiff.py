@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+gdal = pytest.importorskip('osgeo.gdal')
+
+from si_geometry.combine_bits_geotiff import bit_bandmath, logical_array_list_operation, packbits2d, unpackbits2d
+
+
+XSIZE, YSIZE = 37, 29
+
+SOURCE_LIST = [
+    {'sources': [{'filepath': 'flags.tif', 'bandnumber': 1, 'unpack_bits': True}],
+        'operation': 'np.minimum(B*0+3,(4-np.maximum(B*0, (100.-30.*A0[:,:,1]-50.*A0[:,:,0]-25.*A0[:,:,4])/25.))).astype(np.uint8)'},
+    {'sources': [{'filepath': 'values.tif', 'bandnumber': 1, 'unpack_bits': False}],
+        'operation': 'B*(A0!=205)*(A0!=255) + 205*(A0==205) + 255*(A0==255)'},
+    {'sources': [{'filepath': 'flags.tif', 'bandnumber': 1, 'unpack_bits': True}],
+        'operation': {0: 'A0[:,:,1]', 1: '1-(1-A0[:,:,2])*(1-A0[:,:,3])', 2: 'A0[:,:,1]-A0[:,:,2]', 3: '(A0[:,:,4]-A0[:,:,5]) > 0'}},
+    {'sources': [{'filepath': 'flags.tif', 'bandnumber': 1, 'unpack_bits': True}, {'filepath': 'values.tif', 'bandnumber': 1, 'unpack_bits': False}],
+        'operation': {4: '-A0[:,:,6]', 5: '(300*A0[:,:,7] + A1) > 280', 6: 'B[:,:,0]*(1-A0[:,:,2])'}},
+    {'sources': [{'filepath': 'flags.tif', 'bandnumber': 1, 'unpack_bits': True}],
+        'operation': 'np.where(A0[:,:,0]-A0[:,:,1] < 0, 0, B)'},
+    {'sources': [{'filepath': 'flags.tif', 'bandnumber': 1, 'unpack_bits': True}],
+        'operation': {7: 'A0[:,:,0]-A0[:,:,1]+A0[:,:,2] == 0'}},
+]
+
+
+def legacy_bit_bandmath(arrays, source_list):
+    '''Output of bit_bandmath as implemented before the packed bits and row blocks.'''
+    output_array = np.zeros((YSIZE, XSIZE), dtype=np.uint8)
+    output_bits_unpacked = False
+    for dico in source_list:
+        local_eval_dict = {'np': np, 'logical_array_list_operation': logical_array_list_operation}
+        for i_src, src in enumerate(dico['sources']):
+            local_eval_dict['A%d'%i_src] = arrays[src['filepath']]
+            if src['unpack_bits']:
+                local_eval_dict['A%d'%i_src] = unpackbits2d(local_eval_dict['A%d'%i_src])
+        if isinstance(dico['operation'], dict):
+            if not output_bits_unpacked:
+                output_array = unpackbits2d(output_array)
+                output_bits_unpacked = True
+            local_eval_dict['B'] = output_array
+            for id_bit, operation in dico['operation'].items():
+                output_array[:,:,id_bit] = eval(operation, {}, local_eval_dict)
+        else:
+            if output_bits_unpacked:
+                output_array = packbits2d(output_array)
+                output_bits_unpacked = False
+            local_eval_dict['B'] = output_array
+            output_array = eval(dico['operation'], {}, local_eval_dict)
+    if output_bits_unpacked:
+        output_array = packbits2d(output_array)
+    return output_array.astype(np.uint8)
+
+
+def write_raster(path, data):
+    ds = gdal.GetDriverByName('GTiff').Create(path, XSIZE, YSIZE, 1, gdal.GDT_Byte)
+    ds.SetGeoTransform((600000., 20., 0., 5100000., 0., -20.))
+    ds.GetRasterBand(1).WriteArray(data)
+    ds = None
+
+
+@pytest.mark.parametrize('nrows_block', [None, 1, 4, 1024])
+def test_bit_bandmath_matches_unpacked_bits(tmp_path, nrows_block):
+    """Test that packed bits and row blocks give the same output as unpacked bits"""
+
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 256, size=(YSIZE, XSIZE), dtype=np.uint8)
+    values[0, :5] = 205
+    values[1, :5] = 255
+    arrays = {
+        str(tmp_path / 'flags.tif'): rng.integers(0, 256, size=(YSIZE, XSIZE), dtype=np.uint8),
+        str(tmp_path / 'values.tif'): values,
+    }
+    for path, data in arrays.items():
+        write_raster(path, data)
+    source_list = [dict(dico, sources=[dict(src, filepath=str(tmp_path / src['filepath'])) for src in dico['sources']]) \
+        for dico in SOURCE_LIST]
+    ds = gdal.Open(str(tmp_path / 'values.tif'))
+    raster_info_dict = {
+        'size': [XSIZE, YSIZE],
+        'geoTransform': list(ds.GetGeoTransform()),
+        'coordinateSystem': {'wkt': ds.GetProjection()}}
+    ds = None
+
+    output_file = str(tmp_path / 'output.tif')
+    bit_bandmath(output_file, raster_info_dict, [source_list], compress=False, add_overviews=False, nrows_block=nrows_block)
+
+    ds = gdal.Open(output_file)
+    np.testing.assert_array_equal(ds.GetRasterBand(1).ReadAsArray(), legacy_bit_bandmath(arrays, source_list))
+    ds = None
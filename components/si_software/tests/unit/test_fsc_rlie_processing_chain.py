@@ -0,0 +1,156 @@
+import os
+
+import pytest
+
+pytest.importorskip('osgeo.gdal')
+
+import si_software.fsc_rlie_processing_chain as fsc_rlie_processing_chain
+import si_software.ice_rlie_processing as ice_rlie_processing
+import si_software.lis_fsc_processing as lis_fsc_processing
+from si_common.exitcodes import fsc_rlie_exitcodes
+
+
+TILE = '32TLR'
+FSC_PRODUCT_ID = 'FSC_20210413T101347_S2A_T32TLR_V100_1'
+RLIE_PRODUCT_ID = 'RLIE_20210413T101347_S2A_T32TLR_V100_1'
+L2A_PRODUCT_ID = 'SENTINEL2A_20210413-101347-000_L2A_T32TLR_C_V1-0'
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'w').close()
+    return path
+
+
+def input_parameters(tmp_path, lis_ice_parallel):
+    '''Chain input parameters, the MAJA L2A product being already in the product dict.'''
+    output_dir = str(tmp_path / 'output')
+    os.makedirs(os.path.join(output_dir, 'data', L2A_PRODUCT_ID))
+    with open(os.path.join(output_dir, 'data', 'product_dict.yaml'), mode='w') as ds:
+        ds.write('l2a: %s\n'%L2A_PRODUCT_ID)
+    dem_dir = str(tmp_path / ('S2__TEST_AUX_REFDE2_T%s_0001'%TILE))
+    os.makedirs(dem_dir)
+    return {
+        'output_dir': output_dir,
+        'temp_dir': str(tmp_path / 'temp'),
+        'verbose': 0,
+        'return_with_error_code': True,
+        'copy_input_files_to_temp_dir': False,
+        'delete_temp_dir_on_error': False,
+        'delete_temp_dir_on_success': False,
+        'lis_ice_parallel': lis_ice_parallel,
+        'nprocs': 4,
+        'max_ram': 1024,
+        'dem_dir': dem_dir,
+        'maja': {
+            'static_parameter_files_dir': str(tmp_path),
+            'user_config_dir': str(tmp_path),
+            'mode': 'init',
+            'l1c_file': touch(str(tmp_path / ('S2A_MSIL1C_20210413T101021_N0300_R022_T%s_20210413T122536.SAFE'%TILE))),
+            'l2a_file': None,
+            'save_output_l2a_file': True,
+            'product_mode_overide': None,
+            'max_processing_time': None,
+            'max_cloud_cover_acceptable_percent': None,
+        },
+        'lis': {
+            'tree_cover_density': touch(str(tmp_path / ('TCD_%s.tif'%TILE))),
+            'water_mask': touch(str(tmp_path / ('WaterMask_%s.tif'%TILE))),
+            'max_processing_time': None,
+        },
+        'ice': {
+            'generate_product': True,
+            'river_shapefile': touch(str(tmp_path / ('RiverShapefile_%s.shp'%TILE))),
+            'hrl_flags_file': touch(str(tmp_path / ('HRLFlags_%s.tif'%TILE))),
+            'max_processing_time': None,
+        },
+    }
+
+
+@pytest.fixture
+def launches(monkeypatch):
+    '''Mocks the LIS and ICE commands: execute_commands fails for the keys in launches['failing'] and records its calls.'''
+    launches = {'failing': [], 'calls': []}
+
+    def execute_commands(cmd_dict, scan_dt=1, verbose=0):
+        launches['calls'].append(sorted(cmd_dict.keys()))
+        return {key: {'returncode': 1 if key in launches['failing'] else 0, 'exceeded_time': False, 'execution_time': 1.,
+            'stdout': [], 'stderr': ['%s error'%key] if key in launches['failing'] else []} for key in cmd_dict}
+
+    def make_lis_script(lis_in_dir, lis_out_dir, dem_dir, l2a_file, tcd_file, nprocs_lis):
+        touch(os.path.join(lis_out_dir, 'LIS_PRODUCTS', 'LIS_FSC.tif'))
+        return 'lis.sh'
+
+    def final_editing(product_input_dir, product_output_dir, *args, **kwargs):
+        os.makedirs(product_output_dir)
+
+    def update_product_information_from_l2a_file(product_information, l2a_file, temp_dir=None):
+        product_information['template'] = {'FSC_PRODUCT_ID': FSC_PRODUCT_ID, 'RLIE_PRODUCT_ID': RLIE_PRODUCT_ID}
+        return product_information
+
+    for module in [fsc_rlie_processing_chain, lis_fsc_processing, ice_rlie_processing]:
+        monkeypatch.setattr(module, 'execute_commands', execute_commands)
+    monkeypatch.setattr(fsc_rlie_processing_chain, 'set_gdal_otb_itk_env_vars', lambda nprocs, max_ram: None)
+    monkeypatch.setattr(fsc_rlie_processing_chain, 'update_product_information_from_l2a_file', update_product_information_from_l2a_file)
+    monkeypatch.setattr(lis_fsc_processing, 'make_lis_script', make_lis_script)
+    monkeypatch.setattr(ice_rlie_processing, 'make_ice_script', lambda *args: 'ice.sh')
+    monkeypatch.setattr(lis_fsc_processing, 'fsc_product_final_editing', final_editing)
+    monkeypatch.setattr(ice_rlie_processing, 'ice_product_final_editing', final_editing)
+    return launches
+
+
+def run_chain(tmp_path, lis_ice_parallel):
+    '''Runs the chain and returns its exit code, the statuses in status.yaml and the product dict file lines.'''
+    dico = input_parameters(tmp_path, lis_ice_parallel)
+    output_dir = dico['output_dir']
+    exit_code = fsc_rlie_processing_chain.fsc_rlie_processing_chain(dico)
+    with open(os.path.join(output_dir, 'status.yaml')) as ds:
+        statuses = [line[2:].strip() for line in ds if line.startswith('- ')]
+    with open(os.path.join(output_dir, 'data', 'product_dict.yaml')) as ds:
+        products = sorted(line.strip() for line in ds if line.strip())
+    return exit_code, statuses, products
+
+
+@pytest.mark.parametrize('lis_ice_parallel', [False, True])
+def test_fsc_rlie_processing_chain_success(tmp_path, launches, lis_ice_parallel):
+    """Test that both modes go through the end of the chain and finalise the status file"""
+
+    exit_code, statuses, products = run_chain(tmp_path, lis_ice_parallel)
+
+    assert exit_code == 0
+    assert statuses[-1] == 'exiting_completed'
+    assert {'lisfsc_productgenerated', 'icerlie_productgenerated'}.issubset(statuses)
+    assert products == ['fsc: %s'%FSC_PRODUCT_ID, 'l2a: %s'%L2A_PRODUCT_ID, 'rlie: %s'%RLIE_PRODUCT_ID]
+    assert launches['calls'] == ([['ice', 'lis']] if lis_ice_parallel else [['lis'], ['ice']])
+
+
+@pytest.mark.parametrize('lis_ice_parallel', [False, True])
+def test_fsc_rlie_processing_chain_lis_failure(tmp_path, launches, lis_ice_parallel):
+    """Test that a LIS failure exits with the LIS error in both modes, the RLIE product being saved when ICE ran alongside"""
+
+    launches['failing'] = ['lis']
+    exit_code, statuses, products = run_chain(tmp_path, lis_ice_parallel)
+
+    assert exit_code == fsc_rlie_exitcodes.lis_unknown_error
+    assert statuses[-1] == 'exiting_error'
+    assert 'lis_failed' in statuses and 'lisfsc_productgenerated' not in statuses
+    if lis_ice_parallel:
+        assert 'icerlie_productgenerated' in statuses
+        assert products == ['l2a: %s'%L2A_PRODUCT_ID, 'rlie: %s'%RLIE_PRODUCT_ID]
+    else:
+        assert 'ice_start' not in statuses
+        assert products == ['l2a: %s'%L2A_PRODUCT_ID]
+
+
+@pytest.mark.parametrize('lis_ice_parallel', [False, True])
+def test_fsc_rlie_processing_chain_ice_failure(tmp_path, launches, lis_ice_parallel):
+    """Test that an ICE failure exits with the ICE error, the FSC product being saved, in both modes"""
+
+    launches['failing'] = ['ice']
+    exit_code, statuses, products = run_chain(tmp_path, lis_ice_parallel)
+
+    assert exit_code == fsc_rlie_exitcodes.ice_unknown_error
+    assert statuses[-1] == 'exiting_error'
+    assert 'ice_failed' in statuses and 'icerlie_productgenerated' not in statuses
+    assert 'lisfsc_productgenerated' in statuses
+    assert products == ['fsc: %s'%FSC_PRODUCT_ID, 'l2a: %s'%L2A_PRODUCT_ID]
@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+import pytest
+
+from si_software.lis_fsc_qc_layers import compute_lis_fsc_qc_layers
+
+
+XSIZE, YSIZE = 37, 29
+
+
+def unpack(ar):
+    return np.unpackbits(ar[:,:,np.newaxis], axis=2, bitorder='little')
+
+
+def legacy_qc_layers(geophysical_mask, water_mask, tcd, maja_cloud_mask, fsc_toc, fsc_og):
+    '''QCFLAGS, QCTOC and QCOG as computed by the bit_bandmath expressions used before compute_lis_fsc_qc_layers.'''
+    #expert flags
+    A0 = unpack(geophysical_mask)
+    B = np.zeros(geophysical_mask.shape + (8,), dtype=np.uint8)
+    B[:,:,0] = A0[:,:,6]
+    B[:,:,1] = A0[:,:,7]
+    B[:,:,2] = water_mask==1
+    B[:,:,3] = np.logical_and(tcd<101, tcd>90)
+    B[:,:,4] = (maja_cloud_mask>0)*(fsc_toc>0)*(fsc_toc<101)
+    B[:,:,5] = tcd>100
+    flags = np.squeeze(np.packbits(B, axis=2, bitorder='little'), axis=2)
+
+    #QC layers top of canopy and on ground, then values 205 and 255 from the FSC snow products
+    A0, A1 = unpack(flags), tcd
+    B = np.zeros(flags.shape, dtype=np.uint8)
+    qc_toc = np.minimum(B*0+3,(4-np.maximum(B*0, (100.-30.*A0[:,:,1]-50.*A0[:,:,0]-25.*A0[:,:,4]-25.*A0[:,:,2])/25.))).astype(np.uint8)
+    qc_og = np.minimum(B*0+3,(4-np.maximum(B*0, (100.-30.*A0[:,:,1]-50.*A0[:,:,0]-25.*A0[:,:,4]-25.*A0[:,:,2]-80.*A1)/25.))).astype(np.uint8)
+    qc_layers = []
+    for B, A0 in [(qc_toc, fsc_toc), (qc_og, fsc_og)]:
+        qc_layers.append((B*(A0!=205)*(A0!=255) + 205*(A0==205) + 255*(A0==255)).astype(np.uint8))
+    return [flags] + qc_layers
+
+
+def random_sources(seed, shape=(YSIZE, XSIZE)):
+    '''MG2, water mask, TCD, CLM, FSCTOC and FSCOG uint8 arrays, with their nodata, water and cloud edge values.'''
+    rng = np.random.default_rng(seed)
+    geophysical_mask = rng.integers(0, 256, size=shape, dtype=np.uint8)
+    water_mask = rng.choice(np.array([0, 1, 2, 255], dtype=np.uint8), size=shape)
+    tcd = rng.choice(np.array([0, 1, 50, 90, 91, 99, 100, 101, 200, 254, 255], dtype=np.uint8), size=shape)
+    valid_tcd = rng.random(shape) < 0.5
+    tcd[valid_tcd] = rng.integers(0, 101, size=np.count_nonzero(valid_tcd), dtype=np.uint8)
+    maja_cloud_mask = rng.choice(np.array([0, 0, 1, 2, 128, 255], dtype=np.uint8), size=shape)
+    fsc_layers = []
+    for _ in range(2):
+        fsc = rng.integers(0, 101, size=shape, dtype=np.uint8)
+        fsc[rng.random(shape) < 0.2] = 205
+        fsc[rng.random(shape) < 0.2] = 255
+        fsc[rng.random(shape) < 0.05] = 0
+        fsc[rng.random(shape) < 0.05] = 101
+        fsc_layers.append(fsc)
+    return [geophysical_mask, water_mask, tcd, maja_cloud_mask] + fsc_layers
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_compute_lis_fsc_qc_layers_matches_legacy(seed):
+    """Test that the fused QC layers computation gives the same outputs as the per-layer expressions"""
+
+    sources = random_sources(seed)
+    for result, reference in zip(compute_lis_fsc_qc_layers(*sources), legacy_qc_layers(*sources)):
+        assert result.dtype == np.uint8
+        np.testing.assert_array_equal(result, reference)
+
+
+def test_compute_lis_fsc_qc_layers_all_flags():
+    """Test every expert flags value, with all TCD values, so that all quality scores are covered"""
+
+    geophysical_mask, tcd = [ar.astype(np.uint8) for ar in np.meshgrid(np.arange(256), np.arange(256))]
+    flags = np.arange(256, dtype=np.uint8)[np.newaxis, :].repeat(256, axis=0)
+    sources = [
+        geophysical_mask,
+        (flags >> 2) & 1,
+        tcd,
+        (flags >> 4) & 1,
+        np.where(flags & 16, 50, 0).astype(np.uint8),
+        np.where(tcd == 7, 205, np.where(tcd == 8, 255, tcd % 101)).astype(np.uint8),
+    ]
+    for result, reference in zip(compute_lis_fsc_qc_layers(*sources), legacy_qc_layers(*sources)):
+        np.testing.assert_array_equal(result, reference)
+
+
+@pytest.mark.parametrize('nrows_block', [4, 1024])
+def test_edit_lis_fsc_qc_layers(tmp_path, nrows_block):
+    """Test the QC layers written block by block, with blocks that don't divide the number of rows"""
+
+    gdal = pytest.importorskip('osgeo.gdal')
+    from si_software.lis_fsc_processing import edit_lis_fsc_qc_layers
+
+    lis_product_tag, maja_product_tag = 'FSC_20210413T101347_S2A_T32TLR_V100_1', 'SENTINEL2A_20210413-101347-000_L2A_T32TLR_C_V1-0'
+    lis_input_folder = tmp_path / lis_product_tag
+    l2a_path = tmp_path / maja_product_tag
+    os.makedirs(lis_input_folder)
+    os.makedirs(l2a_path / 'MASKS')
+    source_files = [
+        l2a_path / 'MASKS' / ('%s_MG2_R2.tif'%maja_product_tag), tmp_path / 'water_mask.tif', tmp_path / 'tcd.tif',
+        l2a_path / 'MASKS' / ('%s_CLM_R2.tif'%maja_product_tag),
+        lis_input_folder / ('%s_FSCTOC.tif'%lis_product_tag), lis_input_folder / ('%s_FSCOG.tif'%lis_product_tag)]
+    sources = random_sources(0)
+    for source_file, data in zip(source_files, sources):
+        ds = gdal.GetDriverByName('GTiff').Create(str(source_file), XSIZE, YSIZE, 1, gdal.GDT_Byte)
+        ds.SetGeoTransform((600000., 20., 0., 5100000., 0., -20.))
+        ds.GetRasterBand(1).WriteArray(data)
+        ds = None
+
+    edit_lis_fsc_qc_layers(str(lis_input_folder), str(l2a_path), str(source_files[1]), str(source_files[2]),
+        nrows_block=nrows_block)
+
+    for name, reference in zip(['QCFLAGS', 'QCTOC', 'QCOG'], legacy_qc_layers(*sources)):
+        ds = gdal.Open(str(lis_input_folder / ('%s_%s.tif'%(lis_product_tag, name))))
+        np.testing.assert_array_equal(ds.GetRasterBand(1).ReadAsArray(), reference)
+        ds = None
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+
+gdal = pytest.importorskip('osgeo.gdal')
+
+from si_geometry import geometry_functions
+
+
+XSIZE, YSIZE = 30, 20
+
+GDAL_INFO_DICT_DST = {
+    'coordinateSystem': {'wkt': 'EPSG:32632'},
+    'cornerCoordinates': {'lowerLeft': [600000., 5099600.], 'upperRight': [600600., 5100000.]},
+}
+
+
+def write_raster(path, data):
+    ds = gdal.GetDriverByName('GTiff').Create(path, data.shape[1], data.shape[0], 1, gdal.GDT_Byte)
+    ds.SetGeoTransform((600000., 20., 0., 5100000., 0., -20.))
+    ds.GetRasterBand(1).WriteArray(data)
+    ds = None
+
+
+def test_reproject_to_mem_gdalwarp_use_shell(tmp_path, monkeypatch):
+    """Test that the gdalwarp_use_shell switch warps through the gdalwarp command, into a MEM dataset"""
+
+    data = np.random.default_rng(0).integers(0, 256, size=(YSIZE, XSIZE), dtype=np.uint8)
+    commands = []
+    def check_call(cmd, shell=False):
+        commands.append(cmd)
+        write_raster(cmd.split(' ')[-1], data)
+    monkeypatch.setattr(geometry_functions.subprocess, 'check_call', check_call)
+    monkeypatch.setenv('gdalwarp_use_shell', 'true')
+    temp_dir = tmp_path / 'temp'
+    os.makedirs(temp_dir)
+
+    ds = geometry_functions.reproject_to_mem(str(tmp_path / 'source.tif'), GDAL_INFO_DICT_DST, temp_dir=str(temp_dir))
+
+    assert len(commands) == 1 and commands[0].startswith('gdalwarp ')
+    assert ds.GetDriver().ShortName == 'MEM'
+    np.testing.assert_array_equal(ds.GetRasterBand(1).ReadAsArray(), data)
+    #temporary GeoTIFF file removed
+    assert os.listdir(temp_dir) == []
+
+
+def test_reproject_to_mem_in_process(tmp_path, monkeypatch):
+    """Test that without the gdalwarp_use_shell switch, gdal.Warp writes directly into a MEM dataset"""
+
+    warps = []
+    def check_call(cmd, shell=False):
+        raise AssertionError('gdalwarp command should not be used')
+    def warp(destination, source, options=None):
+        warps.append(destination)
+        return 'mem_ds'
+    monkeypatch.setattr(geometry_functions.subprocess, 'check_call', check_call)
+    monkeypatch.setattr(geometry_functions.gdal, 'Warp', warp)
+    monkeypatch.delenv('gdalwarp_use_shell', raising=False)
+
+    assert geometry_functions.reproject_to_mem(str(tmp_path / 'source.tif'), GDAL_INFO_DICT_DST) == 'mem_ds'
+    assert warps == ['']
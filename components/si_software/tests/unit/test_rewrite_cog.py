@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+gdal = pytest.importorskip('osgeo.gdal')
+
+from si_utils import rewrite_cog
+
+
+def create_raster(path, xsize=2100, ysize=1300):
+    '''Paletted uint8 raster with a nodata value.'''
+    data = np.random.default_rng(0).integers(0, 4, size=(ysize, xsize), dtype=np.uint8)
+    data[:100, :] = 255
+    ds = gdal.GetDriverByName('GTiff').Create(path, xsize, ysize, 1, gdal.GDT_Byte)
+    ds.SetGeoTransform((600000., 20., 0., 5100000., 0., -20.))
+    band = ds.GetRasterBand(1)
+    band.WriteArray(data)
+    band.SetNoDataValue(255)
+    colortable = gdal.ColorTable()
+    for value, color in enumerate([(0, 0, 0, 255), (255, 0, 0, 255), (0, 255, 0, 255), (0, 0, 255, 255)]):
+        colortable.SetColorEntry(value, color)
+    band.SetRasterColorTable(colortable)
+    band.SetRasterColorInterpretation(gdal.GCI_PaletteIndex)
+    ds = None
+    return data
+
+
+def describe(path):
+    ds = gdal.Open(path)
+    band = ds.GetRasterBand(1)
+    colortable = band.GetRasterColorTable()
+    description = {
+        'data': band.ReadAsArray(),
+        'nodata': band.GetNoDataValue(),
+        'colors': [colortable.GetColorEntry(i) for i in range(4)],
+        'block_size': band.GetBlockSize(),
+        'overview_sizes': [(band.GetOverview(i).XSize, band.GetOverview(i).YSize) for i in range(band.GetOverviewCount())],
+        'overview_block_sizes': [band.GetOverview(i).GetBlockSize() for i in range(band.GetOverviewCount())],
+    }
+    ds = None
+    return description
+
+
+def test_write_cog_matches_mem_copy(tmp_path):
+    """Test that the COG driver path writes the same product as the MEM copy path"""
+
+    src_path = str(tmp_path / 'src.tif')
+    data = create_raster(src_path)
+    src_ds = gdal.Open(src_path)
+    rewrite_cog.write_cog_with_mem_copy(src_ds, str(tmp_path / 'legacy.tif'))
+    rewrite_cog.write_cog(src_ds, str(tmp_path / 'cog.tif'))
+    src_ds = None
+
+    legacy = describe(str(tmp_path / 'legacy.tif'))
+    new = describe(str(tmp_path / 'cog.tif'))
+
+    np.testing.assert_array_equal(new.pop('data'), data)
+    np.testing.assert_array_equal(legacy.pop('data'), data)
+    assert new == legacy
+    assert new['block_size'] == [1024, 1024]
+    assert len(new['overview_sizes']) == len(rewrite_cog.overview_levels)
+    assert rewrite_cog.is_compressed_cog(str(tmp_path / 'cog.tif'))
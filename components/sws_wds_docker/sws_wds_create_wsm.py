@@ -30,6 +30,20 @@ def readColorTable(color_file):
     return color_table
 
 
+def fsc_block_statistics(fsc, shape, code_cloud):
+    """Aggregate the FSC pixels by blocks, one block per pixel of the output grid of the given shape.
+
+    Returns, for each block, the number of observed pixels (FSC in [0, 100]),
+    the number of cloud pixels and the sum of the observed FSC values."""
+    scale_y, scale_x = fsc.shape[0] // shape[0], fsc.shape[1] // shape[1]
+    blocks = fsc[:shape[0] * scale_y, :shape[1] * scale_x].reshape(shape[0], scale_y, shape[1], scale_x)
+    observed = (blocks >= 0) & (blocks <= 100)
+    observed_count = np.count_nonzero(observed, axis=(1, 3))
+    cloud_count = np.count_nonzero(blocks == code_cloud, axis=(1, 3))
+    observed_sum = np.sum(blocks, axis=(1, 3), where=observed, dtype=np.int64)
+    return observed_count, cloud_count, observed_sum
+
+
 def create_wsm(args):
     # RC_TRESHLIST = [-3.5, -3., -2.5, -2.]
     RC_TRESHLIST = [-4.0, -3.5, -3.0, -2.5]
@@ -228,37 +242,30 @@ def create_wsm(args):
 
             scale_y, scale_x = fsc.shape[0] // ssc.shape[0], fsc.shape[1] // ssc.shape[1]
             observed_th = (scale_y * scale_x) // 2
-            for y in range(0, ssc.shape[0]):
-                fsc_y = y * scale_y
-                for x in range(0, ssc.shape[1]):
-                    fsc_x = x * scale_x
-                    d = fsc[fsc_y:fsc_y + scale_y, fsc_x:fsc_x + scale_x]
-                    observed = ((d >= 0) & (d <= 100))
-                    observed_count = np.count_nonzero(observed)
-                    cloud = (d == CODE_CLOUD)
-                    cloud_count = np.count_nonzero(cloud)
-                    cloud_th = scale_y * scale_x - observed_count - cloud_count
-                    if observed_count > observed_th:
-                        ssc_valid[y, x] = 1
-                        # observed
-                        if d[observed].mean() >= 90:
-                            # snow
-                            if wsm[y, x] == CODE_WSM_WET:
-                                # wet snow
-                                ssc[y, x] = CODE_SSC_WET
-                                qcssc[y, x] = qcwsm[y, x]
-                            elif wsm[y, x] == CODE_WSM_NOTWET:
-                                ssc[y, x] = CODE_SSC_DRY
-                                qcssc[y, x] = CODE_MASKS
-                        else:
-                            # no snow
-                            ssc[y, x] = CODE_SSC_SNOWFREE
-                            qcssc[y, x] = CODE_MASKS
-                    elif cloud_count > cloud_th:
-                        ssc_valid[y, x] = 2
-                        # cloudy
-                        ssc[y, x] = CODE_CLOUD
-                        qcssc[y, x] = CODE_MASKS
+            observed_count, cloud_count, observed_sum = fsc_block_statistics(fsc, ssc.shape, CODE_CLOUD)
+            cloud_th = scale_y * scale_x - observed_count - cloud_count
+
+            # observed
+            observed = (observed_count > observed_th)
+            ssc_valid[observed] = 1
+            # snow: mean observed FSC >= 90
+            snow = observed & (observed_sum >= 90 * observed_count)
+            # wet snow
+            m = snow & (wsm == CODE_WSM_WET)
+            ssc[m] = CODE_SSC_WET
+            qcssc[m] = qcwsm[m]
+            m = snow & (wsm == CODE_WSM_NOTWET)
+            ssc[m] = CODE_SSC_DRY
+            qcssc[m] = CODE_MASKS
+            # no snow
+            m = observed & ~snow
+            ssc[m] = CODE_SSC_SNOWFREE
+            qcssc[m] = CODE_MASKS
+            # cloudy
+            m = ~observed & (cloud_count > cloud_th)
+            ssc_valid[m] = 2
+            ssc[m] = CODE_CLOUD
+            qcssc[m] = CODE_MASKS
 
         m = (ssc_valid == 1) & (masks != 0)
         ssc[m] = masks[m]
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('osgeo.gdal')
+
+from sws_wds_create_wsm import fsc_block_statistics
+
+
+CODE_CLOUD = 205
+CODE_NODATA = 255
+# (FSC shape, SSC shape): exact blocks, then partial blocks left out on the last rows and columns
+SHAPES = [((90, 90), (30, 30)), ((91, 97), (30, 32)), ((64, 200), (21, 66)), ((12, 12), (6, 4))]
+
+
+def legacy_block_statistics(fsc, shape, code_cloud):
+    """Per-block loop as implemented in create_wsm before fsc_block_statistics."""
+    scale_y, scale_x = fsc.shape[0] // shape[0], fsc.shape[1] // shape[1]
+    observed_counts = np.zeros(shape, dtype=np.int64)
+    cloud_counts = np.zeros(shape, dtype=np.int64)
+    snow = np.zeros(shape, dtype=bool)
+    for y in range(0, shape[0]):
+        fsc_y = y * scale_y
+        for x in range(0, shape[1]):
+            fsc_x = x * scale_x
+            d = fsc[fsc_y:fsc_y + scale_y, fsc_x:fsc_x + scale_x]
+            observed = ((d >= 0) & (d <= 100))
+            observed_counts[y, x] = np.count_nonzero(observed)
+            cloud_counts[y, x] = np.count_nonzero(d == code_cloud)
+            if observed_counts[y, x] > 0:
+                snow[y, x] = d[observed].mean() >= 90
+    return observed_counts, cloud_counts, snow
+
+
+def synthetic_fsc(shape, seed):
+    """FSC-like raster: snow values around the 90 threshold, clouds, nodata and other codes."""
+    rng = np.random.RandomState(seed)
+    data = rng.randint(0, 101, size=shape).astype(np.uint8)
+    data[rng.rand(*shape) < 0.5] = rng.randint(85, 101)
+    data[rng.rand(*shape) < 0.25] = CODE_CLOUD
+    data[rng.rand(*shape) < 0.15] = CODE_NODATA
+    data[rng.rand(*shape) < 0.02] = 240
+    data[:shape[0] // 4, :shape[1] // 3] = CODE_NODATA
+    data[-shape[0] // 4:, :shape[1] // 3] = CODE_CLOUD
+    data[:shape[0] // 4, -shape[1] // 3:] = 100
+    return data
+
+
+def assert_same_statistics(fsc, ssc_shape):
+    legacy_observed_count, legacy_cloud_count, legacy_snow = legacy_block_statistics(fsc, ssc_shape, CODE_CLOUD)
+    observed_count, cloud_count, observed_sum = fsc_block_statistics(fsc, ssc_shape, CODE_CLOUD)
+
+    assert observed_count.shape == ssc_shape
+    assert np.array_equal(observed_count, legacy_observed_count)
+    assert np.array_equal(cloud_count, legacy_cloud_count)
+    # Mean observed FSC >= 90 test of create_wsm, on the blocks with observed pixels
+    has_observed = observed_count > 0
+    assert np.array_equal((observed_sum >= 90 * observed_count)[has_observed], legacy_snow[has_observed])
+    assert np.all(observed_sum[~has_observed] == 0)
+    return legacy_cloud_count, legacy_snow, has_observed
+
+
+def test_fsc_block_statistics_matches_legacy():
+    for seed, (fsc_shape, ssc_shape) in enumerate(SHAPES):
+        fsc = synthetic_fsc(fsc_shape, seed)
+        cloud_count, snow, has_observed = assert_same_statistics(fsc, ssc_shape)
+        # Cloudy, snow and no snow blocks are all represented
+        assert np.any(cloud_count == np.prod(np.array(fsc_shape) // ssc_shape))
+        assert np.any(snow) and np.any(has_observed & ~snow)
+
+
+def test_fsc_block_statistics_uniform_blocks():
+    """Fully cloudy, fully nodata and fully observed rasters."""
+    for value in [0, 89, 90, 100, CODE_CLOUD, CODE_NODATA]:
+        assert_same_statistics(value*np.ones((30, 31), dtype=np.uint8), (10, 10))
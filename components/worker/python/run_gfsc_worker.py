@@ -44,6 +44,10 @@ class RunGfscWorker(RunWorker):
         the temporary files needed and/or generated by the processing.
     '''
 
+    # Number of daily GFSC1 products built concurrently by the processing, each
+    # one holding full tile arrays in memory.
+    GF1_WORKERS = int(os.getenv('CSI_GFSC_GF1_WORKERS', '2'))
+
     def __init__(self, job, logger):
 
         # Call the parent constructor BEFORE all the attributes are initialized
@@ -260,7 +264,8 @@ class RunGfscWorker(RunWorker):
         self.download_file_from_bucket(
             csi_s3, csi_buckets_names['sip_aux'],
             f'ssp_aux/{ssp_aux_version}/{tile_id[1:]}/{fuw_mask_file}',
-            f'{aux_local_directory}/{fuw_mask_file}')
+            f'{aux_local_directory}/{fuw_mask_file}',
+            cached=True)
         self.parameters['fuw_mask_file'] = fuw_mask_file
 
         nm_mask_file = f'{tile_id}_60m_MASK_NON_MOUNTAIN_AREA_{ssp_aux_version}.tif'
@@ -270,14 +275,16 @@ class RunGfscWorker(RunWorker):
             self.download_file_from_bucket(
                 csi_s3, csi_buckets_names['sip_aux'],
                 f'ssp_aux/{ssp_aux_version}/{tile_id[1:]}/{nm_mask_file}',
-                f'{aux_local_directory}/{nm_mask_file}')
+                f'{aux_local_directory}/{nm_mask_file}',
+                cached=True)
         self.parameters['nm_mask_file'] = nm_mask_file
 
         self.logger.info(f'get auxiliary files (DEM)')
         self.download_file_from_bucket(
             csi_s3, csi_buckets_names['sip_aux'],
             f'GLO30/DEM_60m_tiles_wgs84/Copernicus_DSM_60m_{tile_id[1:]}_wgs84.tif',
-            os.path.join(aux_local_directory,f'Copernicus_DSM_60m_{tile_id[1:]}_wgs84.tif'))
+            os.path.join(aux_local_directory,f'Copernicus_DSM_60m_{tile_id[1:]}_wgs84.tif'),
+            cached=True)
         self.parameters['dem_file'] = f'Copernicus_DSM_60m_{tile_id[1:]}_wgs84.tif'
 
         # self.local_input_directories.append(f'{job_dir}/{tile_id[1:]}')
@@ -289,6 +296,7 @@ class RunGfscWorker(RunWorker):
         self.parameters['tmp_dir'] = self.remove_prefix(os.path.join(self.get_local_job_dir(self.job),'tmp'),self.root_dir)
         self.local_input_directories.append(os.path.join(self.get_local_job_dir(self.job),'tmp'))
         self.parameters['work_dir'] = self.remove_prefix(job_dir,self.root_dir)
+        self.parameters['gf1_workers'] = max(1, min(RunGfscWorker.GF1_WORKERS, os.cpu_count()))
 
         self.logger.info(f'create the S&I processing parameters file')
         self.create_sip_parameters_file()
@@ -216,7 +216,8 @@ class RunL1cWorker(RunWorker):
         self.download_file_from_bucket(
             csi_s3, csi_buckets_names['sip_aux'],
             f'csi_aux/csi_aux_{tile_id}.tar',
-            aux_local_file_path)
+            aux_local_file_path,
+            cached=True)
         with tarfile.open(f'{job_dir}/csi_aux_{tile_id}.tar') as tar:
             tar.extractall(f'{job_dir}')
 
@@ -358,7 +359,8 @@ class RunL1cWorker(RunWorker):
         self.download_file_from_bucket(
             csi_s3, csi_buckets_names['infra'],
             f'si_software/maja_config_input_files/maja_4.5.3/maja_static.tar',
-            maja_static_local_file_path)
+            maja_static_local_file_path,
+            cached=True)
         with tarfile.open(f'{work_dir}/maja/maja_static.tar') as tar:
             tar.extractall(f'{work_dir}/maja')
         maja_userconf_local_file_path = self.compute_local_file_path(
@@ -368,7 +370,8 @@ class RunL1cWorker(RunWorker):
         self.download_file_from_bucket(
             csi_s3, csi_buckets_names['infra'],
             f'si_software/maja_config_input_files/maja_4.5.3/maja_userconf.tar',
-            maja_userconf_local_file_path)
+            maja_userconf_local_file_path,
+            cached=True)
         with tarfile.open(f'{work_dir}/maja/maja_userconf.tar') as tar:
             tar.extractall(f'{work_dir}/maja')
         self.local_input_directories.append(f'{work_dir}/maja')
@@ -164,7 +164,8 @@ class RunRlieS1Worker(RunWorker):
         self.download_file_from_bucket(
             csi_s3, csi_buckets_names['sip_aux'],
             'rlie_s1_static_aux.tar.gz',
-            aux_archive_loc)
+            aux_archive_loc,
+            cached=True)
         with tarfile.open(aux_archive_loc) as tar:
             tar.extractall(os.path.join(self.local_job_dir, self.input_products, 'static'))
         os.unlink(aux_archive_loc)
@@ -200,7 +200,8 @@ class RunSwsWdsWorker(RunWorker):
             self.download_file_from_bucket(
                 csi_s3, csi_buckets_names['sip_aux'],
                 f'GLO30/DEM_60m_zones_wgs84/Copernicus_DSM_60m_{epsg}_wgs84.tif',
-                aux_local_file_path)
+                aux_local_file_path,
+                cached=True)
         else:
             self.logger.info(f'download input S1 Assembly file for this job from {s1ass_path}')
             self.parameters['s1ass_create'] = False
@@ -225,7 +226,8 @@ class RunSwsWdsWorker(RunWorker):
         self.download_file_from_bucket(
             csi_s3, csi_buckets_names['sip_aux'],
             object_path,
-            aux_local_file_path)
+            aux_local_file_path,
+            cached=True)
         with tarfile.open(f'{aux_local_file_path}') as tar:
             tar.extractall(f'{job_dir}/aux')
 
@@ -240,7 +242,8 @@ class RunSwsWdsWorker(RunWorker):
         self.download_file_from_bucket(
             csi_s3, csi_buckets_names['sip_aux'],
             object_path,
-            aux_local_file_path)
+            aux_local_file_path,
+            cached=True)
         with tarfile.open(f'{aux_local_file_path}') as tar:
             tar.extractall(f'{job_dir}/aux')
 
@@ -253,7 +256,8 @@ class RunSwsWdsWorker(RunWorker):
         self.download_file_from_bucket(
             csi_s3, csi_buckets_names['sip_aux'],
             object_path,
-            aux_local_file_path)
+            aux_local_file_path,
+            cached=True)
 
         if self.generate_sws_product:
             self.logger.info(f'get NON_MOUNTAIN_AREA mask file')
@@ -265,7 +269,8 @@ class RunSwsWdsWorker(RunWorker):
             self.download_file_from_bucket(
                 csi_s3, csi_buckets_names['sip_aux'],
                 object_path,
-                aux_local_file_path)
+                aux_local_file_path,
+                cached=True)
             self.logger.info(f'get SNOW mask file for month {month}')
             object_path = f'ssp_aux/{ssp_aux_version}/{tile_id}/T{tile_id}_60m_MASK_SNOW_m{month}_{ssp_aux_version}.tif'
             aux_local_file_path = self.compute_local_file_path(
@@ -275,7 +280,8 @@ class RunSwsWdsWorker(RunWorker):
             self.download_file_from_bucket(
                 csi_s3, csi_buckets_names['sip_aux'],
                 object_path,
-                aux_local_file_path)
+                aux_local_file_path,
+                cached=True)
 
         self.local_input_directories.append(f'{job_dir}/aux')
         self.local_input_directories.append(s1_assembly_local_dir)
@@ -17,6 +17,7 @@ SysUtil.ensure_env_var_set('COSIMS_DB_HTTP_API_BASE_URL')
 
 from . import docker
 from ...common.python.util.s3_util import S3Util
+from ...common.python.util.aux_cache_util import AuxCacheUtil
 from ...common.python.util.dias_storage_util import DiasStorageUtil
 from ...common.python.util.exceptions import CsiInternalError, CsiExternalError
 from ...common.python.database.logger import Logger
@@ -170,7 +171,7 @@ class RunWorker(object):
 
             
     def download_file_from_bucket(
-        self, s3_resource, bucket: str, object_in_bucket: str, local_file_name: str
+        self, s3_resource, bucket: str, object_in_bucket: str, local_file_name: str, cached: bool = False
     ):
         '''
         Utility function to download a file stored on an S3 endpoint storage, 
@@ -180,10 +181,17 @@ class RunWorker(object):
         :param bucket: name of the bucket in the s3 endpoint storage.
         :param object_in_bucket: path leading to the object to download in the bucket.
         :param local_file_name: path under which will be saved the downloaded file.
+        :param cached: get the file through the node-level auxiliary data cache,
+            only for static files which are never opened for update by the job,
+            as the local file is a hard link to the cached file.
         '''
 
-        S3Util.download_file_from_bucket(
-            s3_resource, bucket, object_in_bucket, local_file_name)
+        if cached:
+            AuxCacheUtil().download_file_from_bucket(
+                s3_resource, bucket, object_in_bucket, local_file_name, logger=self.logger)
+        else:
+            S3Util.download_file_from_bucket(
+                s3_resource, bucket, object_in_bucket, local_file_name)
 
 
     def download_prefixed_objects(